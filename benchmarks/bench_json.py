@@ -0,0 +1,92 @@
+"""
+Serialization time of ``/api/entries`` pages.
+
+Loads a synthetic capture and serializes pages of several sizes three ways:
+summary dicts through FastAPI's ``jsonable_encoder`` and ``JSONResponse``
+(the generic path), summary dicts through ``server.fast_json.dumps``
+(orjson when installed) and straight from the columns. ``/api/entries``
+uses the dicts with orjson and the columns without it. Checks that all
+three produce the same document and prints the median time per page,
+next to the binary columnar payload of ``/api/entries/columns`` and the
+size of both.
+
+    python benchmarks/bench_json.py --entries 50000 --pages 200,2000,20000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from benchmarks.synth_har import write_har  # noqa: E402
+from server.columnar import encode_summaries  # noqa: E402
+from server.fast_json import dumps, orjson  # noqa: E402
+from server.har_utils import load_entry_store  # noqa: E402
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--pages", default="200,2000,20000")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--har", help="existing HAR file to load instead of a synthetic one")
+    args = parser.parse_args()
+
+    path = args.har
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"synth-{args.entries}.har")
+        if not os.path.exists(path):
+            print(f"generating {args.entries} entries -> {path}")
+            write_har(path, args.entries)
+    store = load_entry_store(path)
+    print(f"{path}: {len(store)} entries, orjson {'available' if orjson is not None else 'not installed'}")
+
+    def generic(ids):
+        return JSONResponse({"entries": [store.summary(i) for i in ids]}).body
+
+    def dicts(ids):
+        return dumps({"entries": [store.summary(i) for i in ids]})
+
+    def columns(ids):
+        return ('{"entries":' + store._summaries_from_columns(ids) + "}").encode("utf-8")
+
+    print(f"{'rows':>8}{'generic ms':>14}{'dumps ms':>12}{'columns ms':>13}{'speed-up':>10}{'binary ms':>12}{'JSON KB':>10}{'binary KB':>11}")
+    used = dicts if orjson is not None else columns
+    for rows in (int(p) for p in args.pages.split(",")):
+        ids = range(min(rows, len(store)))
+        reference = json.loads(generic(ids))
+        for fn in (dicts, columns):
+            if json.loads(fn(ids)) != reference:
+                raise SystemExit(f"{fn.__name__}: output differs from the generic path at {rows} rows")
+        # ``JSONResponse`` alone skips the encoder pass FastAPI runs on returned dicts.
+        t_generic = _median_ms(lambda: JSONResponse(jsonable_encoder({"entries": [store.summary(i) for i in ids]})), args.repeat)
+        t_dicts = _median_ms(lambda: dicts(ids), args.repeat)
+        t_columns = _median_ms(lambda: columns(ids), args.repeat)
+        t_used = t_dicts if used is dicts else t_columns
+        t_binary = _median_ms(lambda: encode_summaries(store, ids, {"total": len(ids)}), args.repeat)
+        json_kb = len(used(ids)) / 1024
+        binary_kb = len(encode_summaries(store, ids, {"total": len(ids)})) / 1024
+        print(
+            f"{len(ids):>8}{t_generic:>14.2f}{t_dicts:>12.2f}{t_columns:>13.2f}{t_generic / t_used:>10.1f}"
+            f"{t_binary:>12.2f}{json_kb:>10.0f}{binary_kb:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
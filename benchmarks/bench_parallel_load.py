@@ -0,0 +1,64 @@
+"""
+Scaling of parallel HAR normalization across worker processes.
+
+Generates (or reuses) a synthetic capture, loads it once sequentially with
+``load_entry_store`` and then with ``load_entry_store_parallel`` for each
+worker count, checks that every load produced the same columns, and prints
+wall time and speed-up.
+
+    python benchmarks/bench_parallel_load.py --entries 200000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from benchmarks.synth_har import write_har  # noqa: E402
+from server.entry_store import PHASES, EntryStore  # noqa: E402
+from server.har_utils import load_entry_store  # noqa: E402
+from server.parallel_ingest import load_entry_store_parallel  # noqa: E402
+
+
+def _columns(store: EntryStore):
+    cols = [list(getattr(store, name)) for name in ("started_ms", "time", "size", "status", "url_code", "host_code", "raw_start", "raw_end")]
+    cols += [list(store.phases[p]) for p in PHASES]
+    cols += [list(store.urls.values), list(store.mimes.values), store.initiators, store.text_spans]
+    return cols
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--har", help="existing HAR file to load instead of a synthetic one")
+    args = parser.parse_args()
+
+    path = args.har
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"synth-{args.entries}.har")
+        if not os.path.exists(path):
+            print(f"generating {args.entries} entries -> {path}")
+            write_har(path, args.entries)
+    size_mb = os.path.getsize(path) / (1 << 20)
+
+    t = time.perf_counter()
+    expected = load_entry_store(path)
+    base = time.perf_counter() - t
+    reference = _columns(expected)
+    print(f"{path}: {len(expected)} entries, {size_mb:.1f} MB, {os.cpu_count()} CPUs")
+    print(f"{'mode':<12}{'seconds':>10}{'MB/s':>10}{'speed-up':>10}")
+    print(f"{'sequential':<12}{base:>10.2f}{size_mb / base:>10.1f}{1.0:>10.2f}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        t = time.perf_counter()
+        store = load_entry_store_parallel(path, workers)
+        elapsed = time.perf_counter() - t
+        if _columns(store) != reference:
+            raise SystemExit(f"workers={workers}: result differs from the sequential load")
+        print(f"{f'{workers} procs':<12}{elapsed:>10.2f}{size_mb / elapsed:>10.1f}{base / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
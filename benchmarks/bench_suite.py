@@ -0,0 +1,345 @@
+"""
+Benchmark suite over every ingestion stage and every ``/api/*`` endpoint.
+
+For each capture size a deterministic synthetic HAR is generated (see
+``synth_har.py`` for the generator options) and a fresh Python process
+runs each stage, then each endpoint through an in-process test client,
+recording wall time, resident set size (peak during the stage and growth
+over it) and, with ``--allocations``, the peak and retained bytes seen by
+``tracemalloc``. Tracing slows Python code down several times, so times
+of a traced run are only comparable with other traced runs.
+
+Results are written as JSON; ``--compare`` prints the ratio of every time
+against an earlier result file and flags the ones slower than
+``--threshold``.
+
+    python benchmarks/bench_suite.py --sizes 10000,100000,1000000 --out bench.json
+    python benchmarks/bench_suite.py --sizes 10000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synth_har  # noqa: E402
+
+LEGACY_MAX = 100_000  # whole-document parse_har_file / normalize_entries only up to this many entries
+SAMPLES = 50  # entries whose detail / body endpoints are timed
+RSS_INTERVAL = 0.002  # seconds between RSS samples
+MIN_COMPARE_SECONDS = 0.005  # stages faster than this in both runs are never flagged
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """Peak resident set size while a stage runs, sampled from ``/proc``."""
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self.start_rss = self.peak = _rss() or 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(RSS_INTERVAL):
+            self.peak = max(self.peak, _rss() or 0)
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        return max(self.peak, _rss() or 0)
+
+
+def _mb(n: int) -> float:
+    return round(n / (1 << 20), 2)
+
+
+class Recorder:
+    """Runs stages and collects one record per stage."""
+
+    def __init__(self, allocations: bool):
+        self.allocations = allocations
+        self.records: List[Dict[str, Any]] = []
+
+    def run(self, stage: str, fn: Callable[[], Any], **extra: Any) -> Any:
+        sampler = _RssSampler() if _rss() is not None else None
+        if sampler is not None:
+            sampler.start()
+        if self.allocations:
+            tracemalloc.start()
+        t = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - t
+        record: Dict[str, Any] = {"stage": stage, "seconds": round(seconds, 6)}
+        if self.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record.update({"allocPeakMb": _mb(peak), "allocRetainedMb": _mb(current)})
+        if sampler is not None:
+            peak = sampler.stop()
+            record.update({"peakRssMb": _mb(peak), "rssGrowthMb": _mb(peak - sampler.start_rss)})
+        else:
+            # Linux reports kilobytes; only the lifetime peak is available
+            record["peakRssMb"] = _mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+        record.update(extra)
+        self.records.append(record)
+        print(f"  {stage:<48}{seconds * 1000:>12.1f} ms{record.get('peakRssMb', 0):>10.0f} MB", file=sys.stderr)
+        return result
+
+
+def _body_sample(store: Any) -> List[int]:
+    # Entries with a non-empty body, so byte ranges are satisfiable
+    from server.entry_store import NO_BODY
+
+    codes, sizes = store.body_code, store.body_bytes
+    with_body = [i for i in range(len(store)) if codes[i] != NO_BODY and sizes[codes[i]] > 0]
+    return random.Random(0).sample(with_body, min(SAMPLES, len(with_body)))
+
+
+def _stages(rec: Recorder, path: str, n: int) -> None:
+    from server.aggregates import Aggregates
+    from server.bodies import Body
+    from server.capture_cache import load_capture, save_capture
+    from server.critical_path import CriticalPaths
+    from server.entry_index import EntryFilter, EntryIndex
+    from server.event_relations import EventGraph
+    from server.graph_layout import TreeLayout
+    from server.har_utils import build_stats, load_entry_store, normalize_entries, parse_har_file
+
+    if n <= LEGACY_MAX:
+        har = rec.run("parse_har_file", lambda: parse_har_file(path))
+        rec.run("normalize_entries", lambda: normalize_entries(har))
+        del har
+    store = rec.run("load_entry_store", lambda: load_entry_store(path))
+    index = rec.run("EntryIndex", lambda: EntryIndex(store))
+    filters = {
+        "keyword": EntryFilter(q="r1"),
+        "domain+status": EntryFilter(domain="cdn1.example.com", status_min=400, status_max=599),
+        "keyword+type+method": EntryFilter(q="assets/1", rtype="script", method="GET"),
+        "time window": EntryFilter(time_from=1000.0, time_to=2000.0),
+    }
+    for name, f in filters.items():
+        ranks = rec.run(f"filter ({name})", lambda: index.filter(f))
+    rec.run("build_stats", lambda: build_stats(store))
+    ids = index.ids(ranks) if ranks is not None else list(range(len(store)))
+    rec.run("Aggregates (filtered)", lambda: Aggregates.of(store, ids))
+    graph = rec.run("EventGraph", lambda: EventGraph(store, index))
+    layout = rec.run("TreeLayout", lambda: TreeLayout(graph))
+    rec.run("EventGraph.subgraph", lambda: graph.subgraph(limit=2000, layout=layout))
+    paths = rec.run("CriticalPaths", lambda: CriticalPaths(graph))
+    rec.run("CriticalPaths.chains", lambda: paths.chains(10))
+
+    sample = _body_sample(store)
+    rec.run(f"Body.preview x{len(sample)}", lambda: [Body(store, i).preview() for i in sample])
+    rec.run(f"Body.index x{len(sample)}", lambda: [Body(store, i).index() for i in sample])
+    rec.run(f"Body.stream x{len(sample)}", lambda: [sum(map(len, Body(store, i).stream())) for i in sample])
+
+    aggregates = Aggregates.of(store)
+    size = os.path.getsize(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        sidecar = os.path.join(tmp, "bench.harc")
+        rec.run("save_capture", lambda: save_capture(sidecar, "bench", size, "bench.har", store, index, aggregates))
+        rec.run("load_capture", lambda: load_capture(sidecar, "bench", size, path))
+
+
+def _endpoints(rec: Recorder, path: str) -> None:
+    from fastapi.testclient import TestClient
+
+    from server import main
+
+    client = TestClient(main.app)
+
+    def call(method: str, url: str, **kwargs: Any) -> Any:
+        r = client.request(method, url, **kwargs)
+        if r.status_code >= 400:
+            raise SystemExit(f"{method} {url}: {r.status_code} {r.text[:200]}")
+        return r
+
+    def upload() -> str:
+        with open(path, "rb") as f:
+            job = call("POST", "/api/upload", files={"file": ("bench.har", f)}).json()
+        while True:
+            state = call("GET", f"/api/jobs/{job['jobId']}").json()
+            if state["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.01)
+        if state["status"] != "done":
+            raise SystemExit(f"ingest failed: {state}")
+        return job["captureId"]
+
+    capture_id = rec.run("POST /api/upload (until parsed)", upload)
+    try:
+        sample = _body_sample(main.REGISTRY.get(capture_id).entries)
+        urls = [
+            "/api/captures",
+            "/api/stats",
+            "/api/stats?q=r1",
+            "/api/entries",
+            "/api/entries?limit=5000",
+            "/api/entries?q=r1&limit=1000",
+            "/api/entries?domain=cdn1.example.com&statusMin=400",
+            "/api/entries?from=1000&to=2000",
+            "/api/waterfall?width=1200",
+            "/api/waterfall?width=1200&q=r1",
+            "/api/concurrency",
+            "/api/event-graph",
+            "/api/event-graph?collapse=1",
+            "/api/critical-path",
+            "/api/analytics",
+            "/api/event-stats",
+            "/api/cache-stats",
+        ]
+        for url in urls:
+            # First call builds whatever the endpoint caches; the second shows the cached cost
+            rec.run(f"GET {url}", lambda: call("GET", url))
+            rec.run(f"GET {url} (repeat)", lambda: call("GET", url))
+        for name, fmt, headers in (
+            ("detail", "/api/entries/{}", None),
+            ("body", "/api/entries/{}/body", None),
+            ("download", "/api/entries/{}/download", None),
+            ("download range", "/api/entries/{}/download", {"Range": "bytes=0-99"}),
+        ):
+            rec.run(
+                f"GET {fmt.format('{id}')} x{len(sample)} ({name})",
+                lambda: [call("GET", fmt.format(i), headers=headers) for i in sample],
+            )
+    finally:
+        # Leave no benchmark capture behind in the upload folder
+        main.REGISTRY.remove(capture_id)
+        for suffix in (".har", ".harc"):
+            p = os.path.join(main.UPLOAD_DIR, capture_id + suffix)
+            if os.path.exists(p):
+                os.remove(p)
+
+
+def run_size(path: str, n: int, allocations: bool, endpoints: bool) -> List[Dict[str, Any]]:
+    rec = Recorder(allocations)
+    _stages(rec, path, n)
+    if endpoints:
+        _endpoints(rec, path)
+    return rec.records
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _har_path(n: int, seed: int, options: Dict[str, Any]) -> str:
+    tag = "-".join(f"{k}{v}" for k, v in sorted(options.items()) if v is not None)
+    return os.path.join(tempfile.gettempdir(), f"synth-{n}-s{seed}-{tag}.har")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """Print time ratios against ``baseline``; returns the number of regressions."""
+    before = {(r["entries"], r["stage"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"{'entries':>9}  {'stage':<48}{'before ms':>12}{'after ms':>12}{'ratio':>8}")
+    for r in current["results"]:
+        old = before.get((r["entries"], r["stage"]))
+        if old is None:
+            continue
+        ratio = r["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = ""
+        if max(r["seconds"], old["seconds"]) < MIN_COMPARE_SECONDS:
+            pass
+        elif ratio > threshold:
+            flag = "  slower"
+            regressions += 1
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{r['entries']:>9}  {r['stage']:<48}{old['seconds'] * 1000:>12.1f}{r['seconds'] * 1000:>12.1f}{ratio:>8.2f}{flag}")
+    if baseline.get("meta", {}).get("allocations") != current["meta"]["allocations"]:
+        print("note: only one of the runs traced allocations; times are not comparable")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated entry counts, e.g. 10000,100000,1000000")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="time ratio reported as a regression")
+    parser.add_argument("--allocations", action="store_true", help="trace allocations with tracemalloc (slow)")
+    parser.add_argument("--no-endpoints", action="store_true", help="skip the /api/* endpoints")
+    synth_har.add_arguments(parser)
+    # Internal: measure one capture in this process and print its records
+    parser.add_argument("--worker", nargs=2, metavar=("HAR", "ENTRIES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        records = run_size(args.worker[0], int(args.worker[1]), args.allocations, not args.no_endpoints)
+        json.dump(records, sys.stdout)
+        return
+
+    options = synth_har.options_from(args)
+    results: List[Dict[str, Any]] = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        path = _har_path(n, args.seed, options)
+        if not os.path.exists(path):
+            print(f"generating {n} entries -> {path}", file=sys.stderr)
+            synth_har.write_har(path + ".part", n, args.seed, **options)
+            os.replace(path + ".part", path)
+        print(f"{n} entries, {os.path.getsize(path) / (1 << 20):.1f} MB", file=sys.stderr)
+        # A fresh process per size keeps peak RSS of one size out of the next
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", path, str(n)]
+        cmd += ["--allocations"] * args.allocations + ["--no-endpoints"] * args.no_endpoints
+        out = subprocess.run(cmd, cwd=ROOT_DIR, stdout=subprocess.PIPE, check=True).stdout
+        results.extend({"entries": n, **r} for r in json.loads(out))
+
+    try:
+        import orjson  # noqa: F401
+
+        have_orjson = True
+    except ImportError:
+        have_orjson = False
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "orjson": have_orjson,
+            "allocations": args.allocations,
+            "seed": args.seed,
+            "generator": options,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("generator") != options:
+            print("note: the baseline used different generator options")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            raise SystemExit(f"{regressions} stage(s) slower than {args.threshold}x")
+
+
+if __name__ == "__main__":
+    main()
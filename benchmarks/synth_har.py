@@ -0,0 +1,157 @@
+"""
+Synthetic HAR generator for benchmarks.
+
+Produces captures with a realistic mix of hosts, MIME types, timings,
+initiators and bodies. Output is deterministic for a given seed and set of
+options, and entries are written as they are generated, so captures of a
+million entries and more fit in memory.
+
+    python benchmarks/synth_har.py 100000 /tmp/synth.har
+    python benchmarks/synth_har.py 1000000 /tmp/big.har --hosts 500 --body-dist pareto --base64-share 0.2 --max-depth 6
+"""
+import argparse
+import base64
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+PHASES = ("blocked", "dns", "connect", "ssl", "send", "wait", "receive")
+MIMES = ("text/html", "application/javascript", "text/css", "image/png", "application/json", "font/woff2", "")
+BINARY_MIMES = ("image/", "font/")
+BODY_DISTS = ("uniform", "pareto")
+PARETO_ALPHA = 1.5  # tail index of heavy-tailed body sizes; the mean stays finite
+MAX_BODY_FACTOR = 1000  # pareto bodies are capped at this multiple of the mean
+
+
+def _body_length(rnd: random.Random, dist: str, mean: int) -> int:
+    if dist == "pareto":
+        # paretovariate(a) has mean a / (a - 1)
+        scale = mean * (PARETO_ALPHA - 1) / PARETO_ALPHA
+        return min(int(scale * rnd.paretovariate(PARETO_ALPHA)), mean * MAX_BODY_FACTOR)
+    return rnd.randint(0, 2 * mean)
+
+
+def iter_entries(
+    n: int,
+    seed: int = 1,
+    hosts: int = 40,
+    body_mean: int = 100,
+    body_dist: str = "uniform",
+    base64_share: Optional[float] = None,
+    max_depth: Optional[int] = None,
+    initiator_share: float = 0.6,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield ``n`` HAR entries.
+
+    ``hosts`` is the number of distinct hosts. Body lengths are drawn from
+    ``body_dist`` with mean ``body_mean`` bytes. Bodies of binary MIME types
+    are base64 encoded, unless ``base64_share`` is given: then that share of
+    all bodies is, whatever their type. ``initiator_share`` of the entries
+    name an earlier entry as initiator; with ``max_depth`` initiator chains
+    are at most that many requests deep.
+    """
+    if body_dist not in BODY_DISTS:
+        raise ValueError(f"unknown body distribution: {body_dist}")
+    rnd = random.Random(seed)
+    host_names = [f"cdn{i}.example.com" for i in range(hosts)]
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    urls: List[str] = []
+    depths: List[int] = []
+    # Entries that may still initiate others
+    parents: List[int] = []
+    clock = 0.0
+    for i in range(n):
+        host = rnd.choice(host_names)
+        mime = rnd.choice(MIMES)
+        url = f"https://{host}/assets/{rnd.randint(0, 400)}/r{i % 2000}.bin?v={i % 11}"
+        timings = {p: (rnd.random() * 40 if rnd.random() < 0.7 else -1) for p in PHASES}
+        total = sum(v for v in timings.values() if v > 0)
+        clock += rnd.random() * 5
+        content: Dict[str, Any] = {"size": 0, "mimeType": mime}
+        if mime:
+            length = content["size"] = _body_length(rnd, body_dist, body_mean)
+            if base64_share is None:
+                binary = mime.startswith(BINARY_MIMES)
+            else:
+                binary = rnd.random() < base64_share
+            if binary:
+                content["text"] = base64.b64encode(rnd.randbytes(length)).decode("ascii")
+                content["encoding"] = "base64"
+            else:
+                content["text"] = ("body " * (length // 5 + 1))[:length]
+        entry: Dict[str, Any] = {
+            "startedDateTime": (t0 + timedelta(milliseconds=clock)).isoformat().replace("+00:00", "Z"),
+            "time": total,
+            "request": {
+                "method": rnd.choice(("GET", "GET", "GET", "POST")),
+                "url": url,
+                "httpVersion": "h2",
+                "headers": [{"name": "accept", "value": "*/*"}, {"name": "user-agent", "value": "bench"}],
+            },
+            "response": {
+                "status": rnd.choice((200, 200, 200, 204, 304, 404, 500)),
+                "statusText": "",
+                "httpVersion": "h2",
+                "headers": [{"name": "content-type", "value": mime}],
+                "content": content,
+            },
+            "timings": timings,
+            "_priority": rnd.choice(("VeryHigh", "High", "Medium", "Low")),
+        }
+        depth = 0
+        if parents and rnd.random() < initiator_share:
+            parent = parents[rnd.randrange(len(parents))]
+            entry["_initiator"] = {"type": "script", "url": urls[parent]}
+            depth = depths[parent] + 1
+        urls.append(url)
+        depths.append(depth)
+        if max_depth is None or depth + 1 < max_depth:
+            parents.append(i)
+        yield entry
+
+
+def make_entries(n: int, seed: int = 1, **options: Any) -> List[Dict[str, Any]]:
+    return list(iter_entries(n, seed, **options))
+
+
+def write_har(path: str, n: int, seed: int = 1, **options: Any) -> str:
+    """Write a HAR of ``n`` entries (options as for ``iter_entries``), one entry at a time."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"log": {"version": "1.2", "creator": {"name": "synth_har"}, "pages": [], "entries": [')
+        for i, e in enumerate(iter_entries(n, seed, **options)):
+            if i:
+                f.write(", ")
+            f.write(json.dumps(e, ensure_ascii=False))
+        f.write("]}}")
+    return path
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Generator options, shared by the benchmark scripts."""
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--hosts", type=int, default=40, help="number of distinct hosts")
+    parser.add_argument("--body-mean", type=int, default=100, help="mean body length in bytes")
+    parser.add_argument("--body-dist", choices=BODY_DISTS, default="uniform")
+    parser.add_argument("--base64-share", type=float, help="share of base64 bodies (default: binary MIME types only)")
+    parser.add_argument("--max-depth", type=int, help="maximum initiator chain depth (default: unbounded)")
+
+
+def options_from(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "hosts": args.hosts,
+        "body_mean": args.body_mean,
+        "body_dist": args.body_dist,
+        "base64_share": args.base64_share,
+        "max_depth": args.max_depth,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("entries", type=int)
+    parser.add_argument("path")
+    add_arguments(parser)
+    args = parser.parse_args()
+    write_har(args.path, args.entries, args.seed, **options_from(args))
@@ -0,0 +1,165 @@
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from server.entry_store import NO_BODY, PHASES, EntryStore
+from server.sketches import Distribution, Distributions
+
+
+def _count_codes(counts: Iterable[Any], values: Sequence[Any], empty: Optional[str]) -> Dict[str, int]:
+    """Name the counts of a dictionary-encoded column; falsy values map to ``empty`` (or are dropped if None)."""
+    out: Dict[str, int] = {}
+    for code, n in counts:
+        v = values[code] or empty
+        if v:
+            out[v] = out.get(v, 0) + n
+    return out
+
+
+class Aggregates:
+    """
+    Totals behind ``/api/stats``, ``/api/event-stats`` and ``/api/analytics``.
+
+    Kept per dictionary code rather than per name, so rows can be added as
+    they are ingested (``update`` catches up with a growing store) and the
+    names are only looked up when the totals are rendered. Rows are added in
+    store order, which keeps key order and float sums identical to a single
+    pass over the columns.
+    """
+
+    def __init__(self, store: Optional[EntryStore] = None):
+        self.store = store
+        self.count = 0
+        self.total_size = 0
+        self.total_time = 0.0
+        self.status: Counter = Counter()
+        self.mime: Counter = Counter()
+        self.host: Counter = Counter()
+        self.rtype: Counter = Counter()
+        # Distinct body code -> entries carrying it (``NO_BODY`` included).
+        self.bodies: Counter = Counter()
+        self.phases = [0.0] * len(PHASES)
+        # Resource type code -> per-phase totals.
+        self.phases_by_type: Dict[int, List[float]] = {}
+        # Quantile sketches and histograms of wait, receive, time and size.
+        self.distributions = Distributions()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, store: EntryStore, ids: Optional[Sequence[int]] = None) -> "Aggregates":
+        """Totals over the rows ``ids`` (default: the whole store)."""
+        agg = cls(store)
+        if ids is None:
+            agg.update(store)
+        else:
+            agg._add(lambda col: list(map(col.__getitem__, ids)), len(ids))
+        return agg
+
+    def update(self, store: EntryStore) -> None:
+        """Add the rows appended to ``store`` since the last call."""
+        self.store = store
+        lo, hi = self.count, len(store)
+        if hi > lo:
+            self._add(lambda col: col[lo:hi], hi - lo)
+
+    def _add(self, pick: Callable[[Any], Sequence[Any]], n: int) -> None:
+        store = self.store
+        with self._lock:
+            self.total_size = sum(pick(store.size), self.total_size)
+            self.total_time = sum(pick(store.time), self.total_time)
+            self.status.update(pick(store.status))
+            self.mime.update(pick(store.mime_code))
+            self.host.update(pick(store.host_code))
+            types = pick(store.type_code)
+            self.rtype.update(types)
+            self.bodies.update(pick(store.body_code))
+            by_type = self.phases_by_type
+            for c in dict.fromkeys(types):
+                if c not in by_type:
+                    by_type[c] = [0.0] * len(PHASES)
+            for k, p in enumerate(PHASES):
+                col = pick(store.phases[p])
+                self.phases[k] = sum(col, self.phases[k])
+                for c, v in zip(types, col):
+                    by_type[c][k] += v
+            self.distributions.add(store, pick)
+            self.count += n
+
+    def stats(self) -> Dict[str, Any]:
+        store = self.store
+        with self._lock:
+            return {
+                "count": self.count,
+                "totalSize": self.total_size,
+                "totalTime": self.total_time,
+                "byStatus": {str(s): n for s, n in self.status.items()},
+                "byMimeType": _count_codes(self.mime.items(), store.mimes.values, "unknown"),
+                "byDomain": _count_codes(self.host.items(), store.hosts.values, None),
+                "byResourceType": _count_codes(self.rtype.items(), store.resource_types.values, "unknown"),
+                "bodies": self._body_stats(),
+            }
+
+    def _body_stats(self) -> Dict[str, Any]:
+        # How much body text the entries carry and how much of it is distinct.
+        sizes = self.store.body_bytes
+        count = unique = total = unique_total = 0
+        for c, n in self.bodies.items():
+            if c == NO_BODY:
+                continue
+            count += n
+            unique += 1
+            total += sizes[c] * n
+            unique_total += sizes[c]
+        return {
+            "count": count,
+            "unique": unique,
+            "bytes": total,
+            "uniqueBytes": unique_total,
+            "dedupRatio": total / unique_total if unique_total else 1.0,
+        }
+
+    def phase_stats(self) -> Dict[str, Any]:
+        types = self.store.resource_types.values
+        with self._lock:
+            by_type: Dict[str, Dict[str, float]] = {}
+            for c, sums in self.phases_by_type.items():
+                rtype = types[c] or "unknown"
+                acc = by_type.setdefault(rtype, dict.fromkeys(PHASES, 0.0))
+                for p, v in zip(PHASES, sums):
+                    acc[p] += v
+            return {"total": dict(zip(PHASES, self.phases)), "byType": by_type}
+
+    def distributions_by_name(self, metrics: Sequence[str], dims: Sequence[str]) -> Dict[str, Dict[str, Dict[str, Distribution]]]:
+        """Name-keyed copies of the selected distributions, ready to merge across captures."""
+        with self._lock:
+            return self.distributions.named(self.store, metrics, dims)
+
+    def to_json(self) -> Dict[str, Any]:
+        """Plain-JSON form stored in the capture sidecar."""
+        with self._lock:
+            return {
+                "count": self.count,
+                "totalSize": self.total_size,
+                "totalTime": self.total_time,
+                "status": list(self.status.items()),
+                "mime": list(self.mime.items()),
+                "host": list(self.host.items()),
+                "rtype": list(self.rtype.items()),
+                "bodies": list(self.bodies.items()),
+                "phases": self.phases,
+                "phasesByType": list(self.phases_by_type.items()),
+                "distributions": self.distributions.to_json(),
+            }
+
+    @classmethod
+    def from_json(cls, store: EntryStore, d: Dict[str, Any]) -> "Aggregates":
+        agg = cls(store)
+        agg.count = d["count"]
+        agg.total_size = d["totalSize"]
+        agg.total_time = d["totalTime"]
+        for name in ("status", "mime", "host", "rtype", "bodies"):
+            setattr(agg, name, Counter(dict(d[name])))
+        agg.phases = list(d["phases"])
+        agg.phases_by_type = {c: list(v) for c, v in d["phasesByType"]}
+        agg.distributions = Distributions.from_json(d["distributions"])
+        return agg
@@ -0,0 +1,266 @@
+"""
+Headless batch analysis of many HAR files.
+
+    python -m server.batch captures/ --out summaries.jsonl --summary total.json --table files.csv --workers 8
+
+Every file is streamed into an ``EntryStore`` by a pool of worker processes,
+with the totals of ``/api/stats`` and ``/api/event-stats`` accumulated
+while it is parsed. One JSON line per file is written as soon as that file
+is done, and the totals of all files (with merged quantile sketches) at the
+end. ``--table`` additionally writes one flat row per file, as CSV or (with
+pyarrow installed) Parquet.
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from server.aggregates import Aggregates
+from server.entry_store import PHASES
+from server.har_utils import load_entry_store
+from server.sketches import Distribution, merge_named, quantile_label
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: only needed for ``--table *.parquet``
+    pyarrow = None
+
+QUANTILES = (0.5, 0.9, 0.99)
+DIST_METRICS = ("time", "wait", "size")
+TASKS_PER_WORKER = 50  # files a worker process handles before it is replaced
+
+Named = Dict[str, Dict[str, Dict[str, Distribution]]]
+
+
+def _limit_memory(max_bytes: int) -> None:
+    # Worker initializer: a file that would need more fails with MemoryError instead.
+    if max_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def _quantiles(named: Named) -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for metric, dims in named.items():
+        dist = dims["all"].get("all")
+        rendered = dist.render(QUANTILES) if dist is not None else {"count": 0}
+        rendered.pop("histogram", None)
+        out[metric] = rendered
+    return out
+
+
+def summarize_file(path: str) -> Tuple[Dict[str, Any], Optional[Named]]:
+    """
+    Totals of one HAR file: the JSON line written for it, and its overall
+    distributions for merging. Failures become an ``error`` line.
+    """
+    t = time.perf_counter()
+    record: Dict[str, Any] = {"file": path}
+    try:
+        record["bytes"] = os.path.getsize(path)
+        aggregates = Aggregates()
+        store = load_entry_store(path, aggregates=aggregates)
+        try:
+            named = aggregates.distributions_by_name(DIST_METRICS, ("all",))
+            record.update(
+                {
+                    "entries": len(store),
+                    "stats": aggregates.stats(),
+                    "phases": aggregates.phase_stats(),
+                    "quantiles": _quantiles(named),
+                }
+            )
+        finally:
+            if store.reader is not None:
+                store.reader.close()
+    except MemoryError:
+        record["error"] = "out of memory"
+        named = None
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        named = None
+    record["seconds"] = time.perf_counter() - t
+    return record, named
+
+
+class Totals:
+    """Sums of the per-file records; distributions are merged, so quantiles cover every entry."""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.failed = 0
+        self.entries = 0
+        self.bytes = 0
+        self.total_size = 0
+        self.total_time = 0.0
+        self.counts: Dict[str, Counter] = {k: Counter() for k in ("byStatus", "byMimeType", "byDomain", "byResourceType")}
+        self.bodies: Counter = Counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.phases_by_type: Dict[str, Dict[str, float]] = {}
+        self.distributions: Optional[Named] = None
+
+    def add(self, record: Dict[str, Any], named: Optional[Named]) -> None:
+        self.files += 1
+        if "error" in record:
+            self.failed += 1
+            return
+        stats = record["stats"]
+        self.entries += record["entries"]
+        self.bytes += record["bytes"]
+        self.total_size += stats["totalSize"]
+        self.total_time += stats["totalTime"]
+        for key, counter in self.counts.items():
+            counter.update(stats[key])
+        b = stats["bodies"]
+        # Bodies are only deduplicated within a file.
+        self.bodies.update({"count": b["count"], "unique": b["unique"], "bytes": b["bytes"], "uniqueBytes": b["uniqueBytes"]})
+        for p, v in record["phases"]["total"].items():
+            self.phases[p] += v
+        for rtype, sums in record["phases"]["byType"].items():
+            acc = self.phases_by_type.setdefault(rtype, dict.fromkeys(PHASES, 0.0))
+            for p, v in sums.items():
+                acc[p] += v
+        if named is not None:
+            self.distributions = named if self.distributions is None else merge_named([self.distributions, named])
+
+    def to_json(self, seconds: float) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "seconds": seconds,
+            "filesPerSecond": self.files / seconds if seconds else None,
+            "entriesPerSecond": self.entries / seconds if seconds else None,
+            "stats": {
+                "count": self.entries,
+                "totalSize": self.total_size,
+                "totalTime": self.total_time,
+                **{key: dict(counter.most_common()) for key, counter in self.counts.items()},
+                "bodies": {
+                    **self.bodies,
+                    "dedupRatio": self.bodies["bytes"] / self.bodies["uniqueBytes"] if self.bodies["uniqueBytes"] else 1.0,
+                },
+            },
+            "phases": {"total": self.phases, "byType": self.phases_by_type},
+            "quantiles": _quantiles(self.distributions) if self.distributions is not None else {},
+        }
+
+
+def table_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat per-file row for ``--table``; failed files keep only their error."""
+    row: Dict[str, Any] = {"file": record["file"], "error": record.get("error"), "bytes": record.get("bytes"), "seconds": record["seconds"]}
+    stats = record.get("stats")
+    if stats is None:
+        return row
+    row.update({"entries": record["entries"], "totalSize": stats["totalSize"], "totalTime": stats["totalTime"]})
+    by_status = stats["byStatus"]
+    for cls in range(1, 6):
+        row[f"status{cls}xx"] = sum(n for s, n in by_status.items() if s[:1] == str(cls) and len(s) == 3)
+    row["bodies"] = stats["bodies"]["count"]
+    row["bodyBytes"] = stats["bodies"]["bytes"]
+    for p, v in record["phases"]["total"].items():
+        row[f"phase.{p}"] = v
+    for metric, q in record["quantiles"].items():
+        for label in map(quantile_label, QUANTILES):
+            row[f"{metric}.{label}"] = q.get(label)
+    return row
+
+
+def _table_columns(rows: List[Dict[str, Any]]) -> List[str]:
+    return list(dict.fromkeys(k for row in rows for k in row))
+
+
+def write_table(path: str, rows: List[Dict[str, Any]]) -> None:
+    columns = _table_columns(rows)
+    if path.endswith(".parquet"):
+        table = pyarrow.table({c: [row.get(c) for row in rows] for c in columns})
+        pyarrow.parquet.write_table(table, path)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def find_hars(paths: Iterable[str], pattern: str) -> List[str]:
+    """HAR files named directly or found (recursively, by ``pattern``) below directories."""
+    out: List[str] = []
+    for p in paths:
+        if os.path.isdir(p):
+            out.extend(sorted(glob.glob(os.path.join(p, "**", pattern), recursive=True)))
+        else:
+            out.append(p)
+    return out
+
+
+def _results(files: List[str], workers: int, max_memory: int) -> Iterable[Tuple[Dict[str, Any], Optional[Named]]]:
+    # Completion order: a slow file does not hold back the lines behind it.
+    if workers <= 1:
+        _limit_memory(max_memory)
+        yield from map(summarize_file, files)
+        return
+    # Spawned workers are replaced every few files, so memory one large file
+    # left behind in a worker does not accumulate over the run.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_limit_memory, initargs=(max_memory,), max_tasks_per_child=TASKS_PER_WORKER
+    ) as pool:
+        futures = [pool.submit(summarize_file, f) for f in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m server.batch", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="HAR files or directories to search")
+    parser.add_argument("--pattern", default="*.har", help="file name pattern inside directories (default: *.har)")
+    parser.add_argument("--out", default="-", help="per-file JSON Lines (default: stdout)")
+    parser.add_argument("--summary", help="write the totals over all files to this JSON file")
+    parser.add_argument("--table", help="write one row per file to this .csv or .parquet file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-worker-mb", type=int, default=0, help="address-space limit per worker (default: none)")
+    args = parser.parse_args(argv)
+    if args.table and args.table.endswith(".parquet") and pyarrow is None:
+        parser.error("writing Parquet needs pyarrow; use a .csv table instead")
+
+    files = find_hars(args.paths, args.pattern)
+    totals = Totals()
+    rows: List[Dict[str, Any]] = []
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    t = time.perf_counter()
+    try:
+        for record, named in _results(files, min(args.workers, max(len(files), 1)), args.max_worker_mb << 20):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            totals.add(record, named)
+            if args.table:
+                rows.append(table_row(record))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - t
+    summary = totals.to_json(seconds)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=1)
+    if args.table:
+        write_table(args.table, rows)
+    mb = summary["bytes"] / (1 << 20)
+    print(
+        f"{totals.files} files ({totals.failed} failed), {totals.entries} entries, {mb:.1f} MB in {seconds:.2f}s: "
+        f"{summary['filesPerSecond'] or 0:.1f} files/s, {mb / seconds if seconds else 0:.1f} MB/s",
+        file=sys.stderr,
+    )
+    return 1 if totals.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
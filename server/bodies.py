@@ -0,0 +1,237 @@
+import binascii
+import codecs
+import re
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from server.entry_store import NO_BODY, EntryStore
+
+PREVIEW_CHARS = 200_000
+_NON_BASE64 = re.compile(r"[^A-Za-z0-9+/=]")
+_B64_DATA = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def _b64_count(text: str) -> int:
+    # Base64 data characters (not padding) in ``text``.
+    data = text.encode("utf-8", errors="surrogatepass")
+    return len(data) - len(data.translate(None, _B64_DATA))
+
+
+def _b64_tail(carry: str) -> bytes:
+    # Leftover characters at the end of the body, padded like a complete quad.
+    if len(carry) < 2:
+        return b""
+    return binascii.a2b_base64(carry + "=" * (-len(carry) % 4))
+
+
+class BodyIndex:
+    """
+    Decoded length of a body plus resume points into it.
+
+    ``offsets[k]`` is the decoded byte offset at which the ``k``-th chunk
+    starts, resumed from ``positions[k]`` with ``carries[k]`` (base64
+    characters left over from the previous chunk). A body that has to be
+    decoded as a whole (``whole``) has a single resume point at the start.
+    """
+
+    __slots__ = ("length", "offsets", "positions", "carries", "whole")
+
+    def __init__(self) -> None:
+        self.whole = False
+        self.length = 0
+        self.offsets: List[int] = []
+        self.positions: List[Optional[int]] = []
+        self.carries: List[str] = []
+
+    def seek(self, offset: int) -> Tuple[int, Optional[int], str]:
+        """The last resume point at or before decoded byte ``offset``."""
+        if not self.offsets:
+            return 0, None, ""
+        k = max(bisect_right(self.offsets, offset) - 1, 0)
+        return self.offsets[k], self.positions[k], self.carries[k]
+
+
+class Body:
+    """
+    Response body of one entry, decoded as it is read.
+
+    Bodies are kept in the HAR as text, base64 encoded for binary content.
+    Both are decoded chunk by chunk straight from the capture's file, so a
+    preview touches only the prefix it shows and downloads or byte ranges
+    never hold the whole decoded body in memory. Base64 that ends without
+    its padding is decoded as if it were padded. Base64 whose chunks cannot
+    be decoded independently of each other (padding in the middle, a
+    dangling character) is decoded as a whole like ``base64.b64decode``
+    does, or served as its raw text if that fails. Downloads and byte
+    ranges find out before sending anything (``BodyIndex.whole``, or a scan
+    of the body without decoding it); a preview only falls back once a
+    chunk of its prefix fails.
+
+    Identical bodies are read through the first entry carrying them, so
+    the decoded length and resume points (``BodyIndex``) are shared too.
+    """
+
+    def __init__(self, store: EntryStore, i: int):
+        self.store = store
+        self.i = i
+        raw = store.raw(i, with_body=False)
+        resp = raw.get("response", {}) or {}
+        content = resp.get("content", {}) or {}
+        self.mime = content.get("mimeType") or "application/octet-stream"
+        self.encoding = content.get("encoding")
+        self.size = int(content.get("size") or resp.get("bodySize") or 0)
+        self.is_base64 = self.encoding == "base64"
+        self.code = store.body_code[i]
+        self.present = self.code != NO_BODY
+        self.digest = store.body_digests[self.code] if self.present else None
+        # Entry whose copy of the body is read.
+        self.source = store.body_owner[self.code] if self.present else i
+        # Set by ``_whole``: the body is not base64 after all.
+        self.not_base64 = False
+
+    def _well_formed(self) -> bool:
+        # Whether the base64 chunks decode on their own, scanned without
+        # decoding: no data follows the padding and no single character is
+        # left over at the end.
+        n = 0
+        padded = False
+        for _, text in self.store.body_chunks(self.source):
+            pad = text.find("=")
+            if padded:
+                pad = 0
+            elif pad >= 0:
+                n += _b64_count(text[:pad])
+                padded = True
+            else:
+                n += _b64_count(text)
+                continue
+            if _b64_count(text[pad:]):
+                return False
+        return n % 4 != 1
+
+    def _whole(self) -> bytes:
+        # The body decoded at once, or its raw bytes when it is not valid base64.
+        text = self.store.body_text(self.source) or ""
+        try:
+            return binascii.a2b_base64(text)
+        except (binascii.Error, ValueError):
+            self.not_base64 = True
+            return text.encode("utf-8", errors="replace")
+
+    def _decode(self, pos: Optional[int] = None, carry: str = "") -> Iterator[Tuple[Optional[int], str, bytes]]:
+        # ``(resume position, carry, decoded bytes)`` per chunk. Raises
+        # ``binascii.Error`` at the chunk where base64 stops decoding chunk
+        # by chunk (see ``_well_formed``).
+        padded = False
+        for nxt, text in self.store.body_chunks(self.source, pos):
+            if self.is_base64:
+                chars = carry + _NON_BASE64.sub("", text)
+                pad = chars.find("=")
+                if pad >= 0 or padded:
+                    if chars[max(pad, 0) :].strip("="):
+                        raise binascii.Error("data after padding")
+                    padded = True
+                k = len(chars) - len(chars) % 4
+                yield pos, carry, binascii.a2b_base64(chars[:k])
+                carry = chars[k:]
+            else:
+                yield pos, carry, text.encode("utf-8", errors="replace")
+            pos = nxt
+        if carry:
+            if len(carry.rstrip("=")) == 1:
+                raise binascii.Error("dangling base64 character")
+            yield pos, carry, _b64_tail(carry)
+
+    def index(self) -> BodyIndex:
+        """Decode the body once to learn its length and where each chunk starts."""
+        index = BodyIndex()
+        try:
+            for pos, carry, data in self._decode():
+                index.offsets.append(index.length)
+                index.positions.append(pos)
+                index.carries.append(carry)
+                index.length += len(data)
+        except binascii.Error:
+            index = BodyIndex()
+            index.whole = True
+            index.offsets.append(0)
+            index.positions.append(None)
+            index.carries.append("")
+            index.length = len(self._whole())
+        return index
+
+    def stream(self, start: int = 0, stop: Optional[int] = None, index: Optional[BodyIndex] = None) -> Iterator[bytes]:
+        """
+        Decoded bytes ``[start, stop)``, resuming near ``start`` when an index
+        is given. Without one, base64 is scanned first (see ``_well_formed``).
+        """
+        whole = index.whole if index is not None else self.is_base64 and not self._well_formed()
+        if whole:
+            yield self._whole()[start:stop]
+            return
+        offset, pos, carry = index.seek(start) if index is not None else (0, None, "")
+        for _, _, data in self._decode(pos, carry):
+            lo, hi = offset, offset + len(data)
+            offset = hi
+            if hi <= start:
+                continue
+            if stop is not None and lo >= stop:
+                return
+            yield data[max(start - lo, 0) : len(data) if stop is None else min(stop - lo, len(data))]
+
+    def _prefix(self, limit: int) -> Tuple[str, bool]:
+        # First ``limit`` characters of the body text and whether there is more.
+        out: List[str] = []
+        n = 0
+        for _, text in self.store.body_chunks(self.source):
+            if n + len(text) > limit:
+                out.append(text[: limit - n])
+                return "".join(out), True
+            out.append(text)
+            n += len(text)
+        return "".join(out), False
+
+    def _decoded_prefix(self, limit: int) -> Tuple[str, bool]:
+        # First ``limit`` characters of the base64-decoded body read as UTF-8;
+        # decodes the body as a whole only if a chunk of the prefix fails.
+        try:
+            return self._text_prefix((data for _, _, data in self._decode()), limit)
+        except binascii.Error:
+            return self._text_prefix([self._whole()], limit)
+
+    def _text_prefix(self, chunks: Iterable[bytes], limit: int) -> Tuple[str, bool]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        out: List[str] = []
+        n = 0
+        for data in chunks:
+            text = decoder.decode(data)
+            out.append(text)
+            n += len(text)
+            if n > limit:
+                return "".join(out)[:limit], True
+        out.append(decoder.decode(b"", final=True))
+        text = "".join(out)
+        return text[:limit], len(text) > limit
+
+    def preview(self, limit: int = PREVIEW_CHARS) -> Dict[str, Any]:
+        """
+        Body preview for the detail panel: images as a data URL of (at most)
+        the first ``limit`` base64 characters, anything else as the first
+        ``limit`` characters of text.
+        """
+        result: Dict[str, Any] = {"mimeType": self.mime, "encoding": self.encoding, "size": self.size, "truncated": False}
+        if not self.present:
+            return result
+        result["digest"] = self.digest
+        if self.is_base64 and self.mime.startswith("image/"):
+            b64, truncated = self._prefix(limit)
+            result.update({"dataUrl": f"data:{self.mime};base64,{b64}", "truncated": truncated, "isBinary": True})
+        elif self.is_base64:
+            text, truncated = self._decoded_prefix(limit)
+            if self.not_base64:
+                text, truncated = self._prefix(limit)
+            result.update({"previewText": text, "isBinary": self.not_base64, "truncated": truncated})
+        else:
+            text, truncated = self._prefix(limit)
+            result.update({"previewText": text, "isBinary": False, "truncated": truncated})
+        return result
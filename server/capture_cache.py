@@ -0,0 +1,214 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from server.aggregates import Aggregates
+from server.entry_index import EntryIndex
+from server.entry_store import PHASES, EntryStore, StringTable
+from server.raw_entries import RawEntryReader
+
+# Bump whenever the normalized representation or the layout below changes;
+# sidecars with another version are ignored and rebuilt.
+SCHEMA_VERSION = 4
+
+MAGIC = b"HARC"
+_HEADER = struct.Struct("<4sII")  # magic, schema version, manifest length
+_ALIGN = 8
+
+_STORE_ARRAYS = (
+    "started_ms",
+    "time",
+    "size",
+    "status",
+    "url_code",
+    "host_code",
+    "url_host",
+    "url_path",
+    "method_code",
+    "status_text_code",
+    "mime_code",
+    "type_code",
+    "priority_code",
+    "raw_start",
+    "raw_end",
+    "body_code",
+    "body_bytes",
+    "body_owner",
+)
+# High-cardinality tables are packed as one UTF-8 blob plus offsets and
+# decoded lazily; the small ones are stored as JSON.
+_PACKED_TABLES = ("urls", "hosts", "paths", "body_digests")
+_JSON_TABLES = ("methods", "status_texts", "mimes", "resource_types", "priorities")
+_INDEX_ARRAYS = ("order", "rank", "url_ranks", "url_offsets")
+
+
+class PackedStrings(Sequence[str]):
+    """Read-only string sequence over a UTF-8 blob, decoding items on access."""
+
+    def __init__(self, blob: Any, offsets: Any):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        return bytes(self._blob[self._offsets[i] : self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        blob, offsets = self._blob, self._offsets
+        for i in range(len(offsets) - 1):
+            yield bytes(blob[offsets[i] : offsets[i + 1]]).decode("utf-8")
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.blobs: List[bytes] = []
+        self.size = 0
+
+    def add(self, data: bytes) -> List[int]:
+        offset = self.size
+        self.blobs.append(data)
+        pad = -len(data) % _ALIGN
+        if pad:
+            self.blobs.append(b"\0" * pad)
+        self.size += len(data) + pad
+        return [offset, len(data)]
+
+    def add_array(self, col: Any, typecode: str) -> List[Any]:
+        if not isinstance(col, array):
+            col = array(typecode, col)
+        return self.add(col.tobytes()) + [col.typecode]
+
+    def add_strings(self, values: Sequence[str]) -> Dict[str, Any]:
+        offsets = array("q", [0])
+        parts = []
+        total = 0
+        for v in values:
+            b = v.encode("utf-8")
+            parts.append(b)
+            total += len(b)
+            offsets.append(total)
+        return {"blob": self.add(b"".join(parts)), "offsets": self.add_array(offsets, "q")}
+
+
+def save_capture(
+    path: str, capture_id: str, source_size: int, name: str, entries: EntryStore, index: EntryIndex, aggregates: Aggregates
+) -> None:
+    """Write the normalized columns, string tables, raw offsets, filter indexes and aggregates to ``path``."""
+    w = _Writer()
+    arrays = {a: w.add_array(getattr(entries, a), "d") for a in _STORE_ARRAYS}
+    for p in PHASES:
+        arrays["phase." + p] = w.add_array(entries.phases[p], "d")
+    for a in _INDEX_ARRAYS:
+        arrays["index." + a] = w.add_array(getattr(index, a), "I")
+    packed = {t: w.add_strings(getattr(entries, t).values) for t in _PACKED_TABLES}
+    postings = {}
+    for name_ in EntryIndex.POSTINGS:
+        table = getattr(index, name_)
+        keys = sorted(table)
+        offsets = array("q", [0])
+        ranks = array("I")
+        for k in keys:
+            ranks.extend(table[k])
+            offsets.append(len(ranks))
+        postings[name_] = {
+            "keys": w.add_array(array("q", keys), "q"),
+            "offsets": w.add_array(offsets, "q"),
+            "ranks": w.add_array(ranks, "I"),
+        }
+    spans = sorted(entries.text_spans.items())
+    text_spans = {
+        "ids": w.add_array(array("q", (i for i, _ in spans)), "q"),
+        "starts": w.add_array(array("q", (s for _, (s, _e) in spans)), "q"),
+        "ends": w.add_array(array("q", (e for _, (_s, e) in spans)), "q"),
+    }
+    manifest = {
+        "id": capture_id,
+        "sourceSize": source_size,
+        "name": name,
+        "count": len(entries),
+        "arrays": arrays,
+        "packed": packed,
+        "tables": {t: list(getattr(entries, t).values) for t in _JSON_TABLES},
+        "postings": postings,
+        "textSpans": text_spans,
+        "initiators": [[i, v] for i, v in entries.initiators.items()],
+        "aggregates": aggregates.to_json(),
+    }
+    head = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head += b" " * (-(len(head) + _HEADER.size) % _ALIGN)
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, SCHEMA_VERSION, len(head)))
+        f.write(head)
+        for blob in w.blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+def read_manifest(path: str) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Manifest and data offset of a sidecar, or ``None`` if missing or of another schema."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, head_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != SCHEMA_VERSION:
+                return None
+            return json.loads(f.read(head_len)), _HEADER.size + head_len
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def load_capture(
+    path: str, capture_id: str, source_size: int, har_path: str
+) -> Optional[Tuple[EntryStore, EntryIndex, Aggregates]]:
+    """
+    Memory-map a sidecar written by ``save_capture``.
+
+    Columns and postings become zero-copy views into the mapping; returns
+    ``None`` if the sidecar does not match the capture or schema.
+    """
+    found = read_manifest(path)
+    if found is None:
+        return None
+    manifest, base = found
+    if manifest.get("id") != capture_id or manifest.get("sourceSize") != source_size:
+        return None
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = memoryview(mm)
+
+    def view(spec: List[Any]) -> memoryview:
+        offset, length, typecode = spec
+        return buf[base + offset : base + offset + length].cast(typecode)
+
+    def blob(spec: List[int]) -> memoryview:
+        offset, length = spec
+        return buf[base + offset : base + offset + length]
+
+    arrays = manifest["arrays"]
+    store = EntryStore(RawEntryReader(har_path))
+    for a in _STORE_ARRAYS:
+        setattr(store, a, view(arrays[a]))
+    store.phases = {p: view(arrays["phase." + p]) for p in PHASES}
+    for t, spec in manifest["packed"].items():
+        setattr(store, t, StringTable(PackedStrings(blob(spec["blob"]), view(spec["offsets"]))))
+    for t, values in manifest["tables"].items():
+        setattr(store, t, StringTable(values))
+    spans = manifest["textSpans"]
+    store.text_spans = dict(zip(view(spans["ids"]), zip(view(spans["starts"]), view(spans["ends"]))))
+    store.initiators = {i: v for i, v in manifest["initiators"]}
+    # Keep the mapping alive as long as the views into it.
+    store.sidecar = mm
+
+    postings: Dict[str, Dict[int, Any]] = {}
+    for name, spec in manifest["postings"].items():
+        keys, offsets, ranks = view(spec["keys"]), view(spec["offsets"]), view(spec["ranks"])
+        postings[name] = {k: ranks[offsets[j] : offsets[j + 1]] for j, k in enumerate(keys)}
+    index = EntryIndex.restore(store, {a: view(arrays["index." + a]) for a in _INDEX_ARRAYS}, postings)
+    return store, index, Aggregates.from_json(store, manifest["aggregates"])
@@ -0,0 +1,356 @@
+import glob
+import hashlib
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.aggregates import Aggregates
+from server.bodies import Body, BodyIndex
+from server.capture_cache import load_capture, read_manifest, save_capture
+from server.critical_path import CriticalPaths
+from server.entry_index import EntryFilter, EntryIndex
+from server.entry_store import EntryStore
+from server.event_relations import EventGraph
+from server.graph_layout import TreeLayout
+from server.har_utils import load_entry_store
+from server.metrics import CACHE_EVICTIONS, INGEST_BYTES, INGEST_ENTRIES, INGEST_RATE, cache_lookup, stage
+from server.parallel_ingest import default_workers
+from server.query_cache import QueryCache
+from server.waterfall import WaterfallIndex
+
+MEMORY_BUDGET = int(os.environ.get("HAR_MEMORY_BUDGET_MB", "2048")) << 20
+MAX_WATERFALLS = 4  # waterfall indexes kept per capture (one per filter)
+MAX_AGGREGATES = 32  # filtered totals kept per capture
+MAX_BODY_INDEXES = 64  # decoded body lengths and resume points kept per capture
+
+# Versions are unique across captures and reloads, so a cursor or cache key
+# can never be satisfied by a different dataset.
+_VERSIONS = itertools.count(1)
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def capture_id_for(digest: str) -> str:
+    return digest[:16]
+
+
+def _warm(index: EntryIndex) -> None:
+    index.url_search()
+    index.lifetimes()
+
+
+def _count_ingest(source: str, entries: int, seconds: float) -> None:
+    INGEST_ENTRIES.inc(entries, source)
+    if seconds > 0:
+        INGEST_RATE.set(entries / seconds, source)
+
+
+class CaptureData:
+    """
+    Everything derived from a capture's HAR file while it is loaded.
+
+    Request handlers work on one ``CaptureData`` for their whole duration,
+    so an eviction in the meantime cannot pull the data out from under them.
+    A live capture keeps its ``CaptureData`` while it grows: ``advance``
+    swaps in the extended index, so a handler reads ``index`` once and
+    works with that. Cached results are keyed by the row count they cover.
+    """
+
+    def __init__(self, capture_id: str, entries: EntryStore, index: EntryIndex, aggregates: Optional[Aggregates] = None):
+        self.id = capture_id
+        self.entries = entries
+        self.index = index
+        # Totals over the whole capture, normally accumulated during ingestion.
+        self.aggregates = aggregates if aggregates is not None else Aggregates.of(entries)
+        self.version = next(_VERSIONS)
+        self.query_cache = QueryCache()
+        self.memory_bytes = entries.nbytes() + index.nbytes()
+        self._waterfalls: "OrderedDict[Tuple[int, EntryFilter], WaterfallIndex]" = OrderedDict()
+        self._filtered_aggregates: "OrderedDict[Tuple[int, EntryFilter], Aggregates]" = OrderedDict()
+        # Keyed by body code, so entries with the same body share one.
+        self._body_indexes: "OrderedDict[int, BodyIndex]" = OrderedDict()
+        self._event_graph: Optional[EventGraph] = None
+        self._graph_layout: Optional[TreeLayout] = None
+        self._critical_paths: Optional[CriticalPaths] = None
+        self._lock = threading.Lock()
+        self._graph_lock = threading.Lock()
+
+    def advance(self, index: EntryIndex, aggregates: Aggregates) -> None:
+        """
+        Make ``index`` and ``aggregates`` current after rows were appended to
+        ``entries`` (or a failed append was rolled back) in a live capture.
+        The version stays, so cursors and cached results for fewer rows
+        remain valid.
+        """
+        memory = self.entries.nbytes() + index.nbytes()
+        with self._lock:
+            self.index = index
+            self.aggregates = aggregates
+            self.memory_bytes = memory
+
+    def _cached(self, name: str, items: "OrderedDict[Any, Any]", limit: int, key: Any, build: Callable[[], Any], cache: bool) -> Any:
+        # ``name`` labels the cache's lookups and the build stage in the metrics.
+        with self._lock:
+            value = items.get(key)
+            if value is not None:
+                items.move_to_end(key)
+        cache_lookup(name, value is not None)
+        if value is not None:
+            return value
+        with stage(name + ".build"):
+            value = build()
+        if cache:
+            with self._lock:
+                items[key] = value
+                while len(items) > limit:
+                    items.popitem(last=False)
+                    CACHE_EVICTIONS.inc(1, name)
+        return value
+
+    def waterfall(self, index: EntryIndex, f: EntryFilter, ids: Callable[[], List[int]], cache: bool = True) -> WaterfallIndex:
+        """Waterfall index over the rows of ``index`` matching ``f`` (``ids`` gives them in start-time order)."""
+        build = lambda: WaterfallIndex(self.entries, ids())  # noqa: E731
+        return self._cached("waterfall", self._waterfalls, MAX_WATERFALLS, (len(index), f), build, cache)
+
+    def event_graph(self) -> EventGraph:
+        """Dependency graph of the capture, built on first use (and again once a live capture grew)."""
+        index = self.index
+        with self._graph_lock:
+            graph = self._event_graph
+            if graph is None or len(graph) != len(index):
+                with stage("graph.build"):
+                    graph = self._event_graph = EventGraph(self.entries, index)
+            return graph
+
+    def graph_layout(self, graph: EventGraph) -> TreeLayout:
+        """Coordinates of every node of ``graph`` (from ``event_graph``), computed once per graph."""
+        with self._graph_lock:
+            if self._graph_layout is None or self._graph_layout.graph is not graph:
+                with stage("graph.layout"):
+                    self._graph_layout = TreeLayout(graph)
+            return self._graph_layout
+
+    def critical_paths(self) -> CriticalPaths:
+        """Chain analysis of ``event_graph``, computed once per graph."""
+        graph = self.event_graph()
+        with self._graph_lock:
+            if self._critical_paths is None or self._critical_paths.graph is not graph:
+                with stage("graph.critical_paths"):
+                    self._critical_paths = CriticalPaths(graph)
+            return self._critical_paths
+
+    def body_index(self, body: Body) -> BodyIndex:
+        """Decoded length of ``body`` and resume points into it, decoded once per distinct body."""
+        return self._cached("body_index", self._body_indexes, MAX_BODY_INDEXES, body.code, body.index, True)
+
+    def cached_body_index(self, body: Body) -> Optional[BodyIndex]:
+        with self._lock:
+            return self._body_indexes.get(body.code)
+
+    def filtered_aggregates(self, index: EntryIndex, f: EntryFilter, ids: Callable[[], List[int]], cache: bool = True) -> Aggregates:
+        """Totals over the rows of ``index`` matching ``f``, gathered from ``ids`` only."""
+        build = lambda: Aggregates.of(self.entries, ids())  # noqa: E731
+        return self._cached("aggregates", self._filtered_aggregates, MAX_AGGREGATES, (len(index), f), build, cache)
+
+
+class Capture:
+    """
+    One HAR capture, identified by the content hash of its file.
+
+    The spooled HAR file on disk is the durable form; ``data`` is only
+    present while the capture is loaded. The first load parses the file and
+    writes a binary sidecar to ``cache_path``; later loads (after an
+    eviction or a restart) memory-map the sidecar instead of parsing again.
+    """
+
+    def __init__(self, capture_id: str, name: str, path: str, cache_path: Optional[str] = None):
+        self.id = capture_id
+        self.name = name
+        self.path = path
+        self.cache_path = cache_path
+        self.data: Optional[CaptureData] = None
+        # Totals of the entries parsed so far while a load is running.
+        self._pending: Optional[Aggregates] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.data is not None
+
+    def load(self, progress: Optional[Callable[[int, int], None]] = None) -> CaptureData:
+        """Load the capture if needed; ``progress`` is passed on to ``load_entry_store``."""
+        with self._lock:
+            data = self.data
+            if data is None:
+                entries, index, aggregates = self._read(progress)
+                data = self.data = CaptureData(self.id, entries, index, aggregates)
+                # Warm the keyword and time-range indexes off the request path
+                threading.Thread(target=_warm, args=(data.index,), daemon=True).start()
+            return data
+
+    def _read(self, progress: Optional[Callable[[int, int], None]]) -> Tuple[EntryStore, EntryIndex, Aggregates]:
+        source_size = os.path.getsize(self.path)
+        if self.cache_path:
+            with stage("ingest.load_sidecar") as timed:
+                cached = load_capture(self.cache_path, self.id, source_size, self.path)
+            if cached is not None:
+                _count_ingest("sidecar", len(cached[0]), timed.seconds)
+                return cached
+        aggregates = self._pending = Aggregates()
+        try:
+            with stage("ingest.parse") as timed:
+                entries = load_entry_store(self.path, progress, workers=default_workers(), aggregates=aggregates)
+        finally:
+            self._pending = None
+        _count_ingest("parse", len(entries), timed.seconds)
+        INGEST_BYTES.inc(source_size)
+        with stage("ingest.index"):
+            index = EntryIndex(entries)
+        if self.cache_path:
+            try:
+                with stage("ingest.save_sidecar"):
+                    save_capture(self.cache_path, self.id, source_size, self.name, entries, index, aggregates)
+            except OSError:
+                # The sidecar only speeds up the next load
+                pass
+        return entries, index, aggregates
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """Totals of the loaded capture, or of the entries parsed so far while loading."""
+        data = self.data
+        aggregates = data.aggregates if data is not None else self._pending
+        if aggregates is None or aggregates.store is None:
+            return None
+        return aggregates.stats()
+
+    @property
+    def evictable(self) -> bool:
+        """Whether ``unload`` releases the loaded data."""
+        return True
+
+    def unload(self) -> None:
+        with self._lock:
+            self.data = None
+
+    def info(self) -> Dict[str, Any]:
+        data = self.data
+        return {
+            "id": self.id,
+            "name": self.name,
+            "loaded": data is not None,
+            "count": len(data.entries) if data is not None else None,
+            "memoryBytes": data.memory_bytes if data is not None else 0,
+        }
+
+
+class CaptureRegistry:
+    """
+    Captures keyed by content hash.
+
+    Loaded captures are kept in LRU order; when their estimated memory
+    exceeds the budget the least recently used ones are unloaded back to
+    their on-disk form (the most recently used one always stays, and so do
+    live captures still recording).
+    """
+
+    def __init__(self, memory_budget: int = MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self._captures: "OrderedDict[str, Capture]" = OrderedDict()
+        self._latest: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, capture_id: str) -> bool:
+        return capture_id in self._captures
+
+    def add(self, capture: Capture) -> Capture:
+        """Register ``capture`` unless one with the same id exists; returns the registered one."""
+        with self._lock:
+            existing = self._captures.get(capture.id)
+            if existing is not None:
+                return existing
+            self._captures[capture.id] = capture
+            return capture
+
+    def restore(self, directory: str) -> int:
+        """
+        Register captures persisted in ``directory`` by a previous run (unloaded).
+
+        A capture is restored when both its ``<id>.har`` file and a current
+        sidecar exist; the most recently written one becomes the default.
+        Returns the number of captures registered.
+        """
+        found = []
+        for cache_path in glob.glob(os.path.join(directory, "*.harc")):
+            capture_id = os.path.basename(cache_path)[: -len(".harc")]
+            path = os.path.join(directory, f"{capture_id}.har")
+            header = read_manifest(cache_path)
+            if header is None or not os.path.exists(path) or header[0].get("id") != capture_id:
+                continue
+            found.append((os.path.getmtime(cache_path), Capture(capture_id, header[0].get("name") or capture_id, path, cache_path)))
+        found.sort(key=lambda t: t[0])
+        for _, capture in found:
+            self.add(capture)
+        if found:
+            self._latest = found[-1][1].id
+        return len(found)
+
+    @property
+    def latest(self) -> Optional[str]:
+        """Id of the capture served to requests without an explicit one."""
+        return self._latest
+
+    def find(self, capture_id: str) -> Optional[Capture]:
+        """The registered capture ``capture_id``, without loading it."""
+        with self._lock:
+            return self._captures.get(capture_id)
+
+    def get(self, capture_id: Optional[str] = None, progress: Optional[Callable[[int, int], None]] = None) -> Optional[CaptureData]:
+        """Data of a capture by id (default: the last activated one), loading it if needed."""
+        with self._lock:
+            capture_id = capture_id or self._latest
+            capture = self._captures.get(capture_id) if capture_id else None
+            if capture is None:
+                return None
+            self._captures.move_to_end(capture_id)
+        data = capture.load(progress)
+        self._enforce_budget()
+        return data
+
+    def activate(self, capture_id: str, progress: Optional[Callable[[int, int], None]] = None) -> CaptureData:
+        """Load ``capture_id`` and make it the default for requests without an explicit capture."""
+        data = self.get(capture_id, progress)
+        self._latest = capture_id
+        return data
+
+    def remove(self, capture_id: str) -> None:
+        with self._lock:
+            self._captures.pop(capture_id, None)
+            if self._latest == capture_id:
+                self._latest = None
+
+    def list(self) -> List[Capture]:
+        with self._lock:
+            return list(reversed(self._captures.values()))
+
+    def _enforce_budget(self) -> None:
+        with self._lock:
+            loaded = [c for c in self._captures.values() if c.loaded]
+            used = sum(c.data.memory_bytes for c in loaded)
+            # Oldest first; never evict the most recently used capture.
+            for c in loaded[:-1]:
+                if used <= self.memory_budget:
+                    break
+                if c.evictable:
+                    used -= c.data.memory_bytes
+                    c.unload()
@@ -0,0 +1,133 @@
+import json
+import sys
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, List, Sequence
+
+from server.entry_store import PHASES, EntryStore
+
+MAGIC = b"HCOL"
+VERSION = 1
+MEDIA_TYPE = "application/vnd.har-columns"
+ALIGN = 8  # every block starts at a multiple of 8, so Float64Array views need no copy
+NULL_CODE = -1
+
+
+class ColumnWriter:
+    """
+    Binary columnar page of entry summaries, laid out for typed-array views.
+
+    The payload starts with ``MAGIC``, a version and the byte length of a
+    small JSON header (all little-endian ``uint32``, plus one reserved), then
+    the header, then one aligned block per column. The header carries the
+    page fields (``total``, ``nextCursor``, ...) and, per column, its type
+    and the byte offset (from the start of the payload) and element count
+    of each block. Numeric columns are ``float64``/``int32``/``uint32``
+    arrays; string columns are dictionary encoded per page: ``int32`` codes
+    (``-1`` for null), ``uint32`` offsets (one more than the number of
+    distinct values) into a UTF-8 blob.
+    """
+
+    def __init__(self) -> None:
+        self.columns: List[Dict[str, Any]] = []
+        self._blocks: List[bytes] = []
+        self._size = 0
+
+    def _block(self, data: Any, n: int) -> Dict[str, int]:
+        if isinstance(data, array):
+            if sys.byteorder != "little":
+                data = array(data.typecode, data)
+                data.byteswap()
+            data = data.tobytes()
+        spec = {"offset": self._size, "length": n}
+        self._blocks.append(data)
+        self._size += len(data)
+        pad = -self._size % ALIGN
+        if pad:
+            self._blocks.append(b"\0" * pad)
+            self._size += pad
+        return spec
+
+    def numbers(self, name: str, kind: str, values: Any) -> None:
+        typecode = {"float64": "d", "int32": "i", "uint32": "I"}[kind]
+        col = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+        self.columns.append({"name": name, "type": kind, **self._block(col, len(col))})
+
+    def strings(self, name: str, table: Sequence[Any], codes: Sequence[int]) -> None:
+        """Column of ``table[c]`` for each store code ``c``, re-encoded with a page-local dictionary."""
+        local: Dict[int, int] = {}
+        blobs: List[bytes] = []
+        for c in dict.fromkeys(codes):
+            v = table[c]
+            if v is None:
+                local[c] = NULL_CODE
+                continue
+            local[c] = len(blobs)
+            blobs.append((v if isinstance(v, str) else str(v)).encode("utf-8"))
+        page_codes = array("i", map(local.__getitem__, codes))
+        offsets = array("I", [0])
+        offsets.extend(accumulate(map(len, blobs)))
+        blob = b"".join(blobs)
+        self.columns.append(
+            {
+                "name": name,
+                "type": "dict",
+                "codes": self._block(page_codes, len(page_codes)),
+                "offsets": self._block(offsets, len(offsets)),
+                "bytes": self._block(blob, len(blob)),
+            }
+        )
+
+    def _shifted(self, start: int) -> List[Dict[str, Any]]:
+        # Column specs with block offsets counted from the start of the payload.
+        out = []
+        for col in self.columns:
+            col = dict(col)
+            if "offset" in col:
+                col["offset"] += start
+            for part in ("codes", "offsets", "bytes"):
+                if part in col:
+                    col[part] = {**col[part], "offset": col[part]["offset"] + start}
+            out.append(col)
+        return out
+
+    def payload(self, fields: Dict[str, Any]) -> bytes:
+        # The header holds the block offsets, which depend on its own length:
+        # grow the data start until the header fits before it.
+        start = 16
+        while True:
+            doc = {**fields, "columns": self._shifted(start)}
+            header = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            end = 16 + len(header)
+            if end <= start:
+                break
+            start = end + (-end % ALIGN)
+        header += b" " * (start - end)
+        prefix = MAGIC + array("I", [VERSION, len(header), 0]).tobytes()
+        return b"".join([prefix, header, *self._blocks])
+
+
+def encode_summaries(store: EntryStore, ids: Sequence[int], fields: Dict[str, Any]) -> bytes:
+    """
+    The columns of ``EntryStore.summary`` for ``ids`` as a ``ColumnWriter``
+    payload, with ``fields`` (total, cursor, ...) in its header.
+    ``timingSegments`` becomes one ``float64`` column per phase.
+    """
+    w = ColumnWriter()
+    ids = array("I", ids)
+    url_code = array("I", map(store.url_code.__getitem__, ids))
+    w.numbers("id", "uint32", ids)
+    w.numbers("started_ms", "float64", map(store.started_ms.__getitem__, ids))
+    w.numbers("time", "float64", map(store.time.__getitem__, ids))
+    # int64 in the store; float64 is exact well past any real body size
+    w.numbers("size", "float64", map(float, map(store.size.__getitem__, ids)))
+    w.numbers("status", "int32", map(store.status.__getitem__, ids))
+    for p in PHASES:
+        w.numbers("phase." + p, "float64", map(store.phases[p].__getitem__, ids))
+    w.strings("url", store.urls, url_code)
+    w.strings("host", store.hosts, array("I", map(store.host_code.__getitem__, ids)))
+    w.strings("path", store.paths, array("I", map(store.url_path.__getitem__, url_code)))
+    w.strings("method", store.methods, array("I", map(store.method_code.__getitem__, ids)))
+    w.strings("statusText", store.status_texts, array("I", map(store.status_text_code.__getitem__, ids)))
+    w.strings("mimeType", store.mimes, array("I", map(store.mime_code.__getitem__, ids)))
+    return w.payload({"count": len(ids), **fields})
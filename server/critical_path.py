@@ -0,0 +1,114 @@
+import heapq
+from array import array
+from itertools import islice, repeat
+from operator import add
+from typing import Any, Dict, List, Optional
+
+from server.event_relations import NO_PARENT, EventGraph
+
+MAX_CHAINS = 100
+
+
+class CriticalPaths:
+    """
+    Dependency chains of an ``EventGraph`` and the ones that bound page load.
+
+    A chain runs from a request down the initiator edges to a descendant;
+    its duration is the time from the first request's start to the last
+    one's end. Parents start before their children, so reverse start order
+    is a topological order and one pass of dynamic programming gives, for
+    every request, the latest end in its subtree and the child leading
+    there (``via``). The slowest chain of a subtree follows ``via`` from its
+    root; chains end at requests nothing below them outlasts.
+    """
+
+    def __init__(self, graph: EventGraph):
+        self.graph = graph
+        store = graph.store
+        n = len(graph)
+        order = graph.index.ordered_ids()
+        parent = graph.parent
+        # Only the rows the graph covers; a live capture may have grown since.
+        self.end = array("d", map(add, islice(store.started_ms, n), map(max, islice(store.time, n), repeat(0.0))))
+        latest = array("d", self.end)
+        self.via = array("i", [NO_PARENT]) * n
+        for i in reversed(order):
+            p = parent[i]
+            if p != NO_PARENT and latest[i] > latest[p]:
+                latest[p] = latest[i]
+                self.via[p] = i
+        self.latest = latest
+        self.tree_root = array("I", range(n))
+        for i in order:
+            p = parent[i]
+            if p != NO_PARENT:
+                self.tree_root[i] = self.tree_root[p]
+
+    def nbytes(self) -> int:
+        return 8 * 2 * len(self.end) + 4 * 2 * len(self.via)
+
+    def _subtree(self, root: int) -> List[int]:
+        offsets, child_ids = self.graph.child_offsets, self.graph.child_ids
+        out = [root]
+        k = 0
+        while k < len(out):
+            i = out[k]
+            out.extend(child_ids[offsets[i] : offsets[i + 1]])
+            k += 1
+        return out
+
+    def chains(self, top: int = 10, root: Optional[int] = None) -> Dict[str, Any]:
+        """
+        The ``top`` slowest chains, longest first; with ``root`` only those
+        starting at that request.
+
+        Each chain lists its requests with the time they held it up:
+        ``blocking`` is the part of the chain each one was in flight for
+        (until the next request started, or its own end for the last) and
+        ``idle`` the gap after it finished before the next one started.
+        """
+        graph = self.graph
+        started = graph.store.started_ms
+        end, via = self.end, self.via
+        if root is None:
+            ends = [i for i in range(len(graph)) if via[i] == NO_PARENT]
+            first = self.tree_root.__getitem__
+            span = (min(islice(started, len(graph))), max(self.latest)) if len(graph) else (None, None)
+        else:
+            ends = [i for i in self._subtree(root) if via[i] == NO_PARENT]
+            first = lambda i: root  # noqa: E731
+            span = (started[root], self.latest[root])
+        best = heapq.nlargest(top, ends, key=lambda i: end[i] - started[first(i)])
+        return {
+            "start": span[0],
+            "end": span[1],
+            "candidates": len(ends),
+            "chains": [self._chain(first(i), i) for i in best],
+        }
+
+    def _chain(self, first: int, last: int) -> Dict[str, Any]:
+        graph = self.graph
+        started = graph.store.started_ms
+        end, parent = self.end, graph.parent
+        ids = [last]
+        while ids[-1] != first:
+            ids.append(parent[ids[-1]])
+        ids.reverse()
+        nodes = []
+        for depth, (i, nxt) in enumerate(zip(ids, ids[1:] + [None])):
+            node = graph._node(i, depth)
+            node["end"] = end[i]
+            if nxt is None:
+                node["blocking"] = end[i] - started[i]
+                node["idle"] = 0.0
+            else:
+                node["blocking"] = min(end[i], started[nxt]) - started[i]
+                node["idle"] = max(started[nxt] - end[i], 0.0)
+            nodes.append(node)
+        return {
+            "start": started[first],
+            "end": end[last],
+            "duration": end[last] - started[first],
+            "length": len(ids),
+            "nodes": nodes,
+        }
@@ -0,0 +1,578 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate, chain, compress, groupby, islice
+from operator import add, itemgetter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from server.entry_store import NO_BODY, EntryStore, StringTable, heap_nbytes
+from server.intervals import Coverage, IntervalIndex
+from server.search_index import TrigramIndex, intersect
+
+# Bodies larger than this (in characters) are left out of the body search index.
+BODY_INDEX_MAX_CHARS = 256 * 1024
+_TEXT_MIME_HINTS = ("text", "json", "javascript", "xml", "html", "css")
+# Unions of more posting lists than this, together holding at least 1/4 of
+# all ranks, go through a bitmap instead of a merge.
+UNION_MERGE_LISTS = 64
+UNION_BITMAP_RATIO = 4
+# A live index folds the URL postings appended since its CSR arrays were
+# built back into them once they hold 1/URL_TAIL_RATIO of all ranks.
+URL_TAIL_RATIO = 4
+
+
+class EntryFilter(NamedTuple):
+    """Filter parameters accepted by ``/api/entries``; ``None``/empty means unset."""
+
+    q: Optional[str] = None
+    domain: Optional[str] = None
+    status: Optional[str] = None
+    mime: Optional[str] = None
+    method: Optional[str] = None
+    rtype: Optional[str] = None
+    priority: Optional[str] = None
+    status_min: Optional[int] = None
+    status_max: Optional[int] = None
+    body: bool = False  # let ``q`` also match response body text
+    time_from: Optional[float] = None  # keep entries in flight during [time_from, time_to]
+    time_to: Optional[float] = None
+
+
+def _postings(codes: Any, order: array) -> Dict[int, array]:
+    """Group ranks by the code of the entry at that rank; each posting list is ascending."""
+    by_rank = list(map(codes.__getitem__, order))
+    # Stable sort keeps ranks ascending within each code.
+    perm = sorted(range(len(by_rank)), key=by_rank.__getitem__)
+    out: Dict[int, array] = {}
+    pos = 0
+    for code, n in sorted(Counter(by_rank).items()):
+        out[code] = array("I", perm[pos : pos + n])
+        pos += n
+    return out
+
+
+def _union(lists: List[array], n: int, disjoint: bool = False) -> array:
+    """
+    Ascending union of ascending rank lists over ranks ``0..n-1``.
+
+    A few lists are merged: sorting their concatenation merges the presorted
+    runs, then repeated ranks are dropped (none repeat when the lists are
+    ``disjoint``, e.g. postings of one column). Many lists covering a good
+    part of the ranks (one per matching URL, say) are marked in a bitmap
+    over the ranks instead, which is read back in order.
+    """
+    lists = [ranks for ranks in lists if ranks]
+    if not lists:
+        return array("I")
+    if len(lists) == 1:
+        return lists[0]
+    ranks = array("I")
+    ranks.frombytes(b"".join(lists))
+    if len(lists) <= UNION_MERGE_LISTS or len(ranks) * UNION_BITMAP_RATIO < n:
+        merged = sorted(ranks)
+        return array("I", merged if disjoint else map(itemgetter(0), groupby(merged)))
+    marks = bytearray(n)
+    for r in ranks:
+        marks[r] = 1
+    return array("I", compress(range(n), marks))
+
+
+def _csr_postings(codes: Any, order: array, n_codes: int) -> Tuple[array, array]:
+    """
+    Compact form of ``_postings`` for high-cardinality columns: ranks grouped
+    by code in one array, with ``offsets[c]:offsets[c + 1]`` delimiting code ``c``.
+    """
+    by_rank = list(map(codes.__getitem__, order))
+    ranks = array("I", sorted(range(len(by_rank)), key=by_rank.__getitem__))
+    counts = Counter(by_rank)
+    offsets = array("I", [0]) * (n_codes + 1)
+    total = 0
+    for c in range(n_codes):
+        total += counts.get(c, 0)
+        offsets[c + 1] = total
+    return ranks, offsets
+
+
+def _moved(ranks: Any, remap: array, lo: int) -> Any:
+    # Ascending ``ranks`` through ``remap``, which leaves ranks below ``lo`` where they are.
+    k = bisect_left(ranks, lo)
+    if k == len(ranks):
+        return ranks
+    out = array("I", ranks[:k])
+    out.extend(map(remap.__getitem__, ranks[k:]))
+    return out
+
+
+def _extend_postings(
+    postings: Dict[Any, array], codes: Any, added: Sequence[Tuple[int, int]], remap: Optional[array], lo: int
+) -> Dict[Any, array]:
+    """
+    ``postings`` with old ranks moved by ``remap`` (from rank ``lo`` on) and
+    the ``(rank, id)`` pairs of ``added`` (ascending ranks) filed under their
+    code. Lists that neither move nor grow are shared.
+    """
+    if remap is None:
+        out = dict(postings)
+    else:
+        out = {c: _moved(ranks, remap, lo) for c, ranks in postings.items()}
+    grown: Dict[Any, List[int]] = {}
+    for r, i in added:
+        grown.setdefault(codes[i], []).append(r)
+    for c, ranks in grown.items():
+        old = out.get(c, ())
+        if not old or old[-1] < ranks[0]:
+            merged = array("I", old)
+            merged.extend(ranks)
+        else:
+            merged = array("I", sorted(chain(old, ranks)))
+        out[c] = merged
+    return out
+
+
+def _extend_csr(
+    ranks: array, offsets: array, codes: Any, added: Sequence[Tuple[int, int]], remap: Optional[array], n_codes: int
+) -> Tuple[array, array]:
+    """``_extend_postings`` for the CSR form of ``_csr_postings``, over ``n_codes`` codes."""
+    if remap is not None:
+        ranks = array("I", map(remap.__getitem__, ranks))
+    grown: Dict[int, List[int]] = {}
+    for r, i in added:
+        grown.setdefault(codes[i], []).append(r)
+    # Codes first seen among the new rows have empty ranges so far.
+    offs = array("I", offsets)
+    offs.extend([offs[-1]] * (n_codes + 1 - len(offs)))
+    out_ranks = array("I")
+    out_offsets = array("I", [0])
+    prev = shift = 0
+    for c in sorted(grown):
+        # Codes ``prev .. c - 1`` only move by the rows added before them.
+        out_ranks.extend(ranks[offs[prev] : offs[c]])
+        out_offsets.extend(offs[prev + 1 : c + 1] if not shift else (o + shift for o in offs[prev + 1 : c + 1]))
+        out_ranks.extend(sorted(chain(ranks[offs[c] : offs[c + 1]], grown[c])))
+        shift += len(grown[c])
+        out_offsets.append(offs[c + 1] + shift)
+        prev = c + 1
+    out_ranks.extend(ranks[offs[prev] :])
+    out_offsets.extend(o + shift for o in offs[prev + 1 :])
+    return out_ranks, out_offsets
+
+
+def _appended_postings(
+    postings: Dict[Any, array], codes: Any, added: Sequence[Tuple[int, int]], grow: List[Tuple[array, List[int]]]
+) -> Dict[Any, array]:
+    """
+    File the ``(rank, id)`` pairs of ``added``, ranked after everything in
+    ``postings``, under their code: the ranks to append to existing lists
+    go to ``grow``; lists for new codes are returned.
+    """
+    grown: Dict[Any, List[int]] = {}
+    for r, i in added:
+        grown.setdefault(codes[i], []).append(r)
+    new: Dict[Any, array] = {}
+    for c, ranks in grown.items():
+        old = postings.get(c)
+        if old is None:
+            new[c] = array("I", ranks)
+        else:
+            grow.append((old, ranks))
+    return new
+
+
+class EntryIndex:
+    """
+    Filter indexes over an ``EntryStore``, built once per load.
+
+    Entries are addressed by *rank* — their position in start-time order —
+    so every posting list is already sorted for display and a filtered page
+    is a slice of the combined posting list.
+
+    A ``growable`` index (a live capture) may share its arrays with the
+    indexes ``extend`` derives from it, which append ranks past its own
+    ``size``; it cuts every list it reads back to ``size`` and hands out
+    copies only.
+    """
+
+    POSTINGS = ("host", "mime", "method", "rtype", "priority", "status")
+
+    def __init__(self, store: EntryStore, growable: bool = False):
+        self.store = store
+        n = len(store)
+        started = store.started_ms
+        # Stable: ties keep HAR order, same as sorting the filtered list by started_ms.
+        self.order = array("I", sorted(range(n), key=started.__getitem__))
+        self.host = _postings(store.host_code, self.order)
+        self.mime = _postings(store.mime_code, self.order)
+        self.method = _postings(store.method_code, self.order)
+        self.rtype = _postings(store.type_code, self.order)
+        self.priority = _postings(store.priority_code, self.order)
+        self.status = _postings(store.status, self.order)
+        self.status_values = sorted(self.status)
+        # Inverse permutation: entry id -> rank.
+        self.rank = array("I", sorted(range(n), key=self.order.__getitem__))
+        self.url_ranks, self.url_offsets = _csr_postings(store.url_code, self.order, len(store.urls))
+        self._init_rows(n, len(store.urls), growable)
+        self._init_search()
+
+    @classmethod
+    def restore(cls, store: EntryStore, arrays: Dict[str, Any], postings: Dict[str, Dict[int, Any]]) -> "EntryIndex":
+        """Rebuild an index from previously persisted parts (see ``server.capture_cache``)."""
+        index = cls.__new__(cls)
+        index.store = store
+        for name in ("order", "rank", "url_ranks", "url_offsets"):
+            setattr(index, name, arrays[name])
+        for name in cls.POSTINGS:
+            setattr(index, name, postings[name])
+        index.status_values = sorted(index.status)
+        index._init_rows(len(index.order), len(index.url_offsets) - 1, False)
+        index._init_search()
+        return index
+
+    def _init_rows(self, n: int, n_urls: int, growable: bool) -> None:
+        self.size = n
+        self.growable = growable
+        # URL postings of ranks from ``url_base`` on, appended by ``extend``
+        # after the CSR arrays were built; URL codes below ``url_count`` are covered.
+        self.url_base = n
+        self.url_tail: Dict[int, array] = {}
+        self.url_count = n_urls
+        # Entry count before the latest ``extend`` that moved indexed rows (see ``first_rows``).
+        self.moved_at = -1
+        self._extended = False
+
+    def extend(self) -> "EntryIndex":
+        """
+        Index over the store after rows were appended to it, derived from
+        this one, which is left as it was for requests still using it.
+
+        When every new row starts after the indexed ones, as is usual for a
+        capture recorded live, the new ranks simply follow the old ones:
+        a growable index appends them to the arrays it shares with the new
+        index (URL postings go to a tail that is folded into the CSR arrays
+        once it holds 1/``URL_TAIL_RATIO`` of the ranks). Otherwise only the
+        new rows are sorted, then merged into a copy of the order, and old
+        ranks in copies of the posting lists are moved past the new rows
+        that start before them. The URL search index carries over; the
+        time-range and body search indexes are rebuilt on first use. Only
+        the latest index of a capture can be extended.
+        """
+        store = self.store
+        old, n = self.size, len(store)
+        if self._extended:
+            raise ValueError("index was extended already")
+        started = store.started_ms
+        new_ids = sorted(range(old, n), key=started.__getitem__)
+        if self.growable and not (old and new_ids and started[new_ids[0]] < started[self.order[-1]]):
+            index = self._appended(new_ids)
+        else:
+            index = self._merged(new_ids)
+        with self._lock:
+            search = self._url_search
+        if search is not None:
+            urls = store.urls
+            index._url_search = search.extended((c, urls[c]) for c in range(self.url_count, index.url_count))
+        self._extended = True
+        return index
+
+    def _appended(self, new_ids: List[int]) -> "EntryIndex":
+        # ``extend`` for new rows that all sort after the indexed ones.
+        store = self.store
+        old, n = self.size, len(store)
+        added = list(zip(range(old, n), new_ids))
+        index = EntryIndex.__new__(EntryIndex)
+        index.store = store
+        index._init_rows(n, len(store.urls), True)
+        index.moved_at = self.moved_at
+        # Lists are grown in place and cut back should any of that fail; new
+        # lists are filed once all of it succeeded.
+        grow: List[Tuple[array, List[int]]] = []
+        new: List[Tuple[Dict[Any, array], Dict[Any, array]]] = []
+        for name, codes in (
+            ("host", store.host_code),
+            ("mime", store.mime_code),
+            ("method", store.method_code),
+            ("rtype", store.type_code),
+            ("priority", store.priority_code),
+            ("status", store.status),
+        ):
+            postings = dict(getattr(self, name))
+            new.append((postings, _appended_postings(postings, codes, added, grow)))
+            setattr(index, name, postings)
+        if (n - self.url_base) * URL_TAIL_RATIO > n:
+            tail = [(r, self.order[r]) for r in range(self.url_base, old)] + added
+            index.url_ranks, index.url_offsets = _extend_csr(
+                self.url_ranks, self.url_offsets, store.url_code, tail, None, index.url_count
+            )
+        else:
+            index.url_ranks, index.url_offsets = self.url_ranks, self.url_offsets
+            index.url_base, index.url_tail = self.url_base, self.url_tail
+            new.append((index.url_tail, _appended_postings(index.url_tail, store.url_code, added, grow)))
+        rank = array("I", [0]) * (n - old)
+        for r, i in added:
+            rank[i - old] = r
+        grow.append((self.rank, rank))
+        grow.append((self.order, new_ids))
+        done: List[Tuple[array, int]] = []
+        try:
+            for ranks, values in grow:
+                done.append((ranks, len(ranks)))
+                ranks.extend(values)
+        except BaseException:
+            for ranks, k in done:
+                del ranks[k:]
+            raise
+        for postings, lists in new:
+            postings.update(lists)
+        index.status_values = sorted(index.status)
+        index.order, index.rank = self.order, self.rank
+        index._init_search()
+        return index
+
+    def _merged(self, new_ids: List[int]) -> "EntryIndex":
+        # ``extend`` into copies, for new rows that start before indexed ones.
+        store = self.store
+        old, n = self.size, len(store)
+        started = store.started_ms
+        remap: Optional[array] = None
+        if old and new_ids and started[new_ids[0]] < started[self.order[-1]]:
+            # bisect_right: on equal start times new rows follow the indexed ones (HAR order).
+            pos = []
+            p = 0
+            for i in new_ids:
+                p = bisect_right(self.order, started[i], p, key=started.__getitem__)
+                pos.append(p)
+            # Old ranks from ``lo`` on move up by the new rows inserted at or before them.
+            lo = pos[0]
+            inserted = [0] * (old - lo + 1)
+            for p in pos:
+                inserted[p - lo] += 1
+            remap = array("I", range(lo))
+            remap.extend(map(add, range(lo, old), accumulate(inserted[: old - lo])))
+        else:
+            lo = old
+            pos = [old] * len(new_ids)
+        added = [(p + k, i) for k, (p, i) in enumerate(zip(pos, new_ids))]
+
+        index = EntryIndex.__new__(EntryIndex)
+        index.store = store
+        order = array("I")
+        prev = 0
+        for p, i in zip(pos, new_ids):
+            order.extend(self.order[prev:p])
+            order.append(i)
+            prev = p
+        order.extend(self.order[prev:])
+        index.order = order
+        rank = array("I", self.rank)
+        if remap is not None:
+            for r in range(lo, old):
+                rank[self.order[r]] = remap[r]
+        new_rank = array("I", [0]) * (n - old)
+        for r, i in added:
+            new_rank[i - old] = r
+        rank.extend(new_rank)
+        index.rank = rank
+        for name, codes in (
+            ("host", store.host_code),
+            ("mime", store.mime_code),
+            ("method", store.method_code),
+            ("rtype", store.type_code),
+            ("priority", store.priority_code),
+            ("status", store.status),
+        ):
+            setattr(index, name, _extend_postings(getattr(self, name), codes, added, remap, lo))
+        index.status_values = sorted(index.status)
+        n_urls = len(store.urls)
+        url_ranks, url_offsets = self.url_ranks, self.url_offsets
+        if self.url_tail:
+            tail = [(r, self.order[r]) for r in range(self.url_base, old)]
+            url_ranks, url_offsets = _extend_csr(url_ranks, url_offsets, store.url_code, tail, None, self.url_count)
+        index.url_ranks, index.url_offsets = _extend_csr(url_ranks, url_offsets, store.url_code, added, remap, n_urls)
+        index._init_rows(n, n_urls, self.growable)
+        index.moved_at = old if remap is not None else self.moved_at
+        index._init_search()
+        return index
+
+    def _init_search(self) -> None:
+        self._lock = threading.Lock()
+        self._url_search: Optional[TrigramIndex] = None
+        self._body_search: Optional[TrigramIndex] = None
+        self._body_ranks: Dict[int, array] = {}
+        self._body_thread: Optional[threading.Thread] = None
+        self._lifetimes: Optional[IntervalIndex] = None
+        self._host_lifetimes: Dict[int, Coverage] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the index (not counting lazily built search indexes)."""
+        total = sum(heap_nbytes(v) for v in (self.order, self.rank, self.url_ranks, self.url_offsets))
+        for postings in [getattr(self, name) for name in self.POSTINGS] + [self.url_tail]:
+            total += sum(heap_nbytes(p) for p in postings.values())
+        return total
+
+    def ids(self, ranks: Any) -> List[int]:
+        order = self.order
+        return [order[r] for r in ranks]
+
+    def _covered(self, ranks: Any) -> Any:
+        # Lists of a growable index may go on past its own ranks (see ``extend``).
+        return ranks[: bisect_left(ranks, self.size)] if self.growable else ranks
+
+    def posting(self, postings: Dict[Any, array], code: Any) -> Sequence[int]:
+        """Ranks under ``code`` in ``postings`` (``host``, ``mime``, ...), ascending."""
+        return self._covered(postings.get(code, ()))
+
+    def url_posting(self, code: int) -> List[Sequence[int]]:
+        """Ranks of the requests to URL ``code``, as ascending runs (CSR part, then tail)."""
+        offsets = self.url_offsets
+        runs: List[Sequence[int]] = []
+        if code < len(offsets) - 1:
+            runs.append(self.url_ranks[offsets[code] : offsets[code + 1]])
+        tail = self.url_tail.get(code)
+        if tail:
+            runs.append(self._covered(tail))
+        return runs
+
+    def ordered_ids(self) -> Sequence[int]:
+        """Entry ids in start-time order (``order`` cut to this index)."""
+        return self.order[: self.size] if self.growable else self.order
+
+    def first_rows(self, ranks: Any, rows: int) -> Any:
+        """
+        The ascending ``ranks`` of entries ``0..rows-1``: the rows indexed
+        when a live capture had ``rows`` entries, still in start-time order.
+        """
+        if rows >= self.size:
+            return ranks
+        if self.moved_at < rows:
+            # Every row appended since starts after them, so they keep their ranks.
+            return ranks[: bisect_left(ranks, rows)]
+        order = self.order
+        return array("I", [r for r in ranks if order[r] < rows])
+
+    def _by_table(self, postings: Dict[int, array], table: StringTable, pred: Callable[[Any], bool]) -> array:
+        lists = [self._covered(postings[c]) for c, v in enumerate(table.values) if c in postings and pred(v)]
+        return _union(lists, self.size, True)
+
+    def url_search(self) -> TrigramIndex:
+        """Trigram index over distinct URLs, built on first use."""
+        with self._lock:
+            if self._url_search is None:
+                urls = self.store.urls.values
+                # Only the URLs this index covers; a live capture may have added more since.
+                self._url_search = TrigramIndex(islice(enumerate(urls), self.url_count), urls.__getitem__)
+            return self._url_search
+
+    def lifetimes(self) -> IntervalIndex:
+        """
+        Request lifetimes ``[started_ms, started_ms + time]`` addressed by rank,
+        built on first use (``Capture.load`` warms it in the background).
+        """
+        with self._lock:
+            if self._lifetimes is None:
+                store = self.store
+                started, durations = store.started_ms, store.time
+                order = self.ordered_ids()
+                starts = list(map(started.__getitem__, order))
+                ends = [s + max(durations[i], 0.0) for s, i in zip(starts, order)]
+                self._lifetimes = IntervalIndex(starts, ends)
+            return self._lifetimes
+
+    def host_lifetimes(self, code: int) -> Coverage:
+        """Lifetimes of the requests to one host (by host code), built on first use."""
+        lifetimes = self.lifetimes()
+        with self._lock:
+            cov = self._host_lifetimes.get(code)
+            if cov is None:
+                ranks = self.posting(self.host, code)
+                cov = self._host_lifetimes[code] = Coverage(map(lifetimes.start, ranks), map(lifetimes.end, ranks))
+            return cov
+
+    def start_body_index(self) -> None:
+        """Build the response-body search index in a background thread (once)."""
+        with self._lock:
+            if self._body_thread is None:
+                self._body_thread = threading.Thread(target=self._build_body_index, daemon=True)
+                self._body_thread.start()
+
+    @property
+    def body_index_ready(self) -> bool:
+        return self._body_search is not None
+
+    def _body_docs(self, groups: Dict[int, List[int]]):
+        # Each distinct body is indexed once; ``groups`` collects, per body,
+        # the ranks of the text-typed entries carrying it.
+        store = self.store
+        texty = {c for c, m in enumerate(store.mimes.values) if any(h in (m or "").lower() for h in _TEXT_MIME_HINTS)}
+        body_code, mime_code = store.body_code, store.mime_code
+        for r, i in enumerate(islice(self.order, self.size)):
+            c = body_code[i]
+            if c != NO_BODY and mime_code[i] in texty:
+                groups.setdefault(c, []).append(r)
+        for c in groups:
+            owner = store.body_owner[c]
+            content = (store.raw(owner, with_body=False).get("response") or {}).get("content") or {}
+            if content.get("encoding") == "base64":
+                continue
+            text = store.body_text(owner)
+            if isinstance(text, str) and text and len(text) <= BODY_INDEX_MAX_CHARS:
+                yield c, text
+
+    def _build_body_index(self) -> None:
+        store = self.store
+        groups: Dict[int, List[int]] = {}
+        search = TrigramIndex(self._body_docs(groups), lambda c: store.body_text(store.body_owner[c]) or "")
+        self._body_ranks = {c: array("I", groups[c]) for c in search.doc_ids}
+        self._body_search = search
+
+    def _keyword(self, q: str, body: bool) -> array:
+        store = self.store
+        ql = q.lower()
+        parts = [run for c in self.url_search().search(ql) for run in self.url_posting(c)]
+        parts.extend(self.posting(self.mime, c) for c, m in enumerate(store.mimes.values) if c in self.mime and ql in (m or "").lower())
+        parts.extend(self.posting(self.status, s) for s in self.status_values if ql in str(s))
+        if body and self._body_search is not None:
+            parts.extend(self._body_ranks[c] for c in self._body_search.search(ql))
+        return _union(parts, self.size)
+
+    def filter(self, f: EntryFilter) -> Optional[array]:
+        """
+        Ranks of entries matching ``f`` in start-time order, or ``None`` when
+        no filter is set (every rank matches).
+        """
+        store = self.store
+        parts: List[array] = []
+        if f.q:
+            parts.append(self._keyword(f.q, f.body))
+        if f.domain:
+            code = store.hosts.code_of(f.domain)
+            parts.append(self.posting(self.host, code) if code is not None else array("I"))
+        if f.status:
+            try:
+                value = int(f.status)
+            except ValueError:
+                value = None
+            hit = value is not None and str(value) == str(f.status)
+            parts.append(self.posting(self.status, value) if hit else array("I"))
+        if f.status_min is not None or f.status_max is not None:
+            values = self.status_values
+            lo = bisect_left(values, f.status_min) if f.status_min is not None else 0
+            hi = bisect_right(values, f.status_max) if f.status_max is not None else len(values)
+            parts.append(_union([self._covered(self.status[v]) for v in values[lo:hi]], self.size, True))
+        if f.mime:
+            parts.append(self._by_table(self.mime, store.mimes, lambda v: (v or "") == f.mime))
+        if f.method:
+            parts.append(self._by_table(self.method, store.methods, lambda v: (v or "") == f.method))
+        if f.rtype:
+            parts.append(self._by_table(self.rtype, store.resource_types, lambda v: (v or "") == f.rtype))
+        if f.priority:
+            parts.append(self._by_table(self.priority, store.priorities, lambda v: str(v or "") == str(f.priority)))
+        if f.time_from is not None or f.time_to is not None:
+            a = f.time_from if f.time_from is not None else float("-inf")
+            b = f.time_to if f.time_to is not None else float("inf")
+            parts.append(array("I", self.lifetimes().overlapping(a, b)))
+        if not parts:
+            return None
+        return intersect(parts)
@@ -0,0 +1,498 @@
+import hashlib
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from server.fast_json import dumps, json_num, json_str, orjson
+from server.raw_entries import CHUNK_BYTES, RawEntryReader
+
+PHASES = ("blocked", "dns", "connect", "ssl", "send", "wait", "receive")
+
+# Bodies at least this long get their own byte span so they can be read
+# without decoding the rest of the entry (and vice versa).
+TEXT_SPAN_MIN = 16 * 1024
+
+NO_BODY = -1
+
+# One ``summary`` row as JSON, filled with pre-encoded literals.
+_SUMMARY_ROW = (
+    '{"id":%s,"url":%s,"host":%s,"path":%s,"method":%s,"status":%s,"statusText":%s,"mimeType":%s,'
+    '"time":%s,"size":%s,"started_ms":%s,"timingSegments":{' + ",".join(f'"{p}":%s' for p in PHASES) + "}}"
+)
+
+
+class StringTable:
+    """Dictionary encoding: each distinct value is stored once and referenced by an integer code."""
+
+    def __init__(self, values: Optional[Sequence[Any]] = None) -> None:
+        self.values: Sequence[Any] = values if values is not None else []
+        # Reverse lookup, built on demand for tables restored from disk.
+        self._codes: Optional[Dict[Any, int]] = None if values is not None else {}
+        # Heap size of the values, kept up to date by ``intern`` once counted.
+        self._value_bytes: Optional[int] = None if values is not None else 0
+
+    def _reverse(self) -> Dict[Any, int]:
+        if self._codes is None:
+            self._codes = {v: c for c, v in enumerate(self.values)}
+        return self._codes
+
+    def intern(self, value: Any) -> int:
+        codes = self._reverse()
+        code = codes.get(value)
+        if code is None:
+            code = len(self.values)
+            codes[value] = code
+            self.values.append(value)
+            if self._value_bytes is not None:
+                self._value_bytes += sys.getsizeof(value)
+        return code
+
+    def truncate(self, n: int) -> None:
+        """Forget the values with codes ``n`` and later."""
+        codes = self._reverse()
+        for value in self.values[n:]:
+            del codes[value]
+        del self.values[n:]
+        self._value_bytes = None
+
+    def code_of(self, value: Any) -> Optional[int]:
+        return self._reverse().get(value)
+
+    def __getitem__(self, code: int) -> Any:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The reverse lookup is rebuilt on demand; no need to ship it between processes.
+        return {"values": self.values}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.values = state["values"]
+        self._codes = None
+        self._value_bytes = None
+
+    def nbytes(self) -> int:
+        if not isinstance(self.values, list):
+            # Packed / memory-mapped values are not on the Python heap.
+            return sys.getsizeof(self._codes) if self._codes is not None else 0
+        if self._value_bytes is None:
+            self._value_bytes = sum(sys.getsizeof(v) for v in self.values)
+        return self._value_bytes + sys.getsizeof(self._codes) + sys.getsizeof(self.values)
+
+
+def heap_nbytes(col: Any) -> int:
+    """Size of a column if it lives on the heap; memory-mapped views count as zero."""
+    return col.itemsize * len(col) if isinstance(col, array) else 0
+
+
+def _to_int(v: Any) -> int:
+    try:
+        return int(v) if v is not None else 0
+    except Exception:
+        return 0
+
+
+def _split_url(url: str):
+    try:
+        p = urlparse(url)
+        return p.netloc, p.path
+    except Exception:
+        return "", ""
+
+
+class EntryRow:
+    """
+    Read-only, dict-like view of one entry in an ``EntryStore``.
+
+    Supports ``get``/``[]`` with the same keys as a normalized entry dict so
+    code written against the dict form keeps working.
+    """
+
+    __slots__ = ("_store", "id")
+
+    def __init__(self, store: "EntryStore", i: int):
+        self._store = store
+        self.id = i
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = _ROW_GETTERS.get(key)
+        if getter is None:
+            return default
+        return getter(self._store, self.id)
+
+    def __getitem__(self, key: str) -> Any:
+        getter = _ROW_GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self._store, self.id)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _ROW_GETTERS
+
+    def keys(self):
+        return _ROW_GETTERS.keys()
+
+    def summary(self) -> Dict[str, Any]:
+        return self._store.summary(self.id)
+
+    def raw(self, with_body: bool = True) -> Dict[str, Any]:
+        return self._store.raw(self.id, with_body)
+
+    def body_digest(self) -> Optional[str]:
+        return self._store.body_digest(self.id)
+
+
+class EntryStore:
+    """
+    Columnar storage for normalized HAR entries.
+
+    Numeric fields live in typed arrays, low-cardinality strings are
+    dictionary-encoded through ``StringTable``. Host and path are split out
+    of the URL once at insert time. Rows are addressed by entry id, which is
+    the index of the entry in the original HAR.
+
+    With a ``reader`` the original HAR entries are not kept in memory; only
+    their byte offsets in the spooled file are recorded and entries are
+    decoded on demand.
+
+    Response bodies are content-addressed: ``body_code`` maps each entry to
+    a distinct body (``NO_BODY`` if it has none), keyed by a digest of its
+    text and encoding, with the body's UTF-8 length and the first entry
+    holding it. Without a reader, repeated bodies share one string.
+    """
+
+    def __init__(self, reader: Optional[RawEntryReader] = None) -> None:
+        self.started_ms = array("d")
+        self.time = array("d")
+        self.size = array("q")
+        self.status = array("i")
+        self.phases: Dict[str, array] = {p: array("d") for p in PHASES}
+
+        self.urls = StringTable()
+        self.hosts = StringTable()
+        self.paths = StringTable()
+        self.methods = StringTable()
+        self.status_texts = StringTable()
+        self.mimes = StringTable()
+        self.resource_types = StringTable()
+        self.priorities = StringTable()
+
+        self.url_code = array("I")
+        self.host_code = array("I")
+        # Per distinct URL: host and path codes, parsed once.
+        self.url_host = array("I")
+        self.url_path = array("I")
+        self.method_code = array("I")
+        self.status_text_code = array("I")
+        self.mime_code = array("I")
+        self.type_code = array("I")
+        self.priority_code = array("I")
+
+        # Sparse: most entries have no initiator.
+        self.initiators: Dict[int, Any] = {}
+
+        self.reader = reader
+        self.raw_start = array("q")
+        self.raw_end = array("q")
+        self.text_spans: Dict[int, Tuple[int, int]] = {}
+        # Only used without a reader (entries normalized from an in-memory HAR).
+        self.raws: List[Any] = []
+
+        self.body_code = array("i")
+        # Per distinct body: digest, UTF-8 length and first entry holding it.
+        self.body_digests = StringTable()
+        self.body_bytes = array("q")
+        self.body_owner = array("I")
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict[str, Any]]) -> "EntryStore":
+        store = cls()
+        for e in entries:
+            store.append(e)
+        return store
+
+    def append(self, entry: Dict[str, Any], span: Optional[Tuple[int, int]] = None) -> int:
+        """
+        Add one normalized entry (as produced by ``EntryNormalizer``); returns its id.
+
+        ``span`` is the entry's byte range in the reader's file; when given,
+        ``entry["_raw"]`` is not retained.
+        """
+        i = len(self.started_ms)
+        url = entry.get("url") or ""
+        self.started_ms.append(float(entry.get("started_ms") or 0.0))
+        self.time.append(float(entry.get("time") or 0.0))
+        self.size.append(_to_int(entry.get("size")))
+        self.status.append(_to_int(entry.get("status")))
+        segs = entry.get("timingSegments") or {}
+        for p in PHASES:
+            self.phases[p].append(float(segs.get(p) or 0.0))
+
+        code = self.urls.code_of(url)
+        if code is None:
+            code = self.urls.intern(url)
+            host, path = _split_url(url)
+            self.url_host.append(self.hosts.intern(host))
+            self.url_path.append(self.paths.intern(path))
+        self.url_code.append(code)
+        self.host_code.append(self.url_host[code])
+        self.method_code.append(self.methods.intern(entry.get("method")))
+        self.status_text_code.append(self.status_texts.intern(entry.get("statusText")))
+        self.mime_code.append(self.mimes.intern(entry.get("mimeType")))
+        self.type_code.append(self.resource_types.intern(entry.get("resourceType")))
+        self.priority_code.append(self.priorities.intern(entry.get("priority")))
+
+        initiator = entry.get("initiator")
+        if initiator is not None:
+            self.initiators[i] = initiator
+        raw = entry.get("_raw") or {}
+        content = (raw.get("response") or {}).get("content") or {}
+        text = content.get("text")
+        owner = self._add_body(i, text, content.get("encoding"))
+        if span is not None and self.reader is not None:
+            start, end = span
+            self.raw_start.append(start)
+            self.raw_end.append(end)
+            if isinstance(text, str) and len(text) >= TEXT_SPAN_MIN:
+                text_span = self.reader.locate_text(start, end, text)
+                if text_span is not None:
+                    self.text_spans[i] = text_span
+        else:
+            if owner != i:
+                # Same body as an earlier entry: keep only its copy.
+                content["text"] = self.raws[owner]["response"]["content"]["text"]
+            self.raws.append(entry.get("_raw"))
+        return i
+
+    def _add_body(self, i: int, text: Any, encoding: Any) -> int:
+        # Record the body of entry ``i``; returns the first entry with the same body.
+        if not isinstance(text, str):
+            self.body_code.append(NO_BODY)
+            return i
+        data = text.encode("utf-8", errors="surrogatepass")
+        digest = hashlib.blake2b(data, digest_size=16, person=b"base64" if encoding == "base64" else b"").hexdigest()
+        code = self.body_digests.code_of(digest)
+        if code is None:
+            code = self.body_digests.intern(digest)
+            self.body_bytes.append(len(data))
+            self.body_owner.append(i)
+        self.body_code.append(code)
+        return self.body_owner[code]
+
+    def extend(self, other: "EntryStore") -> None:
+        """
+        Append all rows of ``other`` (built over the same file, e.g. by another
+        process). Codes are re-interned in first-occurrence order, so the
+        result is identical to appending the rows one by one.
+        """
+        offset = len(self)
+        for name in ("started_ms", "time", "size", "status", "raw_start", "raw_end"):
+            getattr(self, name).extend(getattr(other, name))
+        for p in PHASES:
+            self.phases[p].extend(other.phases[p])
+
+        url_map = array("I")
+        for c, url in enumerate(other.urls.values):
+            code = self.urls.code_of(url)
+            if code is None:
+                code = self.urls.intern(url)
+                self.url_host.append(self.hosts.intern(other.hosts[other.url_host[c]]))
+                self.url_path.append(self.paths.intern(other.paths[other.url_path[c]]))
+            url_map.append(code)
+        self.url_code.extend(map(url_map.__getitem__, other.url_code))
+        self.host_code.extend(map(self.url_host.__getitem__, self.url_code[offset:]))
+        for table, codes in (
+            ("methods", "method_code"),
+            ("status_texts", "status_text_code"),
+            ("mimes", "mime_code"),
+            ("resource_types", "type_code"),
+            ("priorities", "priority_code"),
+        ):
+            mapping = [getattr(self, table).intern(v) for v in getattr(other, table).values]
+            getattr(self, codes).extend(map(mapping.__getitem__, getattr(other, codes)))
+
+        body_map = array("i")
+        for c, digest in enumerate(other.body_digests.values):
+            code = self.body_digests.code_of(digest)
+            if code is None:
+                code = self.body_digests.intern(digest)
+                self.body_bytes.append(other.body_bytes[c])
+                self.body_owner.append(other.body_owner[c] + offset)
+            body_map.append(code)
+        self.body_code.extend(NO_BODY if c == NO_BODY else body_map[c] for c in other.body_code)
+
+        self.initiators.update((i + offset, v) for i, v in other.initiators.items())
+        self.text_spans.update((i + offset, v) for i, v in other.text_spans.items())
+        self.raws.extend(other.raws)
+
+    def truncate(self, n: int) -> None:
+        """
+        Drop rows ``n`` and later, e.g. after a failed append. Values they
+        interned stay in the string tables (codes no row refers to); bodies
+        they introduced are forgotten, so a later row does not point to them.
+        """
+        for name in ("started_ms", "time", "size", "status", "url_code", "host_code", "method_code", "status_text_code",
+                     "mime_code", "type_code", "priority_code", "body_code", "raw_start", "raw_end", "raws"):
+            del getattr(self, name)[n:]
+        for p in PHASES:
+            del self.phases[p][n:]
+        for rows in (self.initiators, self.text_spans):
+            for i in [i for i in rows if i >= n]:
+                del rows[i]
+        # Owners only grow with the body code, so the new bodies are a suffix.
+        keep = bisect_left(self.body_owner, n)
+        self.body_digests.truncate(keep)
+        del self.body_bytes[keep:], self.body_owner[keep:]
+
+    def __len__(self) -> int:
+        return len(self.started_ms)
+
+    def __getitem__(self, i: int) -> EntryRow:
+        if i < 0 or i >= len(self.started_ms):
+            raise IndexError(i)
+        return EntryRow(self, i)
+
+    def __iter__(self) -> Iterator[EntryRow]:
+        for i in range(len(self.started_ms)):
+            yield EntryRow(self, i)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store (columns and string tables)."""
+        total = 0
+        for v in vars(self).values():
+            if isinstance(v, StringTable):
+                total += v.nbytes()
+            else:
+                total += heap_nbytes(v)
+        total += sum(heap_nbytes(col) for col in self.phases.values())
+        total += sys.getsizeof(self.initiators) + sys.getsizeof(self.text_spans)
+        return total
+
+    def url(self, i: int) -> str:
+        return self.urls[self.url_code[i]]
+
+    def host(self, i: int) -> str:
+        return self.hosts[self.host_code[i]]
+
+    def raw(self, i: int, with_body: bool = True) -> Dict[str, Any]:
+        """
+        Original HAR entry ``i``.
+
+        With ``with_body=False`` a large ``response.content.text`` may be left
+        out (``None``); fetch it separately with ``body_text``.
+        """
+        if self.reader is None:
+            return self.raws[i] or {}
+        return self.reader.entry(self.raw_start[i], self.raw_end[i], self.text_spans.get(i), with_body)
+
+    def body_digest(self, i: int) -> Optional[str]:
+        """Digest of entry ``i``'s body in the body table (``None`` without a body)."""
+        code = self.body_code[i]
+        return self.body_digests[code] if code != NO_BODY else None
+
+    def body_text(self, i: int) -> Optional[str]:
+        """``response.content.text`` of entry ``i``, decoding only its own slice when possible."""
+        span = self.text_spans.get(i)
+        if span is not None:
+            return self.reader.text(span)
+        content = (self.raw(i).get("response") or {}).get("content") or {}
+        return content.get("text")
+
+    def body_chunks(self, i: int, pos: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        ``response.content.text`` of entry ``i`` in pieces, as
+        ``(resume position, text)`` pairs; pass a yielded position back as
+        ``pos`` to continue from there. Large bodies are decoded from their
+        own slice of the file a chunk at a time.
+        """
+        span = self.text_spans.get(i)
+        if span is not None:
+            yield from self.reader.text_chunks(span, pos)
+            return
+        text = self.body_text(i)
+        if text is None:
+            return
+        step = CHUNK_BYTES
+        for k in range(pos or 0, len(text), step):
+            yield k + step, text[k : k + step]
+
+    def summaries_json(self, ids: Sequence[int]) -> str:
+        """
+        JSON array of ``summary(i)`` for ``ids``. orjson serializes the
+        summary dicts faster than anything built here; without it the rows
+        come from ``_summaries_from_columns``.
+        """
+        if orjson is not None:
+            return dumps(list(map(self.summary, ids))).decode("utf-8")
+        return self._summaries_from_columns(ids)
+
+    def _summaries_from_columns(self, ids: Sequence[int]) -> str:
+        # Values are turned into JSON literals column by column and dropped
+        # into a per-row template, without building any dicts.
+        url_code = list(map(self.url_code.__getitem__, ids))
+        methods = list(map(json_str, self.methods.values))
+        status_texts = list(map(json_str, self.status_texts.values))
+        mimes = list(map(json_str, self.mimes.values))
+        cols = [
+            map(str, ids),
+            map(json_str, map(self.urls.__getitem__, url_code)),
+            map(json_str, map(self.hosts.__getitem__, map(self.host_code.__getitem__, ids))),
+            map(json_str, map(self.paths.__getitem__, map(self.url_path.__getitem__, url_code))),
+            map(methods.__getitem__, map(self.method_code.__getitem__, ids)),
+            map(str, map(self.status.__getitem__, ids)),
+            map(status_texts.__getitem__, map(self.status_text_code.__getitem__, ids)),
+            map(mimes.__getitem__, map(self.mime_code.__getitem__, ids)),
+            map(json_num, map(self.time.__getitem__, ids)),
+            map(str, map(self.size.__getitem__, ids)),
+            map(json_num, map(self.started_ms.__getitem__, ids)),
+        ]
+        cols.extend(map(json_num, map(self.phases[p].__getitem__, ids)) for p in PHASES)
+        return "[" + ",".join(map(_SUMMARY_ROW.__mod__, zip(*cols))) + "]"
+
+    def timing_segments(self, i: int) -> Dict[str, float]:
+        return {p: col[i] for p, col in self.phases.items()}
+
+    def summary(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": i,
+            "url": self.urls[self.url_code[i]],
+            "host": self.hosts[self.host_code[i]],
+            "path": self.paths[self.url_path[self.url_code[i]]],
+            "method": self.methods[self.method_code[i]],
+            "status": self.status[i],
+            "statusText": self.status_texts[self.status_text_code[i]],
+            "mimeType": self.mimes[self.mime_code[i]],
+            "time": self.time[i],
+            "size": self.size[i],
+            "started_ms": self.started_ms[i],
+            "timingSegments": self.timing_segments(i),
+        }
+
+
+def as_store(entries: Any) -> EntryStore:
+    """Accept either an ``EntryStore`` or a list of normalized entry dicts."""
+    if isinstance(entries, EntryStore):
+        return entries
+    return EntryStore.from_entries(entries)
+
+
+_ROW_GETTERS = {
+    "id": lambda s, i: i,
+    "url": lambda s, i: s.urls[s.url_code[i]],
+    "method": lambda s, i: s.methods[s.method_code[i]],
+    "status": lambda s, i: s.status[i],
+    "statusText": lambda s, i: s.status_texts[s.status_text_code[i]],
+    "mimeType": lambda s, i: s.mimes[s.mime_code[i]],
+    "time": lambda s, i: s.time[i],
+    "size": lambda s, i: s.size[i],
+    "started_ms": lambda s, i: s.started_ms[i],
+    "timingSegments": lambda s, i: s.timing_segments(i),
+    "resourceType": lambda s, i: s.resource_types[s.type_code[i]],
+    "priority": lambda s, i: s.priorities[s.priority_code[i]],
+    "initiator": lambda s, i: s.initiators.get(i),
+    "_raw": lambda s, i: s.raw(i),
+}
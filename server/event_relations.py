@@ -1,22 +1,16 @@
-from typing import Any, Dict, List, Optional, Tuple
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate, islice
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
 
-
-def _to_int(v: Any, default: int = 0) -> int:
-    try:
-        return int(v) if v is not None else default
-    except Exception:
-        return default
-
-
-def _to_float(v: Any, default: float = 0.0) -> float:
-    try:
-        return float(v) if v is not None else default
-    except Exception:
-        return default
+from server.aggregates import Aggregates
+from server.entry_index import EntryIndex
+from server.entry_store import EntryStore, as_store
 
 
-def _get_initiator_url(e: Dict[str, Any]) -> Optional[str]:
-    ini = e.get("initiator")
+def _initiator_url(ini: Any) -> Optional[str]:
     if not ini:
         return None
     # common shapes from Chrome DevTools HAR
@@ -35,86 +29,282 @@ def _get_initiator_url(e: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def build_event_graph(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _get_initiator_url(e: Dict[str, Any]) -> Optional[str]:
+    return _initiator_url(e.get("initiator"))
+
+
+_DEFAULT_PORTS = {"http": "80", "https": "443", "ws": "80", "wss": "443"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used to match initiator URLs against request URLs:
+    lowercase scheme and host, no default port, no fragment, ``/`` for an
+    empty path. The query string is kept.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    host, sep, port = netloc.rpartition(":")
+    if sep and port == _DEFAULT_PORTS.get(scheme):
+        netloc = host
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+NO_PARENT = -1
+REASONS = ("", "initiator", "document")
+_INITIATOR = 1
+_DOCUMENT = 2
+
+COLLAPSE_MIN = 3  # same-host leaf siblings folded into one cluster node
+MAX_DOCUMENTS = 1000  # documents listed for picking a subtree root
+
+
+class EventGraph:
     """
-    Construct a simple event relation graph from HAR entries using heuristics:
-    - Nodes: one per entry with timing and meta fields
-    - Edges: from initiator URL -> entry (best-effort URL match),
-             otherwise from first document of same host -> entry
+    Request dependency forest of one capture, built in a single pass.
 
-    Returns: { nodes: [...], edges: [...] }
+    Each entry gets at most one parent: the latest request (in start-time
+    order) to its initiator URL, matched exactly or after ``normalize_url``,
+    or else the first document of its host. Parents always start before
+    their children, so the graph is acyclic. Children are kept in CSR form
+    (``child_offsets``/``child_ids``, in start-time order) for traversal.
     """
-    id_map: Dict[int, Dict[str, Any]] = {}
-    url_to_id: Dict[str, int] = {}
-    host_to_first_doc: Dict[str, int] = {}
-
-    for e in entries:
-        eid = _to_int(e.get("id"))
-        id_map[eid] = e
-        url = e.get("url") or ""
-        if url:
-            url_to_id[url] = eid
-        if (e.get("resourceType") or "") == "document" and e.get("host") and e.get("host") not in host_to_first_doc:
-            host_to_first_doc[e.get("host")] = eid
-
-    nodes = []
-    edges: List[Dict[str, Any]] = []
-    for e in entries:
-        eid = _to_int(e.get("id"))
-        start = _to_float(e.get("started_ms"), 0.0)
-        dur = _to_float(e.get("time"), 0.0)
-        end = start + dur
-        nodes.append(
-            {
-                "id": eid,
-                "url": e.get("url"),
-                "host": e.get("host"),
-                "path": e.get("path"),
-                "type": e.get("resourceType"),
-                "method": e.get("method"),
-                "status": e.get("status"),
-                "size": _to_int(e.get("size"), 0),
-                "start": start,
-                "end": end,
-            }
-        )
-
-        # Edge inference
-        initiator_url = _get_initiator_url(e)
-        src_id: Optional[int] = None
-        reason: str = ""
-        if initiator_url and initiator_url in url_to_id:
-            src_id = url_to_id[initiator_url]
-            reason = "initiator"
+
+    def __init__(self, store: EntryStore, index: EntryIndex):
+        self.store = store
+        self.index = index
+        # Rows and URLs covered by the index; a live capture may have grown since.
+        n = len(index)
+        self._url_count = index.url_count
+        order, rank = index.order, index.rank
+        self.parent = array("i", [NO_PARENT]) * n
+        self.reason = array("b", [0]) * n
+        self._normalized: Optional[Dict[str, List[int]]] = None
+
+        # First document of every host, by start time.
+        doc_codes = [c for c, v in enumerate(store.resource_types.values) if v == "document"]
+        doc_ranks = sorted(r for c in doc_codes for r in index.posting(index.rtype, c))
+        self.documents = array("I", (order[r] for r in doc_ranks))
+        first_doc = array("i", [NO_PARENT]) * len(store.hosts)
+        host_code = store.host_code
+        for i in self.documents:
+            h = host_code[i]
+            if first_doc[h] == NO_PARENT:
+                first_doc[h] = i
+
+        initiators = store.initiators
+        url_ranks, url_offsets, url_tail = index.url_ranks, index.url_offsets, index.url_tail
+        n_csr = len(url_offsets) - 1
+        for i in range(n):
+            r = rank[i]
+            url = _initiator_url(initiators.get(i))
+            if url:
+                best = NO_PARENT
+                for c in self._url_codes(url):
+                    # Latest request to that URL that started before this one.
+                    if c < n_csr:
+                        k = bisect_left(url_ranks, r, url_offsets[c], url_offsets[c + 1]) - 1
+                        if k >= url_offsets[c] and url_ranks[k] > best:
+                            best = url_ranks[k]
+                    tail = url_tail.get(c)
+                    if tail:
+                        k = bisect_left(tail, r) - 1
+                        if k >= 0 and tail[k] > best:
+                            best = tail[k]
+                if best != NO_PARENT:
+                    self.parent[i] = order[best]
+                    self.reason[i] = _INITIATOR
+                    continue
+            d = first_doc[host_code[i]]
+            if d != NO_PARENT and rank[d] < r:
+                self.parent[i] = d
+                self.reason[i] = _DOCUMENT
+
+        # Children grouped by parent, each group in start-time order.
+        counts = array("I", [0]) * (n + 1)
+        for p in self.parent:
+            if p != NO_PARENT:
+                counts[p + 1] += 1
+        self.child_offsets = array("I", accumulate(counts))
+        fill = array("I", self.child_offsets)
+        self.child_ids = array("I", [0]) * self.child_offsets[n]
+        parent = self.parent
+        for r in range(n):
+            i = order[r]
+            p = parent[i]
+            if p != NO_PARENT:
+                self.child_ids[fill[p]] = i
+                fill[p] += 1
+
+    def _url_codes(self, url: str) -> List[int]:
+        code = self.store.urls.code_of(url)
+        if code is not None:
+            return [code] if code < self._url_count else []
+        if self._normalized is None:
+            # Built on the first miss only; most initiator URLs match verbatim.
+            normalized: Dict[str, List[int]] = {}
+            for c, u in islice(enumerate(self.store.urls.values), self._url_count):
+                normalized.setdefault(normalize_url(u), []).append(c)
+            self._normalized = normalized
+        return self._normalized.get(normalize_url(url), [])
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def edge_count(self) -> int:
+        return len(self.child_ids)
+
+    def children(self, i: int) -> Any:
+        return self.child_ids[self.child_offsets[i] : self.child_offsets[i + 1]]
+
+    def _node(self, i: int, depth: int, layout: Optional[Any] = None) -> Dict[str, Any]:
+        store = self.store
+        start = store.started_ms[i]
+        node = {
+            "id": i,
+            "host": store.hosts[store.host_code[i]],
+            "path": store.paths[store.url_path[store.url_code[i]]],
+            "type": store.resource_types[store.type_code[i]],
+            "method": store.methods[store.method_code[i]],
+            "status": store.status[i],
+            "size": store.size[i],
+            "start": start,
+            "end": start + store.time[i],
+            "depth": depth,
+        }
+        if layout is not None:
+            node["x"], node["y"] = layout.position(i)
+        return node
+
+    def subgraph(
+        self,
+        keep: Optional[Any] = None,
+        root: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        collapse: bool = False,
+        limit: Optional[int] = None,
+        layout: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        Nodes and edges reachable breadth-first from ``root`` (default: every
+        tree root), in start-time order.
+
+        ``keep`` (a bytes-like mask over entry ids) restricts the graph to
+        matching entries; one whose parent is dropped becomes a root.
+        ``max_depth`` stops descending below that depth, ``collapse`` folds
+        at least ``COLLAPSE_MIN`` same-host leaf siblings into one cluster
+        node (with a negative id), and ``limit`` caps the number of nodes.
+        With a ``layout`` (see ``server.graph_layout``) nodes carry its
+        ``x``/``y``; a cluster sits at the mean position of its members.
+        """
+        store = self.store
+        parent, reason, offsets, child_ids = self.parent, self.reason, self.child_offsets, self.child_ids
+        kept = (lambda i: True) if keep is None else keep.__getitem__
+        if root is not None:
+            roots = [root] if kept(root) else []
         else:
-            host = e.get("host")
-            if host and host in host_to_first_doc and host_to_first_doc[host] != eid:
-                src_id = host_to_first_doc[host]
-                reason = "document"
+            roots = [i for i in self.index.ordered_ids() if kept(i) and (parent[i] == NO_PARENT or not kept(parent[i]))]
+
+        nodes: List[Dict[str, Any]] = []
+        edges: List[Dict[str, Any]] = []
+        clusters = 0
+        truncated = False
+        queue = deque((i, 0) for i in roots)
+        seen_roots = len(queue)
+        while queue:
+            if limit is not None and len(nodes) >= limit:
+                truncated = True
+                break
+            i, depth = queue.popleft()
+            nodes.append(self._node(i, depth, layout))
+            if max_depth is not None and depth >= max_depth:
+                truncated = truncated or any(kept(c) for c in child_ids[offsets[i] : offsets[i + 1]])
+                continue
+            kids = [c for c in child_ids[offsets[i] : offsets[i + 1]] if kept(c)]
+            if collapse:
+                leaves: Dict[int, List[int]] = {}
+                for c in kids:
+                    if not any(kept(g) for g in child_ids[offsets[c] : offsets[c + 1]]):
+                        leaves.setdefault(store.host_code[c], []).append(c)
+                folded = set()
+                for h, members in leaves.items():
+                    if len(members) < COLLAPSE_MIN:
+                        continue
+                    if limit is not None and len(nodes) >= limit:
+                        break
+                    clusters += 1
+                    folded.update(members)
+                    nodes.append(self._cluster(-clusters, h, members, depth + 1, layout))
+                    edges.append({"source": i, "target": -clusters, "reason": REASONS[reason[members[0]]]})
+                kids = [c for c in kids if c not in folded]
+            for c in kids:
+                queue.append((c, depth + 1))
+                edges.append({"source": i, "target": c, "reason": REASONS[reason[c]]})
+        if queue:
+            truncated = True
+        # Edges to nodes cut off by the limit are dropped.
+        emitted = {nd["id"] for nd in nodes}
+        edges = [e for e in edges if e["target"] in emitted]
+
+        documents = [i for i in self.documents if kept(i)]
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "roots": seen_roots,
+            "clusters": clusters,
+            "truncated": truncated,
+            "documents": [self._document(i) for i in documents[:MAX_DOCUMENTS]],
+        }
+
+    def _document(self, i: int) -> Dict[str, Any]:
+        store = self.store
+        return {
+            "id": i,
+            "host": store.hosts[store.host_code[i]],
+            "path": store.paths[store.url_path[store.url_code[i]]],
+            "status": store.status[i],
+        }
 
-        if src_id is not None:
-            edges.append({"source": src_id, "target": eid, "reason": reason})
+    def _cluster(self, cid: int, host: int, members: List[int], depth: int, layout: Optional[Any] = None) -> Dict[str, Any]:
+        store = self.store
+        types = [store.resource_types[store.type_code[m]] for m in members]
+        node = {
+            "id": cid,
+            "cluster": True,
+            "host": store.hosts[host],
+            "path": None,
+            "type": max(set(types), key=types.count),
+            "count": len(members),
+            "members": members[:50],
+            "size": sum(store.size[m] for m in members),
+            "start": min(store.started_ms[m] for m in members),
+            "end": max(store.started_ms[m] + store.time[m] for m in members),
+            "depth": depth,
+        }
+        if layout is not None:
+            node["x"] = sum(layout.x[m] for m in members) / len(members)
+            node["y"] = layout.y[members[0]]
+        return node
 
-    return {"nodes": nodes, "edges": edges}
+
+def build_event_graph(entries: Any, index: Optional[EntryIndex] = None, **options: Any) -> Dict[str, Any]:
+    """
+    Construct the event relation graph of ``entries`` (see ``EventGraph``);
+    ``options`` are passed on to ``EventGraph.subgraph``.
+
+    Returns: { nodes: [...], edges: [...], ... }
+    """
+    store = as_store(entries)
+    return EventGraph(store, index or EntryIndex(store)).subgraph(**options)
 
 
-def build_phase_stats(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+def build_phase_stats(entries: Any) -> Dict[str, Any]:
     """
     Aggregate timing segments across entries and by resource type.
     Returns overall totals and per-type breakdown.
     """
-    phases = ["blocked", "dns", "connect", "ssl", "send", "wait", "receive"]
-    total: Dict[str, float] = {p: 0.0 for p in phases}
-    by_type: Dict[str, Dict[str, float]] = {}
-
-    for e in entries:
-        segs = e.get("timingSegments") or {}
-        rtype = e.get("resourceType") or "unknown"
-        if rtype not in by_type:
-            by_type[rtype] = {p: 0.0 for p in phases}
-        for p in phases:
-            v = _to_float(segs.get(p), 0.0)
-            total[p] += v
-            by_type[rtype][p] += v
-
-    return {"total": total, "byType": by_type}
\ No newline at end of file
+    return Aggregates.of(as_store(entries)).phase_stats()
@@ -0,0 +1,50 @@
+import json
+from json.encoder import encode_basestring
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON, through orjson when it is installed.
+
+    Non-finite floats become ``null`` with orjson and raise ``ValueError``
+    with the standard library, as in ``JSONResponse``.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_str(v: Any) -> str:
+    """JSON literal of a string column value (``null`` for missing ones)."""
+    return encode_basestring(v) if isinstance(v, str) else json.dumps(v)
+
+
+def json_num(v: float) -> str:
+    """JSON literal of a float column value; non-finite values become ``null``."""
+    return repr(v) if v - v == 0 else "null"
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    ``JSONResponse`` rendered with ``dumps``. Returning it from a route
+    also skips FastAPI's ``jsonable_encoder`` pass over the content, so the
+    content must already be plain JSON types.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """Response whose content is an already serialized JSON document (``str`` or ``bytes``)."""
+
+    def render(self, content: Any) -> bytes:
+        return content.encode("utf-8") if isinstance(content, str) else content
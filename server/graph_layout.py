@@ -0,0 +1,105 @@
+import math
+from array import array
+from typing import List, Tuple
+
+from server.event_relations import NO_PARENT, EventGraph
+
+SLOT_WIDTH = 24.0  # horizontal distance between neighbouring leaves
+LAYER_HEIGHT = 80.0  # vertical distance between depths
+TREE_GAP = 2  # empty slots / layers between packed trees
+ASPECT = 1.6  # target width over height of the packed forest
+
+
+class TreeLayout:
+    """
+    Layered layout of an ``EventGraph``, computed once per capture.
+
+    Every tree of the forest is drawn top-down: depth gives the layer,
+    leaves take consecutive slots in depth-first order and each parent sits
+    centred over its first and last child, so no two edges of a tree cross.
+    Trees (single requests included) are then packed left to right onto
+    shelves in start-time order of their roots, wrapping at a width chosen
+    to keep the whole forest close to ``ASPECT``. Everything is linear in
+    the number of entries; coordinates are kept per entry id.
+    """
+
+    def __init__(self, graph: EventGraph):
+        self.graph = graph
+        n = len(graph)
+        order = graph.index.ordered_ids()
+        parent, offsets, child_ids = graph.parent, graph.child_offsets, graph.child_ids
+        self.x = array("d", [0.0]) * n
+        self.y = array("d", [0.0]) * n
+        x = self.x
+
+        # Parents start before their children, so start order visits parents first.
+        depth = array("I", [0]) * n
+        tree = array("I", [0]) * n
+        roots: List[int] = []
+        for i in order:
+            p = parent[i]
+            if p == NO_PARENT:
+                tree[i] = len(roots)
+                roots.append(i)
+            else:
+                depth[i] = depth[p] + 1
+                tree[i] = tree[p]
+
+        # Leaf slots, local to each tree.
+        widths: List[int] = []
+        for root in roots:
+            slot = 0
+            stack = [root]
+            while stack:
+                i = stack.pop()
+                lo, hi = offsets[i], offsets[i + 1]
+                if lo == hi:
+                    x[i] = slot
+                    slot += 1
+                else:
+                    stack.extend(reversed(child_ids[lo:hi]))
+            widths.append(slot)
+        for i in reversed(order):
+            lo, hi = offsets[i], offsets[i + 1]
+            if lo < hi:
+                x[i] = (x[child_ids[lo]] + x[child_ids[hi - 1]]) / 2
+        heights = [1] * len(roots)
+        for i in range(n):
+            t = tree[i]
+            if depth[i] >= heights[t]:
+                heights[t] = depth[i] + 1
+
+        shift_x, shift_y = self._pack(widths, heights)
+        y = self.y
+        for i in range(n):
+            t = tree[i]
+            x[i] = (x[i] + shift_x[t]) * SLOT_WIDTH
+            y[i] = (depth[i] + shift_y[t]) * LAYER_HEIGHT
+
+    @staticmethod
+    def _pack(widths: List[int], heights: List[int]) -> Tuple[List[int], List[int]]:
+        # Shelf packing in slot/layer units: fill a row, then start the next below it.
+        area = sum((w + TREE_GAP) * SLOT_WIDTH * (h + TREE_GAP) * LAYER_HEIGHT for w, h in zip(widths, heights))
+        row_width = max(max(widths, default=0), int(math.sqrt(area * ASPECT) / SLOT_WIDTH))
+        shift_x: List[int] = []
+        shift_y: List[int] = []
+        cx = cy = row_height = 0
+        for w, h in zip(widths, heights):
+            if cx and cx + w > row_width:
+                cx = 0
+                cy += row_height + TREE_GAP
+                row_height = 0
+            shift_x.append(cx)
+            shift_y.append(cy)
+            cx += w + TREE_GAP
+            row_height = max(row_height, h)
+        return shift_x, shift_y
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def nbytes(self) -> int:
+        return 8 * (len(self.x) + len(self.y))
+
+    def position(self, i: int) -> Tuple[float, float]:
+        return self.x[i], self.y[i]
@@ -0,0 +1,323 @@
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 1 << 20  # bytes read from disk per refill
+
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class HarStreamError(ValueError):
+    pass
+
+
+def _utf8_len(s: str) -> int:
+    return len(s) if s.isascii() else len(s.encode("utf-8"))
+
+
+class _Reader:
+    """
+    Pull-style JSON event reader over a binary file.
+
+    Only the part of the document that is currently being decoded is kept
+    in memory; consumed text is dropped on every refill. ``byte_pos`` tracks
+    the absolute byte offset of the cursor so callers can record where each
+    value lives in the file.
+    """
+
+    def __init__(self, f: BinaryIO, chunk_size: int = CHUNK_SIZE, byte_pos: int = 0):
+        self._f = f
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        # ``f`` must already be positioned at ``byte_pos``.
+        self.byte_pos = byte_pos
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        data = self._f.read(size)
+        if not data:
+            self.eof = True
+            self.buf += self._decoder.decode(b"", final=True)
+            return False
+        self.buf += self._decoder.decode(data)
+        return True
+
+    def _advance(self, new_pos: int) -> None:
+        self.byte_pos += _utf8_len(self.buf[self.pos : new_pos])
+        self.pos = new_pos
+
+    def _skip(self, new_pos: int) -> None:
+        # Whitespace and structural characters are always single-byte.
+        self.byte_pos += new_pos - self.pos
+        self.pos = new_pos
+
+    def peek(self) -> str:
+        while True:
+            self._skip(_WS.match(self.buf, self.pos).end())
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise HarStreamError(f"expected {ch!r} at byte {self.byte_pos}, got {got or 'EOF'!r}")
+        self._skip(self.pos + 1)
+
+    def value(self) -> Tuple[Any, int, int]:
+        """Decode the next complete value; returns (value, start_byte, end_byte)."""
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill(size):
+                    size *= 2
+                    continue
+                raise HarStreamError(f"invalid JSON near byte {self.byte_pos}: {e.msg}") from None
+            # A scalar ending exactly at the buffer edge may have been cut short.
+            if end == len(self.buf) and self._fill(size):
+                continue
+            start = self.byte_pos
+            self._advance(end)
+            return obj, start, self.byte_pos
+
+    def members(self) -> Iterator[str]:
+        """Iterate the keys of an object; the caller must consume each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._skip(self.pos + 1)
+            return
+        while True:
+            key, _, _ = self.value()
+            if not isinstance(key, str):
+                raise HarStreamError(f"object key expected at byte {self.byte_pos}")
+            self.expect(":")
+            yield key
+            sep = self.peek()
+            self._skip(self.pos + 1)
+            if sep == "}":
+                return
+            if sep != ",":
+                raise HarStreamError(f"expected ',' or '}}' at byte {self.byte_pos}")
+
+    def elements(self) -> Iterator[Tuple[Any, int, int]]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._skip(self.pos + 1)
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self._skip(self.pos + 1)
+            if sep == "]":
+                return
+            if sep != ",":
+                raise HarStreamError(f"expected ',' or ']' at byte {self.byte_pos}")
+
+
+def _open_at(f: BinaryIO, byte_pos: int, chunk_size: int) -> _Reader:
+    f.seek(byte_pos)
+    return _Reader(f, chunk_size, byte_pos)
+
+
+def entries_array_start(path: str, chunk_size: int = CHUNK_SIZE) -> Optional[int]:
+    """Byte offset just past the ``[`` of ``log.entries``, or ``None`` if there is no such array."""
+    with open(path, "rb") as f:
+        r = _Reader(f, chunk_size)
+        if r.peek() == "\ufeff":
+            r._advance(r.pos + 1)
+        for key in r.members():
+            if key != "log":
+                r.value()
+                continue
+            for log_key in r.members():
+                if log_key == "entries":
+                    r.expect("[")
+                    return r.byte_pos
+                r.value()
+    return None
+
+
+# An entry that is not the first one follows a comma; the quote after the
+# brace cannot be part of a string's content since those are escaped.
+_ENTRY_CANDIDATE = re.compile(rb",[ \t\n\r]*(\{[ \t\n\r]*\")")
+# Bytes shared by consecutive windows of ``find_entry_start``; longer runs of
+# whitespace around a candidate's brace may hide it (the next one is found).
+CANDIDATE_OVERLAP = 256
+
+
+def _looks_like_entry(f: BinaryIO, start: int, chunk_size: int) -> bool:
+    # Unlike ``_Reader.value`` a decode error only triggers a refill when it
+    # could be caused by truncation, so false candidates fail fast.
+    f.seek(start)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    size = chunk_size
+    eof = False
+    while True:
+        data = f.read(size)
+        eof = not data
+        try:
+            buf += decoder.decode(data, final=eof)
+        except UnicodeDecodeError:
+            return False
+        try:
+            obj, end = _DECODER.raw_decode(buf)
+        except json.JSONDecodeError as e:
+            if eof or not (e.msg.startswith("Unterminated string") or e.pos >= len(buf) - 8):
+                return False
+            size *= 2
+            continue
+        tail = _WS.match(buf, end).end()
+        if tail == len(buf) and not eof:
+            size *= 2
+            continue
+        return isinstance(obj, dict) and "request" in obj and buf[tail : tail + 1] in (",", "]")
+
+
+def find_entry_start(path: str, lo: int, hi: int, chunk_size: int = CHUNK_SIZE) -> Optional[int]:
+    """
+    Guess the start of the first entry at or after byte ``lo`` (and before ``hi``).
+
+    A candidate follows a comma and decodes to an object with a ``request``
+    member followed by ``,`` or ``]``. This is a heuristic: callers must
+    check that the result chains up with the previous range.
+
+    The range is scanned a window of ``chunk_size`` bytes at a time; windows
+    overlap by ``CANDIDATE_OVERLAP`` bytes so a candidate split between two
+    of them is still seen.
+    """
+    size = max(chunk_size, 2 * CANDIDATE_OVERLAP)
+    pos = max(lo - 1, 0)
+    # Candidates before this offset were already tried.
+    tried = lo
+    with open(path, "rb") as f:
+        while pos < hi:
+            f.seek(pos)
+            window = f.read(min(size, hi - pos))
+            if not window:
+                break
+            for m in _ENTRY_CANDIDATE.finditer(window):
+                start = pos + m.start(1)
+                if start < tried:
+                    continue
+                if _looks_like_entry(f, start, chunk_size):
+                    return start
+                tried = start + 1
+            pos += len(window) - CANDIDATE_OVERLAP
+            if pos + CANDIDATE_OVERLAP >= hi:
+                break
+    return None
+
+
+def iter_entry_range(path: str, start: int, stop: int, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[Any, int, int]]:
+    """
+    Parse consecutive entries beginning exactly at byte ``start``, for as
+    long as they start before ``stop``.
+
+    Yields ``(entry, start_byte, end_byte)`` like ``iter_har_entries`` and
+    returns ``(next_start, closed)``: where the following entry begins, and
+    whether the entries array ended instead (then ``next_start`` is the
+    offset just past the ``]``).
+    """
+    with open(path, "rb") as f:
+        r = _open_at(f, start, chunk_size)
+        if r.peek() == "]":
+            r._skip(r.pos + 1)
+            return r.byte_pos, True
+        while r.byte_pos < stop:
+            yield r.value()
+            sep = r.peek()
+            r._skip(r.pos + 1)
+            if sep == "]":
+                return r.byte_pos, True
+            if sep != ",":
+                raise HarStreamError(f"expected ',' or ']' at byte {r.byte_pos}")
+            r.peek()
+        return r.byte_pos, False
+
+
+def check_har_tail(path: str, byte_pos: int, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Validate the rest of the document after the ``]`` of ``log.entries``.
+
+    Raises ``HarStreamError`` just like ``iter_har_entries`` would for a
+    malformed remainder or trailing data.
+    """
+    with open(path, "rb") as f:
+        r = _open_at(f, byte_pos, chunk_size)
+        # Remaining members of "log", then of the top-level object.
+        for _ in range(2):
+            while True:
+                sep = r.peek()
+                r._skip(r.pos + 1)
+                if sep == "}":
+                    break
+                if sep != ",":
+                    raise HarStreamError(f"expected ',' or '}}' at byte {r.byte_pos}")
+                key, _, _ = r.value()
+                if not isinstance(key, str):
+                    raise HarStreamError(f"object key expected at byte {r.byte_pos}")
+                r.expect(":")
+                r.value()
+        if r.peek():
+            raise HarStreamError(f"trailing data at byte {r.byte_pos}")
+
+
+def iter_har_entries(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[Any, int, int]]:
+    """
+    Incrementally parse ``log.entries`` of a HAR file.
+
+    Yields ``(entry, start_byte, end_byte)`` for each element of the entries
+    array without ever materializing the whole document. Everything outside
+    ``log.entries`` is decoded and discarded.
+    """
+    with open(path, "rb") as f:
+        r = _Reader(f, chunk_size)
+        if r.peek() == "\ufeff":
+            r._advance(r.pos + 1)
+        for key in r.members():
+            if key != "log":
+                r.value()
+                continue
+            for log_key in r.members():
+                if log_key == "entries":
+                    yield from r.elements()
+                else:
+                    r.value()
+        if r.peek():
+            raise HarStreamError(f"trailing data at byte {r.byte_pos}")
+
+
+def iter_ndjson_entries(path: str) -> Iterator[Tuple[Any, int, int]]:
+    """
+    Parse a newline-delimited file of HAR entries (one JSON object per line,
+    blank lines skipped), yielding ``(entry, start_byte, end_byte)`` like
+    ``iter_har_entries``.
+    """
+    with open(path, "rb") as f:
+        pos = 0
+        for n, line in enumerate(f, 1):
+            start, pos = pos, pos + len(line)
+            text = line.rstrip(b"\r\n")
+            if not text.strip():
+                continue
+            try:
+                entry = json.loads(text)
+            except ValueError as e:
+                raise HarStreamError(f"line {n}: {e}") from None
+            if not isinstance(entry, dict):
+                raise HarStreamError(f"line {n}: entry object expected")
+            yield entry, start, start + len(text)
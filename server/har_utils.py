@@ -1,7 +1,12 @@
 import json
 import os
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.aggregates import Aggregates
+from server.entry_store import EntryRow, EntryStore, as_store
+from server.har_stream import iter_har_entries
+from server.raw_entries import RawEntryReader
 
 
 def _parse_iso_datetime(value: str) -> Optional[datetime]:
@@ -33,31 +38,50 @@ def parse_har_file(path: str) -> Dict[str, Any]:
         return json.load(f)
 
 
-def normalize_entries(har: Dict[str, Any]) -> List[Dict[str, Any]]:
-    log = har.get("log", {})
-    entries: List[Dict[str, Any]] = log.get("entries", [])
-    if not entries:
-        return []
-
-    parsed_times: List[Optional[datetime]] = [
-        _parse_iso_datetime(e.get("startedDateTime")) for e in entries
-    ]
-    first_time: Optional[datetime] = None
-    for t in parsed_times:
-        if t is not None:
-            first_time = t
-            break
-
-    normalized: List[Dict[str, Any]] = []
-    rolling_ms = 0.0
-    for i, e in enumerate(entries):
-        t = parsed_times[i]
-        if first_time and t:
-            started_ms = (t - first_time).total_seconds() * 1000.0
+class EntryNormalizer:
+    """
+    Normalize HAR entries one at a time.
+
+    Holds the running state needed across entries (the first parsable
+    ``startedDateTime`` used as the time baseline, and the rolling fallback
+    offset) so entries can be fed as they are parsed.
+    """
+
+    def __init__(self, keep_times: bool = False) -> None:
+        self.first_time: Optional[datetime] = None
+        self.rolling_ms = 0.0
+        self.count = 0
+        # Parsed start times, for rebasing entries normalized out of order.
+        self.times: Optional[List[Optional[datetime]]] = [] if keep_times else None
+
+    def start_offset(self, t: Optional[datetime], total_time: float) -> float:
+        """``started_ms`` of the next entry; advances the baseline and rolling fallback."""
+        if self.first_time is None and t is not None:
+            self.first_time = t
+        if self.first_time and t:
+            started_ms = (t - self.first_time).total_seconds() * 1000.0
         else:
-            started_ms = rolling_ms
+            started_ms = self.rolling_ms
+        self.rolling_ms += total_time
+        return started_ms
+
+    def state(self) -> Tuple[Optional[datetime], float, int]:
+        """The running state, to ``restore`` if entries added later are dropped."""
+        return self.first_time, self.rolling_ms, self.count
+
+    def restore(self, state: Tuple[Optional[datetime], float, int]) -> None:
+        self.first_time, self.rolling_ms, self.count = state
+        if self.times is not None:
+            del self.times[self.count :]
+
+    def add(self, e: Dict[str, Any]) -> Dict[str, Any]:
+        i = self.count
+        self.count += 1
+        t = _parse_iso_datetime(e.get("startedDateTime"))
         total_time = float(e.get("time", 0) or 0)
-        rolling_ms += total_time
+        started_ms = self.start_offset(t, total_time)
+        if self.times is not None:
+            self.times.append(t)
 
         req = e.get("request", {})
         resp = e.get("response", {})
@@ -92,26 +116,84 @@ def normalize_entries(har: Dict[str, Any]) -> List[Dict[str, Any]]:
         priority = raw_get(e, ["_priority"]) or raw_get(req, ["_priority"]) or None
         initiator = raw_get(e, ["_initiator"]) or None
 
-        normalized.append(
-            {
-                "_raw": e,
-                "id": i,
-                "url": url,
-                "method": method,
-                "status": status,
-                "statusText": status_text,
-                "mimeType": mime,
-                "time": total_time,
-                "size": size,
-                "started_ms": started_ms,
-                "timingSegments": segs,
-                "resourceType": resource_type,
-                "priority": priority,
-                "initiator": initiator,
-            }
-        )
-
-    return normalized
+        return {
+            "_raw": e,
+            "id": i,
+            "url": url,
+            "method": method,
+            "status": status,
+            "statusText": status_text,
+            "mimeType": mime,
+            "time": total_time,
+            "size": size,
+            "started_ms": started_ms,
+            "timingSegments": segs,
+            "resourceType": resource_type,
+            "priority": priority,
+            "initiator": initiator,
+        }
+
+
+def normalize_entries(har: Dict[str, Any]) -> List[Dict[str, Any]]:
+    log = har.get("log", {})
+    entries: List[Dict[str, Any]] = log.get("entries", [])
+    if not entries:
+        return []
+
+    normalizer = EntryNormalizer()
+    return [normalizer.add(e) for e in entries]
+
+
+def normalize_har_file(path: str) -> List[Dict[str, Any]]:
+    """
+    Streaming counterpart of ``normalize_entries(parse_har_file(path))``.
+
+    Entries are parsed incrementally from disk and normalized as they
+    arrive, so the full JSON document is never held in memory.
+    """
+    normalizer = EntryNormalizer()
+    return [normalizer.add(e) for e, _, _ in iter_har_entries(path)]
+
+
+PROGRESS_EVERY = 1000  # entries between progress callbacks
+
+
+def load_entry_store(
+    path: str,
+    progress: Optional[Callable[[int, int], None]] = None,
+    workers: int = 1,
+    aggregates: Optional[Aggregates] = None,
+) -> EntryStore:
+    """
+    Stream, normalize and append entries straight into a columnar ``EntryStore``.
+
+    Only byte offsets of the original entries are kept; they are re-read
+    from ``path`` on demand. ``progress(bytes_read, entries)`` is called
+    periodically; an exception raised from it aborts the load. ``aggregates``
+    is brought up to date before each progress call, so its totals cover
+    the entries parsed so far. With ``workers > 1`` large files are
+    normalized by a process pool (see ``server.parallel_ingest``).
+    """
+    if workers > 1:
+        from server.parallel_ingest import PARALLEL_MIN_BYTES, load_entry_store_parallel
+
+        if os.path.getsize(path) >= PARALLEL_MIN_BYTES:
+            return load_entry_store_parallel(path, workers, progress, aggregates)
+    normalizer = EntryNormalizer()
+    store = EntryStore(RawEntryReader(path))
+    end = 0
+    for e, start, end in iter_har_entries(path):
+        store.append(normalizer.add(e), (start, end))
+        if normalizer.count % PROGRESS_EVERY == 0:
+            if aggregates is not None:
+                aggregates.update(store)
+            if progress is not None:
+                progress(end, normalizer.count)
+    if aggregates is not None:
+        aggregates.update(store)
+    if progress is not None:
+        progress(end, normalizer.count)
+    return store
 
 
 def _to_num(v: Any) -> float:
@@ -122,6 +204,8 @@ def _to_num(v: Any) -> float:
 
 
 def build_entry_summary(entry: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(entry, EntryRow):
+        return entry.summary()
     # Derive host and path
     host = ""
     path = ""
@@ -152,26 +236,21 @@ def build_entry_summary(entry: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def build_entry_detail(entry: Dict[str, Any]) -> Dict[str, Any]:
-    raw = entry.get("_raw", {})
+    """
+    Detail of one entry. The response body is not inlined: ``content``
+    carries its encoding and its ``digest`` in the shared body store, and the
+    text is served by the body preview and download endpoints.
+    """
+    if isinstance(entry, EntryRow):
+        raw = entry.raw(with_body=False)
+        digest = entry.body_digest()
+    else:
+        raw = entry.get("_raw", {})
+        digest = None
     req = raw.get("request", {}) or {}
     resp = raw.get("response", {}) or {}
     timings = raw.get("timings", {}) or {}
-
-    # Response body
     content = resp.get("content", {}) or {}
-    text = content.get("text")
-    encoding = content.get("encoding")
-    decoded_text = None
-    if isinstance(text, str):
-        if encoding == "base64":
-            try:
-                import base64
-
-                decoded_text = base64.b64decode(text).decode("utf-8", errors="replace")
-            except Exception:
-                decoded_text = text
-        else:
-            decoded_text = text
 
     return {
         "summary": build_entry_summary(entry),
@@ -198,7 +277,8 @@ def build_entry_detail(entry: Dict[str, Any]) -> Dict[str, Any]:
             "content": {
                 "size": content.get("size"),
                 "mimeType": content.get("mimeType"),
-                "text": decoded_text,
+                "encoding": content.get("encoding"),
+                "digest": digest,
             },
         },
         "timings": timings,
@@ -212,38 +292,9 @@ def build_entry_detail(entry: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def build_stats(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
-    total_size = sum(int(e.get("size", 0) or 0) for e in entries)
-    total_time = sum(float(e.get("time", 0) or 0.0) for e in entries)
-    by_status: Dict[str, int] = {}
-    by_mime: Dict[str, int] = {}
-    by_domain: Dict[str, int] = {}
-    by_type: Dict[str, int] = {}
-    for e in entries:
-        s = str(e.get("status"))
-        by_status[s] = by_status.get(s, 0) + 1
-        m = e.get("mimeType") or "unknown"
-        by_mime[m] = by_mime.get(m, 0) + 1
-        # domain
-        try:
-            from urllib.parse import urlparse
-
-            host = urlparse(e.get("url", "")).netloc
-            if host:
-                by_domain[host] = by_domain.get(host, 0) + 1
-        except Exception:
-            pass
-        t = e.get("resourceType") or "unknown"
-        by_type[t] = by_type.get(t, 0) + 1
-    return {
-        "count": len(entries),
-        "totalSize": total_size,
-        "totalTime": total_time,
-        "byStatus": by_status,
-        "byMimeType": by_mime,
-        "byDomain": by_domain,
-        "byResourceType": by_type,
-    }
+def build_stats(entries: Any) -> Dict[str, Any]:
+    store = as_store(entries)
+    return Aggregates.of(store).stats()
 
 
 def raw_get(obj: Dict[str, Any], keys: List[str]) -> Any:
@@ -0,0 +1,145 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Optional, Sequence
+
+_NEG_INF = float("-inf")
+
+
+class Coverage:
+    """
+    Aggregate queries over an unordered set of closed intervals ``[s, e]``.
+
+    Starts and ends are kept sorted with prefix sums, so both the number of
+    intervals overlapping a window and the total time they cover inside it
+    take two binary searches.
+    """
+
+    def __init__(self, starts: Iterable[float], ends: Iterable[float]):
+        self.starts = array("d", sorted(starts))
+        self.ends = array("d", sorted(ends))
+        self._start_sums = array("d", accumulate(self.starts, initial=0.0))
+        self._end_sums = array("d", accumulate(self.ends, initial=0.0))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def count(self, a: float, b: float) -> int:
+        """Intervals overlapping ``[a, b]``: started by ``b`` minus those already over before ``a``."""
+        return bisect_right(self.starts, b) - bisect_left(self.ends, a)
+
+    def active(self, t: float) -> int:
+        return self.count(t, t)
+
+    def _area(self, t: float) -> float:
+        # Sum over intervals of their length clipped to (-inf, t].
+        i = bisect_left(self.starts, t)
+        j = bisect_left(self.ends, t)
+        return (t * i - self._start_sums[i]) - (t * j - self._end_sums[j])
+
+    def covered(self, a: float, b: float) -> float:
+        """Total interval time inside ``[a, b]`` (overlapping intervals add up)."""
+        return self._area(b) - self._area(a) if b > a else 0.0
+
+    def nbytes(self) -> int:
+        return 8 * (len(self.starts) + len(self.ends) + len(self._start_sums) + len(self._end_sums))
+
+
+class IntervalIndex(Coverage):
+    """
+    Intervals addressed by position, with positions in ascending start order.
+
+    On top of ``Coverage`` a max-end segment tree answers "which positions
+    overlap ``[a, b]``" in O(log n + k), and the first/last such position or
+    the latest end over a position range in O(log n).
+    """
+
+    def __init__(self, starts: Sequence[float], ends: Sequence[float]):
+        # ``starts`` is ascending, so ``self.starts`` is also in position order.
+        super().__init__(starts, ends)
+        n = len(self.starts)
+        size = 1
+        while size < n:
+            size *= 2
+        tree = array("d", [_NEG_INF]) * (2 * size)
+        tree[size : size + n] = array("d", ends)
+        for i in range(size - 1, 0, -1):
+            left, right = tree[2 * i], tree[2 * i + 1]
+            tree[i] = left if left > right else right
+        self._size = size
+        self._tree = tree
+
+    def nbytes(self) -> int:
+        return super().nbytes() + 8 * len(self._tree)
+
+    def start(self, pos: int) -> float:
+        return self.starts[pos]
+
+    def end(self, pos: int) -> float:
+        return self._tree[self._size + pos]
+
+    def _bound(self, b: float, hi: Optional[int]) -> int:
+        # Positions are in start order, so those starting by ``b`` are a prefix.
+        end = bisect_right(self.starts, b)
+        return end if hi is None else min(end, hi)
+
+    def max_end(self, lo: int, hi: int) -> float:
+        """Latest end over positions ``[lo, hi)``."""
+        best = _NEG_INF
+        tree = self._tree
+        lo += self._size
+        hi += self._size
+        while lo < hi:
+            if lo & 1:
+                best = max(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = max(best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def _find(self, a: float, lo: int, hi: int, node: int, nlo: int, nhi: int, last: bool) -> int:
+        if nhi <= lo or hi <= nlo or self._tree[node] < a:
+            return -1
+        if nhi - nlo == 1:
+            return nlo
+        mid = (nlo + nhi) // 2
+        first_half = (2 * node, nlo, mid)
+        second_half = (2 * node + 1, mid, nhi)
+        for child in (second_half, first_half) if last else (first_half, second_half):
+            found = self._find(a, lo, hi, *child, last)
+            if found >= 0:
+                return found
+        return -1
+
+    def first(self, a: float, b: float, lo: int = 0, hi: Optional[int] = None) -> int:
+        """Smallest position in ``[lo, hi)`` overlapping ``[a, b]``, or -1."""
+        return self._find(a, lo, self._bound(b, hi), 1, 0, self._size, False)
+
+    def last(self, a: float, b: float, lo: int = 0, hi: Optional[int] = None) -> int:
+        """Largest position in ``[lo, hi)`` overlapping ``[a, b]``, or -1."""
+        return self._find(a, lo, self._bound(b, hi), 1, 0, self._size, True)
+
+    def overlapping(self, a: float, b: float, lo: int = 0, hi: Optional[int] = None) -> List[int]:
+        """All positions in ``[lo, hi)`` overlapping ``[a, b]``, ascending."""
+        hi = self._bound(b, hi)
+        out: List[int] = []
+        if lo >= hi:
+            return out
+        tree = self._tree
+        size = self._size
+        stack = [(1, 0, size)]
+        while stack:
+            node, nlo, nhi = stack.pop()
+            if nhi <= lo or hi <= nlo or tree[node] < a:
+                continue
+            if nhi - nlo == 1:
+                out.append(nlo)
+                continue
+            mid = (nlo + nhi) // 2
+            # Right child first so positions come off the stack ascending.
+            stack.append((2 * node + 1, mid, nhi))
+            stack.append((2 * node, nlo, mid))
+        return out
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+MAX_WORKERS = int(os.environ.get("HAR_INGEST_WORKERS", "2"))
+MAX_FINISHED = 100  # finished jobs kept around for status queries
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+_FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work function once cancellation was requested."""
+
+
+class Job:
+    """
+    A background ingestion job and its progress.
+
+    The work function receives the job and calls ``report`` as it goes;
+    ``report`` raises ``JobCancelled`` after ``cancel`` so the work stops at
+    the next progress point.
+    """
+
+    def __init__(self, kind: str, total_bytes: int, **meta: Any):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.meta = meta
+        self.status = QUEUED
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.entries = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Optional live view of what the job has produced so far (``info()["stats"]``).
+        self.snapshot: Optional[Callable[[], Optional[Dict[str, Any]]]] = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _FINISHED
+
+    def cancel(self) -> bool:
+        """Request cancellation; returns False if the job already finished."""
+        if self.finished:
+            return False
+        self._cancel.set()
+        return True
+
+    def report(self, bytes_read: int, entries: int) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.bytes_read = bytes_read
+        self.entries = entries
+
+    def eta(self) -> Optional[float]:
+        """Seconds left, extrapolated from the read rate so far."""
+        if self.status != RUNNING or not self.bytes_read or self.started_at is None:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.total_bytes - self.bytes_read, 0)
+        return elapsed * remaining / self.bytes_read
+
+    def info(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "bytesRead": self.bytes_read,
+            "totalBytes": self.total_bytes,
+            "progress": min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else (1.0 if self.status == DONE else 0.0),
+            "entries": self.entries,
+            "elapsed": end - self.started_at if self.started_at is not None else 0.0,
+            "eta": self.eta(),
+            "result": self.result,
+            "error": self.error,
+            "stats": self.snapshot() if self.snapshot is not None else None,
+            **self.meta,
+        }
+
+
+class JobManager:
+    """Runs ingestion jobs on a small thread pool, off the event loop."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job, work: Callable[[Job], Dict[str, Any]], cleanup: Optional[Callable[[], None]] = None) -> Job:
+        """
+        Run ``work(job)`` in the pool. Its return value becomes ``job.result``;
+        ``cleanup`` runs if the job fails or is cancelled.
+        """
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, work, cleanup)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, work: Callable[[Job], Dict[str, Any]], cleanup: Optional[Callable[[], None]]) -> None:
+        job.started_at = time.time()
+        try:
+            if job._cancel.is_set():
+                raise JobCancelled()
+            job.status = RUNNING
+            job.result = work(job)
+            job.bytes_read = job.total_bytes
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+        if job.status != DONE and cleanup is not None:
+            cleanup()
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.finished]
+        for job_id in finished[: max(len(finished) - MAX_FINISHED, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,314 @@
+"""
+Captures recorded live: HAR entries are appended while a load runs and
+followers are notified through server-sent events.
+
+Entries are posted as newline-delimited JSON (one HAR entry per line) to
+``/api/live/<id>/entries``; the request body may stay open and keep
+streaming. This module also runs as a client that follows a growing file
+of such lines and streams it to a server:
+
+    python -m server.live loadtest.ndjson --server http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.client import HTTPConnection, HTTPSConnection
+from operator import itemgetter
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from server.aggregates import Aggregates
+from server.captures import Capture, CaptureData
+from server.entry_index import EntryIndex
+from server.entry_store import EntryStore
+from server.fast_json import dumps
+from server.har_stream import iter_ndjson_entries
+from server.har_utils import EntryNormalizer
+from server.metrics import INGEST_ENTRIES, stage
+from server.raw_entries import RawEntryReader
+
+LIVE_BATCH = 1000  # lines appended (and indexed) at a time
+EVENT_ROWS = 500  # newest rows sent with an ``entries`` event
+KEEPALIVE_SECONDS = 15.0  # comment line sent to idle followers
+TAIL_CHUNK = 1 << 20  # bytes read per step while following a file
+
+
+class LiveClosed(Exception):
+    """Raised by ``LiveCapture.append`` once the capture was closed."""
+
+
+def sse(event: str, data: str) -> bytes:
+    """One server-sent event; ``data`` is a single line (compact JSON)."""
+    return f"event: {event}\ndata: {data}\n\n".encode("utf-8")
+
+
+async def ndjson_batches(chunks: AsyncIterator[bytes], batch: int = LIVE_BATCH) -> AsyncIterator[List[bytes]]:
+    """Complete lines of a streamed body as they arrive, at most ``batch`` at a time."""
+    parts: List[bytes] = []
+    async for chunk in chunks:
+        if b"\n" not in chunk:
+            parts.append(chunk)
+            continue
+        head, _, tail = chunk.rpartition(b"\n")
+        parts.append(head)
+        lines = b"".join(parts).split(b"\n")
+        parts = [tail]
+        for k in range(0, len(lines), batch):
+            yield lines[k : k + batch]
+    last = b"".join(parts)
+    if last.strip():
+        yield [last]
+
+
+class LiveCapture(Capture):
+    """
+    A capture that grows while it is recorded.
+
+    ``append`` writes each batch of entries to a newline-delimited spool
+    file and adds it to the loaded data: entries go through the same
+    normalizer as the earlier ones, the capture totals are brought up to
+    date and the index is extended from the previous one
+    (``EntryIndex.extend``), then swapped into the capture's one
+    ``CaptureData`` (``CaptureData.advance``): requests already running keep
+    the index they started with, cursors stay valid and cached results for
+    the earlier rows age out. An open live capture is never unloaded; once
+    closed it is like any other capture and is reloaded from its spool when
+    needed.
+    """
+
+    def __init__(self, capture_id: str, name: str, path: str):
+        super().__init__(capture_id, name, path)
+        self.open = True
+        self._normalizer = EntryNormalizer()
+        self._append_lock = threading.Lock()
+        # One event per follower (see ``events``); only touched on the event loop.
+        self._subscribers: Set[asyncio.Event] = set()
+
+    def _read(self, progress: Optional[Callable[[int, int], None]]) -> Tuple[EntryStore, EntryIndex, Aggregates]:
+        normalizer = EntryNormalizer()
+        store = EntryStore(RawEntryReader(self.path))
+        with stage("ingest.parse"):
+            for e, start, end in iter_ndjson_entries(self.path):
+                store.append(normalizer.add(e), (start, end))
+        with stage("ingest.index"):
+            index = EntryIndex(store, growable=self.open)
+        self._normalizer = normalizer
+        return store, index, Aggregates.of(store)
+
+    def append(self, lines: Sequence[bytes], first_line: int = 1) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Add the HAR entries in ``lines`` (one JSON object each; blank lines
+        are skipped). Returns how many were added and, for each rejected
+        line, its number (counting from ``first_line``) and the error.
+        Raises ``LiveClosed`` after ``close``.
+
+        The batch is normalized before anything is written, so a bad line is
+        rejected on its own; if adding the rest fails, the spool, the store
+        and the normalizer are rolled back and all of its lines are rejected.
+        """
+        parsed: List[Tuple[int, Dict[str, Any], bytes]] = []
+        errors: List[Dict[str, Any]] = []
+        for n, line in enumerate(lines, first_line):
+            text = line.strip()
+            if not text:
+                continue
+            try:
+                entry = json.loads(text)
+            except ValueError as e:
+                errors.append({"line": n, "error": str(e)})
+                continue
+            if not isinstance(entry, dict):
+                errors.append({"line": n, "error": "entry object expected"})
+                continue
+            parsed.append((n, entry, text))
+        with self._append_lock:
+            if not self.open:
+                raise LiveClosed(self.id)
+            if not parsed:
+                return 0, errors
+            data = self.load()
+            before = self._normalizer.state()
+            accepted = self._normalize(parsed, errors)
+            if not accepted:
+                return 0, sorted(errors, key=itemgetter("line"))
+            store = data.entries
+            count = len(store)
+            size = os.path.getsize(self.path)
+            try:
+                with stage("live.append"):
+                    spans = []
+                    with open(self.path, "ab") as f:
+                        pos = f.tell()
+                        for _, _, text in accepted:
+                            f.write(text + b"\n")
+                            spans.append((pos, pos + len(text)))
+                            pos += len(text) + 1
+                    # Large bodies are located in the spool while appending
+                    store.reader.refresh()
+                    for (_, row, _), span in zip(accepted, spans):
+                        store.append(row, span)
+                    data.aggregates.update(store)
+                with stage("live.index"):
+                    index = data.index.extend()
+            except Exception as e:
+                self._rollback(data, count, size, before)
+                errors.extend({"line": n, "error": str(e)} for n, _, _ in accepted)
+                return 0, sorted(errors, key=itemgetter("line"))
+            INGEST_ENTRIES.inc(len(accepted), "live")
+            data.advance(index, data.aggregates)
+        return len(accepted), sorted(errors, key=itemgetter("line"))
+
+    def _normalize(self, parsed: Sequence[Tuple[int, Dict[str, Any], bytes]], errors: List[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any], bytes]]:
+        # Rows that normalize and fit a store (checked on a scratch one);
+        # the normalizer state of a rejected line is undone.
+        check = EntryStore()
+        accepted = []
+        for n, entry, text in parsed:
+            state = self._normalizer.state()
+            try:
+                row = self._normalizer.add(entry)
+                check.append(row)
+            except Exception as e:
+                self._normalizer.restore(state)
+                check.truncate(len(accepted))
+                errors.append({"line": n, "error": str(e)})
+                continue
+            accepted.append((n, row, text))
+        return accepted
+
+    def _rollback(self, data: CaptureData, count: int, size: int, state: Tuple[Any, ...]) -> None:
+        # Undo a batch that failed half way: cut the spool and the store back
+        # to ``size`` bytes and ``count`` rows and recount the totals, which
+        # may have been partly updated.
+        store = data.entries
+        store.truncate(count)
+        with open(self.path, "r+b") as f:
+            f.truncate(size)
+        store.reader.refresh()
+        self._normalizer.restore(state)
+        data.advance(data.index, Aggregates.of(store))
+
+    def close(self) -> None:
+        """Stop accepting entries; followers get a ``closed`` event once notified."""
+        with self._append_lock:
+            self.open = False
+
+    @property
+    def evictable(self) -> bool:
+        # Appends go to the loaded data, so it stays until the capture is closed.
+        return not self.open
+
+    def unload(self) -> None:
+        if self.evictable:
+            super().unload()
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "live": self.open}
+
+    def notify(self) -> None:
+        """Wake the followers after a batch or ``close``; call on the event loop."""
+        for changed in self._subscribers:
+            changed.set()
+
+    async def events(self, keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[bytes]:
+        """
+        Server-sent events for one follower: ``entries`` (the entry count and
+        the newest rows added since the previous event, at most
+        ``EVENT_ROWS``) and ``stats`` (totals of the whole capture) on
+        subscribing and after each batch, then ``closed``. Batches that
+        arrive while the follower is still sending are covered by one event.
+        """
+        changed = asyncio.Event()
+        self._subscribers.add(changed)
+        sent: Optional[int] = None
+        try:
+            while True:
+                data = self.data
+                if data is not None and len(data.index) != sent:
+                    yield _entries_event(data, sent or 0)
+                    yield sse("stats", dumps(data.aggregates.stats()).decode("utf-8"))
+                    sent = len(data.index)
+                if not self.open:
+                    yield sse("closed", json.dumps({"count": sent or 0}))
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                changed.clear()
+        finally:
+            self._subscribers.discard(changed)
+
+
+def _entries_event(data: CaptureData, sent: int) -> bytes:
+    count = len(data.index)
+    start = max(sent, count - EVENT_ROWS)
+    rows = data.entries.summaries_json(range(start, count))
+    return sse("entries", f'{{"version":{data.version},"count":{count},"from":{sent},"skipped":{start - sent},"entries":{rows}}}')
+
+
+def follow(path: str, poll: float, once: bool = False) -> Iterator[bytes]:
+    """
+    Complete lines of ``path`` as it grows, a chunk at a time. Ends at the
+    end of the file with ``once``, otherwise on Ctrl-C.
+    """
+    pending = b""
+    with open(path, "rb") as f:
+        try:
+            while True:
+                chunk = f.read(TAIL_CHUNK)
+                if not chunk:
+                    if once:
+                        break
+                    time.sleep(poll)
+                    continue
+                head, sep, pending = (pending + chunk).rpartition(b"\n")
+                if sep:
+                    yield head + sep
+        except KeyboardInterrupt:
+            pass
+    if pending.strip():
+        yield pending
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m server.live", description="Stream a growing file of HAR entries (one per line) into a live capture.")
+    parser.add_argument("path", help="newline-delimited HAR entries, e.g. written by a load test")
+    parser.add_argument("--server", default="http://127.0.0.1:8000")
+    parser.add_argument("--capture", help="append to this live capture instead of creating one")
+    parser.add_argument("--name", help="name of the new capture (default: the file name)")
+    parser.add_argument("--poll", type=float, default=0.5, help="seconds between checks for new lines")
+    parser.add_argument("--once", action="store_true", help="stop at the end of the file instead of following it")
+    parser.add_argument("--keep-open", action="store_true", help="do not close the capture when done")
+    args = parser.parse_args(argv)
+    url = urlsplit(args.server)
+    connection = HTTPSConnection if url.scheme == "https" else HTTPConnection
+
+    def call(path: str, body: Any = None) -> Any:
+        conn = connection(url.netloc)
+        try:
+            headers = {"Content-Type": "application/x-ndjson"} if body is not None else {}
+            conn.request("POST", url.path.rstrip("/") + path, body=body, headers=headers, encode_chunked=body is not None)
+            resp = conn.getresponse()
+            result = json.loads(resp.read() or b"null")
+        finally:
+            conn.close()
+        if resp.status >= 400:
+            raise SystemExit(f"POST {path}: {resp.status} {result}")
+        return result
+
+    capture_id = args.capture or call("/api/live?" + urlencode({"name": args.name or os.path.basename(args.path)}))["captureId"]
+    print(f"live capture {capture_id}", file=sys.stderr)
+    result = call(f"/api/live/{capture_id}/entries", follow(args.path, args.poll, args.once))
+    print(json.dumps(result, ensure_ascii=False))
+    if not args.keep_open:
+        call(f"/api/live/{capture_id}/close")
+    return 1 if result["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,38 @@
+import hashlib
+import math
 import os
-from typing import Optional
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi import Depends, FastAPI, Request, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from starlette.templating import Jinja2Templates
 
+from server.aggregates import Aggregates
+from server.bodies import Body
+from server.captures import Capture, CaptureData, CaptureRegistry, capture_id_for, file_digest
+from server.columnar import MEDIA_TYPE as COLUMNS_MEDIA_TYPE, encode_summaries
 from server.har_utils import (
-    parse_har_file,
-    normalize_entries,
     build_entry_summary,
     build_entry_detail,
-    build_stats,
 )
-from server.event_relations import build_event_graph, build_phase_stats
+from server.critical_path import MAX_CHAINS
+from server.entry_index import EntryFilter, EntryIndex
+from server.fast_json import FastJSONResponse, RawJSONResponse, json_str
+from server.entry_store import PHASES, EntryStore
+from server.query_cache import decode_cursor, encode_cursor, normalize_filter
+from server.jobs import Job, JobCancelled, JobManager
+from server.live import LiveCapture, LiveClosed, ndjson_batches
+from server.metrics import SERVER_METRICS, Gauge, MetricsMiddleware, stage
+from server.sketches import DIMENSIONS, METRICS, RELATIVE_ACCURACY, Distribution, merge_named, quantile_label
+from server.waterfall import MAX_ROWS, MAX_WIDTH, concurrency
 
 
 app = FastAPI(title="HAR Viewer")
+app.add_middleware(MetricsMiddleware)
 
 # Folders
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -27,14 +43,47 @@ TEMPLATE_DIR = os.path.join(ROOT_DIR, "templates")
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # spool uploads to disk 1 MiB at a time
+DEFAULT_GRAPH_NODES = 2000  # event graph nodes per response unless ``limit`` is given
+MAX_GRAPH_NODES = 20000
+LIVE_MAX_ERRORS = 20  # rejected lines reported back per append request
+
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 templates = Jinja2Templates(directory=TEMPLATE_DIR)
 
 
-STATE = {
-    "har_path": None,  # type: Optional[str]
-    "entries": [],
-}
+REGISTRY = CaptureRegistry()
+# Captures uploaded before a restart come back from their sidecars
+REGISTRY.restore(UPLOAD_DIR)
+JOBS = JobManager()
+
+SERVER_METRICS.add(
+    Gauge(
+        "har_capture_memory_bytes",
+        "Estimated memory of each loaded capture.",
+        ("capture",),
+        collect=lambda: [((info["id"],), info["memoryBytes"]) for info in map(Capture.info, REGISTRY.list()) if info["loaded"]],
+    )
+)
+SERVER_METRICS.add(Gauge("har_memory_budget_bytes", "Memory budget of loaded captures.", collect=lambda: [((), REGISTRY.memory_budget)]))
+
+
+def _cache_path(capture_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{capture_id}.harc")
+
+
+# Served when nothing has been loaded yet and no capture was requested.
+_EMPTY = CaptureData("", EntryStore(), EntryIndex(EntryStore()))
+
+
+def get_capture(capture: Optional[str] = None) -> CaptureData:
+    """Resolve the ``capture`` query parameter (default: the last loaded capture)."""
+    data = REGISTRY.get(capture)
+    if data is None:
+        if capture:
+            raise HTTPException(status_code=404, detail="未找到抓包")
+        return _EMPTY
+    return data
 
 
 @app.get("/")
@@ -47,26 +96,63 @@ async def events_page(request: Request):
     return templates.TemplateResponse("events.html", {"request": request})
 
 
-@app.post("/api/upload")
+def _ingest(capture: Capture, owned_path: Optional[str] = None) -> Job:
+    """
+    Register ``capture`` and load it in a background job.
+
+    If the job fails or is cancelled, a newly registered capture is removed
+    again together with ``owned_path`` (the spooled upload).
+    """
+    registered = REGISTRY.add(capture)
+    job = Job("ingest", os.path.getsize(registered.path), captureId=registered.id, name=capture.name)
+    job.snapshot = registered.stats
+
+    def work(job: Job):
+        try:
+            data = REGISTRY.activate(registered.id, job.report)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            raise ValueError(f"HAR 解析失败: {e}") from e
+        return {"captureId": registered.id, "count": len(data.entries)}
+
+    def cleanup():
+        if registered is capture:
+            REGISTRY.remove(capture.id)
+            if owned_path and os.path.exists(owned_path):
+                os.remove(owned_path)
+
+    return JOBS.submit(job, work, cleanup)
+
+
+@app.post("/api/upload", status_code=202)
 async def upload_har(file: UploadFile = File(...)):
+    """上传 HAR 文件；解析在后台任务中进行，立即返回任务 id。"""
     if not file.filename.endswith(".har"):
         raise HTTPException(status_code=400, detail="请上传 .har 文件")
-    target = os.path.join(UPLOAD_DIR, file.filename)
-    content = await file.read()
-    with open(target, "wb") as f:
-        f.write(content)
-    try:
-        har = parse_har_file(target)
-        entries = normalize_entries(har)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"HAR 解析失败: {e}")
-
-    STATE["har_path"] = target
-    STATE["entries"] = entries
-    return {"message": "上传并解析成功", "entries": [build_entry_summary(e) for e in entries]}
+    # Spool under a temp name while hashing; the content hash is the capture id
+    tmp = os.path.join(UPLOAD_DIR, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    with open(tmp, "wb") as f:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    capture_id = capture_id_for(digest.hexdigest())
+    deduplicated = capture_id in REGISTRY
+    if deduplicated:
+        os.remove(tmp)
+        job = _ingest(Capture(capture_id, file.filename, ""))
+    else:
+        target = os.path.join(UPLOAD_DIR, f"{capture_id}.har")
+        os.replace(tmp, target)
+        job = _ingest(Capture(capture_id, file.filename, target, _cache_path(capture_id)), owned_path=target)
+    return {"message": "上传成功，正在解析", "jobId": job.id, "captureId": capture_id, "deduplicated": deduplicated}
 
 
-@app.get("/api/load-sample")
+@app.get("/api/load-sample", status_code=202)
 async def load_sample():
     # Try local sample files
     candidates = [
@@ -81,65 +167,96 @@ async def load_sample():
     if not target:
         raise HTTPException(status_code=404, detail="未找到示例 HAR 文件")
 
+    capture_id = capture_id_for(await run_in_threadpool(file_digest, target))
+    job = _ingest(Capture(capture_id, os.path.basename(target), target, _cache_path(capture_id)))
+    return {"message": "正在加载示例 HAR", "jobId": job.id, "captureId": capture_id}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """后台解析任务的状态与进度（已读字节、已解析条目、预计剩余时间）。"""
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="未找到任务")
+    return job.info()
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """取消尚未完成的解析任务。"""
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="未找到任务")
+    if not job.cancel():
+        raise HTTPException(status_code=409, detail="任务已结束")
+    return job.info()
+
+
+@app.get("/api/captures")
+async def list_captures():
+    """列出已登记的抓包（含是否在内存中与估算内存占用）；latest 为未指定 capture 时使用的抓包。"""
+    return {"captures": [c.info() for c in REGISTRY.list()], "latest": REGISTRY.latest, "memoryBudget": REGISTRY.memory_budget}
+
+
+def _live_capture(capture_id: str) -> LiveCapture:
+    capture = REGISTRY.find(capture_id)
+    if not isinstance(capture, LiveCapture):
+        raise HTTPException(status_code=404, detail="未找到实时抓包")
+    return capture
+
+
+@app.post("/api/live")
+async def create_live_capture(name: Optional[str] = None):
+    """创建实时抓包并设为当前抓包；之后以 NDJSON 流式追加条目，通过 SSE 订阅更新。"""
+    capture_id = uuid.uuid4().hex[:16]
+    path = os.path.join(UPLOAD_DIR, f"{capture_id}.ndjson")
+    open(path, "wb").close()
+    capture = REGISTRY.add(LiveCapture(capture_id, name or f"live-{capture_id[:8]}", path))
+    await run_in_threadpool(REGISTRY.activate, capture_id)
+    return {"captureId": capture_id, "name": capture.name}
+
+
+@app.post("/api/live/{capture_id}/entries")
+async def append_live_entries(capture_id: str, request: Request):
+    """向实时抓包流式追加条目（NDJSON，每行一个 HAR entry，请求体可持续发送）；每收到一批即增量更新索引与统计并推送给订阅者。"""
+    live = _live_capture(capture_id)
+    accepted = 0
+    errors: List[Dict[str, Any]] = []
+    rejected = 0
+    line = 1
+    async for lines in ndjson_batches(request.stream()):
+        try:
+            added, bad = await run_in_threadpool(live.append, lines, line)
+        except LiveClosed:
+            raise HTTPException(status_code=409, detail="实时抓包已结束")
+        line += len(lines)
+        accepted += added
+        rejected += len(bad)
+        errors.extend(bad[: max(LIVE_MAX_ERRORS - len(errors), 0)])
+        if added:
+            live.notify()
+    data = live.data
+    return {"accepted": accepted, "rejected": rejected, "errors": errors, "count": len(data.entries) if data is not None else 0}
+
+
+@app.post("/api/live/{capture_id}/close")
+async def close_live_capture(capture_id: str):
+    """结束实时抓包：不再接受追加，订阅的事件流随之结束。"""
+    live = _live_capture(capture_id)
+    await run_in_threadpool(live.close)
+    live.notify()
+    return live.info()
+
+
+@app.get("/api/live/{capture_id}/events")
+async def live_capture_events(capture_id: str):
+    """SSE 事件流：entries（条目数与新增条目摘要）、stats（总统计），抓包结束时发送 closed。"""
+    live = _live_capture(capture_id)
+    return StreamingResponse(live.events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _parse_filter(request: Request) -> EntryFilter:
     try:
-        har = parse_har_file(target)
-        entries = normalize_entries(har)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"HAR 解析失败: {e}")
-
-    STATE["har_path"] = target
-    STATE["entries"] = entries
-    return {"message": "已加载示例 HAR", "entries": [build_entry_summary(e) for e in entries]}
-
-
-def _filter_entries(entries, q: Optional[str], domain: Optional[str], status: Optional[str], mime: Optional[str], method: Optional[str], rtype: Optional[str], priority: Optional[str], status_min: Optional[int], status_max: Optional[int]):
-    def match(e):
-        ok = True
-        if q:
-            ql = q.lower()
-            ok = ok and (
-                (e.get("url", "").lower().find(ql) != -1)
-                or (str(e.get("status", "")).find(ql) != -1)
-                or ((e.get("mimeType") or "").lower().find(ql) != -1)
-            )
-        if domain:
-            try:
-                from urllib.parse import urlparse
-
-                ok = ok and (urlparse(e.get("url", "")).netloc == domain)
-            except Exception:
-                ok = False
-        if status:
-            ok = ok and (str(e.get("status")) == str(status))
-        if status_min is not None:
-            try:
-                ok = ok and (int(e.get("status", 0)) >= int(status_min))
-            except Exception:
-                pass
-        if status_max is not None:
-            try:
-                ok = ok and (int(e.get("status", 0)) <= int(status_max))
-            except Exception:
-                pass
-        if mime:
-            ok = ok and ((e.get("mimeType") or "") == mime)
-        if method:
-            ok = ok and ((e.get("method") or "") == method)
-        if rtype:
-            ok = ok and ((e.get("resourceType") or "") == rtype)
-        if priority:
-            ok = ok and (str(e.get("priority") or "") == str(priority))
-        return ok
-
-    return list(filter(match, entries))
-
-
-@app.get("/api/entries")
-async def list_entries(request: Request):
-    # Pagination and filters
-    try:
-        offset = int(request.query_params.get("offset", 0))
-        limit = int(request.query_params.get("limit", 200))
         q = request.query_params.get("q")
         domain = request.query_params.get("domain")
         status = request.query_params.get("status")
@@ -151,117 +268,370 @@ async def list_entries(request: Request):
         status_max = request.query_params.get("statusMax")
         status_min = int(status_min) if status_min is not None else None
         status_max = int(status_max) if status_max is not None else None
+        body = request.query_params.get("body") in ("1", "true")
+        time_from = _finite(request.query_params.get("from"))
+        time_to = _finite(request.query_params.get("to"))
+    except Exception:
+        raise HTTPException(status_code=400, detail="筛选参数错误")
+    f = EntryFilter(q, domain, status, mime, method, rtype, priority, status_min, status_max, body, time_from, time_to)
+    return normalize_filter(f)
+
+
+def _finite(value: Optional[str]) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    v = float(value)
+    if not math.isfinite(v):
+        raise ValueError(value)
+    return v
+
+
+def _filtered_ranks(cap: CaptureData, index: EntryIndex, f: EntryFilter, rows: Optional[int] = None):
+    """
+    Matching ranks (positions in start-time order of ``index``) for ``f``,
+    through the query cache; with ``rows``, only those of the first ``rows``
+    entries (what a cursor saw of a live capture).
+    """
+    if f.body:
+        index.start_body_index()
+    n = len(index)
+    rows = n if rows is None else rows
+    key = (n, rows, f)
+    ranks = cap.query_cache.get(key)
+    if ranks is None:
+        with stage("filter"):
+            ranks = index.filter(f)
+        if ranks is None:
+            return index.first_rows(range(n), rows)
+        ranks = index.first_rows(ranks, rows)
+        # Partial body results must not outlive the body index build
+        if not f.body or index.body_index_ready:
+            cap.query_cache.put(key, ranks)
+    return ranks
+
+
+def _entry_page(request: Request, cap: CaptureData) -> Tuple[EntryIndex, EntryFilter, int, List[int], Optional[str]]:
+    """Index used, filter, total, ids of the requested page and the cursor of the next one."""
+    # Pagination and filters; a cursor carries both, plus the entry count
+    # it started at, so later pages skip entries a live capture added since.
+    cursor = request.query_params.get("cursor")
+    try:
+        limit = int(request.query_params.get("limit", 200))
+        if cursor:
+            version, rows, f, offset = decode_cursor(cursor)
+        else:
+            offset = int(request.query_params.get("offset", 0))
     except Exception:
         raise HTTPException(status_code=400, detail="分页参数错误")
+    index = cap.index
+    if cursor:
+        if version != cap.version or rows > len(index):
+            raise HTTPException(status_code=410, detail="游标已失效，请重新查询")
+    else:
+        f = _parse_filter(request)
+        rows = len(index)
+
+    # Ranks are positions in start-time order, so a page is just a slice
+    ranks = _filtered_ranks(cap, index, f, rows)
+    total = len(ranks)
+    page = index.ids(ranks[offset : offset + limit])
+    next_offset = offset + len(page)
+    next_cursor = encode_cursor(cap.version, rows, f, next_offset) if page and next_offset < total else None
+    return index, f, total, page, next_cursor
+
 
-    entries = STATE["entries"]
-    filtered = _filter_entries(entries, q, domain, status, mime, method, rtype, priority, status_min, status_max)
-    total = len(filtered)
-    # Sort by start time for stable order
-    filtered.sort(key=lambda e: e.get("started_ms", 0))
-    page = filtered[offset : offset + limit]
-    return {"total": total, "entries": [build_entry_summary(e) for e in page]}
+# Plain ``def``: serializing a large page runs in the threadpool.
+@app.get("/api/entries")
+def list_entries(request: Request, cap: CaptureData = Depends(get_capture)):
+    index, f, total, page, next_cursor = _entry_page(request, cap)
+    # Rows are serialized straight from the columns (see ``EntryStore.summaries_json``)
+    with stage("serialize"):
+        rows = cap.entries.summaries_json(page)
+    fields = [f'"total":{total}', f'"entries":{rows}', f'"nextCursor":{json_str(next_cursor)}']
+    if f.body:
+        fields.append(f'"bodyIndexReady":{"true" if index.body_index_ready else "false"}')
+    return RawJSONResponse("{" + ",".join(fields) + "}")
+
+
+# Declared before ``/api/entries/{entry_id}``, which would otherwise match it.
+@app.get("/api/entries/columns")
+def list_entry_columns(request: Request, cap: CaptureData = Depends(get_capture)):
+    """与 /api/entries 参数相同，但以二进制列式格式返回（前端可直接包装为 TypedArray）。"""
+    index, f, total, page, next_cursor = _entry_page(request, cap)
+    fields: Dict[str, Any] = {"total": total, "nextCursor": next_cursor}
+    if f.body:
+        fields["bodyIndexReady"] = index.body_index_ready
+    with stage("serialize"):
+        payload = encode_summaries(cap.entries, page, fields)
+    return Response(payload, media_type=COLUMNS_MEDIA_TYPE)
+
+
+# Plain ``def``: building a waterfall index for a new filter runs in the threadpool.
+@app.get("/api/waterfall")
+def get_waterfall(request: Request, cap: CaptureData = Depends(get_capture)):
+    """瀑布图分级细节：按像素列与行区间聚合的并发数、行范围与主导阶段（支持与列表相同的筛选参数）。"""
+    params = request.query_params
+    try:
+        t0 = _finite(params.get("t0"))
+        t1 = _finite(params.get("t1"))
+        width = min(max(int(params.get("width", 1000)), 1), MAX_WIDTH)
+        row_start = max(int(params.get("rowStart", 0)), 0)
+        row_end = int(params["rowEnd"]) if "rowEnd" in params else None
+        row_buckets = min(max(int(params.get("rows", 200)), 1), MAX_ROWS)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="瀑布图参数错误")
+    f = _parse_filter(request)
+    index = cap.index
+    ranks = _filtered_ranks(cap, index, f)
+    # Partial body results must not outlive the body index build
+    wf = cap.waterfall(index, f, lambda: index.ids(ranks), cache=not f.body or index.body_index_ready)
+    t_min = min(wf.rows.start(0), 0.0) if len(wf) else 0.0
+    t_max = wf.extent()
+    t0 = t_min if t0 is None else t0
+    t1 = max(t_max, t0 + 1.0) if t1 is None else t1
+    if t1 <= t0:
+        raise HTTPException(status_code=400, detail="瀑布图参数错误")
+    with stage("waterfall.render"):
+        result = wf.level_of_detail(cap.entries, t0, t1, width, row_start, len(wf) if row_end is None else row_end, row_buckets)
+    result.update({"total": len(wf), "tMin": t_min, "tMax": t_max, "phases": list(PHASES)})
+    return result
+
+
+@app.get("/api/concurrency")
+def get_concurrency(request: Request, cap: CaptureData = Depends(get_capture)):
+    """并发时间线：每个时间桶内处于进行中的请求数（总计及按主机）。"""
+    params = request.query_params
+    try:
+        t0 = _finite(params.get("t0"))
+        t1 = _finite(params.get("t1"))
+        width = min(max(int(params.get("width", 200)), 1), MAX_WIDTH)
+        top = max(int(params.get("top", 10)), 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="并发参数错误")
+    index = cap.index
+    entries = cap.entries
+    lifetimes = index.lifetimes()
+    n = len(lifetimes)
+    t_min = min(lifetimes.start(0), 0.0) if n else 0.0
+    t_max = lifetimes.max_end(0, n) if n else 0.0
+    t0 = t_min if t0 is None else t0
+    t1 = max(t_max, t0 + 1.0) if t1 is None else t1
+    if t1 <= t0:
+        raise HTTPException(status_code=400, detail="并发参数错误")
+
+    if "hosts" in params:
+        codes = [entries.hosts.code_of(h) for h in params["hosts"].split(",") if h]
+        codes = [c for c in codes if c is not None]
+    else:
+        # Busiest hosts first
+        codes = sorted(index.host, key=lambda c: len(index.posting(index.host, c)), reverse=True)[:top]
+    result = concurrency(lifetimes, t0, t1, width)
+    result.update({"total": n, "tMin": t_min, "tMax": t_max})
+    hosts = []
+    for c in codes:
+        per_host = concurrency(index.host_lifetimes(c), t0, t1, width)
+        hosts.append({"host": entries.hosts[c], "count": len(index.posting(index.host, c)), "inFlight": per_host["inFlight"], "average": per_host["average"]})
+    result["hosts"] = hosts
+    return result
+
+
+@app.get("/api/cache-stats")
+async def get_cache_stats(cap: CaptureData = Depends(get_capture)):
+    """查询缓存命中统计。"""
+    return cap.query_cache.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的服务指标（请求与各阶段耗时直方图、解析速率、抓包内存、缓存命中）。"""
+    return PlainTextResponse(SERVER_METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/api/entries/{entry_id}")
-async def get_entry(entry_id: int):
-    entries = STATE["entries"]
+def get_entry(entry_id: int, cap: CaptureData = Depends(get_capture)):
+    """条目详情（不内联响应体，响应体经 /body 预览或 /download 获取）。"""
+    entries = cap.entries
     if entry_id < 0 or entry_id >= len(entries):
         raise HTTPException(status_code=404, detail="未找到条目")
-    return build_entry_detail(entries[entry_id])
+    with stage("detail"):
+        detail = build_entry_detail(entries[entry_id])
+    return FastJSONResponse(detail)
 
 
 @app.get("/api/entries/{entry_id}/body")
-async def get_entry_body(entry_id: int):
-    entries = STATE["entries"]
+def get_entry_body(entry_id: int, cap: CaptureData = Depends(get_capture)):
+    """返回响应体预览（只解码预览所需的前缀）。"""
+    entries = cap.entries
     if entry_id < 0 or entry_id >= len(entries):
         raise HTTPException(status_code=404, detail="未找到条目")
-    raw = entries[entry_id].get("_raw", {})
-    resp = raw.get("response", {}) or {}
-    content = resp.get("content", {}) or {}
-    mime = content.get("mimeType") or "application/octet-stream"
-    text = content.get("text")
-    encoding = content.get("encoding")
-    size = int(content.get("size") or resp.get("bodySize") or 0)
-
-    max_preview = 200_000  # chars
-    result = {"mimeType": mime, "encoding": encoding, "size": size, "truncated": False}
-    if text is None:
-        return result
-
-    if encoding == "base64":
-        # Return data URL for image preview; otherwise return truncated base64 or decoded text as preview
-        try:
-            import base64
-
-            raw_bytes = base64.b64decode(text)
-            if mime.startswith("image/"):
-                # Provide data URL directly (client will set <img src>)
-                b64 = text if len(text) <= max_preview else text[:max_preview]
-                result.update({"dataUrl": f"data:{mime};base64,{b64}", "truncated": len(text) > max_preview, "isBinary": True})
-            else:
-                # Try decode as UTF-8 for preview
-                preview = raw_bytes.decode("utf-8", errors="replace")
-                if len(preview) > max_preview:
-                    preview = preview[:max_preview]
-                    result["truncated"] = True
-                result.update({"previewText": preview, "isBinary": False})
-        except Exception:
-            # Fallback to base64 preview
-            b64 = text if len(text) <= max_preview else text[:max_preview]
-            result.update({"previewText": b64, "isBinary": True, "truncated": len(text) > max_preview})
-    else:
-        # Plain text string
-        preview = text
-        if len(preview) > max_preview:
-            preview = preview[:max_preview]
-            result["truncated"] = True
-        result.update({"previewText": preview, "isBinary": False})
-    return result
+    with stage("body.preview"):
+        return Body(entries, entry_id).preview()
+
+
+_BYTE_RANGE = re.compile(r"\s*(\d*)-(\d*)\s*")
+
+
+def _byte_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """
+    ``[start, stop)`` of a single ``bytes=`` range over ``length`` bytes;
+    None when the header should be ignored (other units, several ranges,
+    invalid syntax). Raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    m = _BYTE_RANGE.fullmatch(spec)
+    if m is None or not any(m.groups()):
+        return None
+    first, last = m.groups()
+    if not first:
+        n = int(last)
+        if n <= 0:
+            raise ValueError(header)
+        return max(length - n, 0), length
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    stop = min(int(last) + 1, length) if last else length
+    if start >= length:
+        raise ValueError(header)
+    return start, stop
 
 
 @app.get("/api/entries/{entry_id}/download")
-async def download_entry_body(entry_id: int):
-    entries = STATE["entries"]
+def download_entry_body(entry_id: int, request: Request, cap: CaptureData = Depends(get_capture)):
+    """以流的形式下载解码后的响应体；支持单个 Range 区间。"""
+    entries = cap.entries
     if entry_id < 0 or entry_id >= len(entries):
         raise HTTPException(status_code=404, detail="未找到条目")
-    raw = entries[entry_id].get("_raw", {})
-    resp = raw.get("response", {}) or {}
-    content = resp.get("content", {}) or {}
-    mime = content.get("mimeType") or "application/octet-stream"
-    text = content.get("text")
-    encoding = content.get("encoding")
-    filename = f"entry-{entry_id}"
-
-    data = b""
-    if text is None:
-        data = b""
-    elif encoding == "base64":
-        import base64
-
-        try:
-            data = base64.b64decode(text)
-        except Exception:
-            data = text.encode("utf-8", errors="replace")
-    else:
-        data = str(text).encode("utf-8", errors="replace")
-
-    headers = {"Content-Type": mime, "Content-Disposition": f"attachment; filename={filename}"}
-    return Response(content=data, media_type=mime, headers=headers)
+    body = Body(entries, entry_id)
+    headers = {"Content-Disposition": f"attachment; filename=entry-{entry_id}", "Accept-Ranges": "bytes"}
+    range_header = request.headers.get("range")
+    if not range_header:
+        # Only known once the body has been decoded; otherwise sent chunked.
+        index = cap.cached_body_index(body)
+        if index is not None:
+            headers["Content-Length"] = str(index.length)
+        return StreamingResponse(body.stream(index=index), media_type=body.mime, headers=headers)
+
+    index = cap.body_index(body)
+    try:
+        span = _byte_range(range_header, index.length)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{index.length}"
+        return Response(status_code=416, headers=headers)
+    if span is None:
+        headers["Content-Length"] = str(index.length)
+        return StreamingResponse(body.stream(index=index), media_type=body.mime, headers=headers)
+    start, stop = span
+    headers["Content-Range"] = f"bytes {start}-{stop - 1}/{index.length}"
+    headers["Content-Length"] = str(stop - start)
+    return StreamingResponse(body.stream(start, stop, index), status_code=206, media_type=body.mime, headers=headers)
+
+
+def _aggregates(request: Request, cap: CaptureData) -> Aggregates:
+    """Totals over the entries matching the request's filters (precomputed when unfiltered)."""
+    f = _parse_filter(request)
+    if f == EntryFilter():
+        return cap.aggregates
+    index = cap.index
+    ranks = _filtered_ranks(cap, index, f)
+    # Partial body results must not outlive the body index build
+    return cap.filtered_aggregates(index, f, lambda: index.ids(ranks), cache=not f.body or index.body_index_ready)
 
 
 @app.get("/api/stats")
-async def get_stats():
-    return build_stats(STATE["entries"])
+def get_stats(request: Request, cap: CaptureData = Depends(get_capture)):
+    """总统计（支持与列表相同的筛选参数）。"""
+    return _aggregates(request, cap).stats()
 
 
 @app.get("/api/event-graph")
-async def get_event_graph():
-    """返回推断的事件关系图（节点与边）。"""
-    return build_event_graph(STATE["entries"])
+def get_event_graph(request: Request, cap: CaptureData = Depends(get_capture)):
+    """返回推断的事件关系图（节点与边，默认带服务端布局坐标）；支持子树根、深度限制、同主机叶子折叠、节点数上限与列表筛选参数。"""
+    params = request.query_params
+    try:
+        root = int(params["root"]) if params.get("root") else None
+        depth = int(params["depth"]) if params.get("depth") else None
+        limit = min(max(int(params.get("limit", DEFAULT_GRAPH_NODES)), 1), MAX_GRAPH_NODES)
+        collapse = params.get("collapse") in ("1", "true")
+        with_layout = params.get("layout") not in ("0", "false")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="关系图参数错误")
+    graph = cap.event_graph()
+    if root is not None and not 0 <= root < len(graph):
+        raise HTTPException(status_code=404, detail="未找到条目")
+    f = _parse_filter(request)
+    keep = None
+    if f != EntryFilter():
+        keep = bytearray(len(graph))
+        index = graph.index
+        for i in index.ids(_filtered_ranks(cap, index, f)):
+            keep[i] = 1
+    layout = cap.graph_layout(graph) if with_layout else None
+    with stage("graph.subgraph"):
+        result = graph.subgraph(keep, root, depth, collapse, limit, layout)
+    result.update({"totalNodes": len(graph), "totalEdges": graph.edge_count()})
+    return result
+
+
+@app.get("/api/critical-path")
+def get_critical_path(request: Request, cap: CaptureData = Depends(get_capture)):
+    """返回沿发起者关系耗时最长的请求链（关键路径）及各请求的阻塞时间；支持 top、root 参数。"""
+    params = request.query_params
+    try:
+        top = min(max(int(params.get("top", 10)), 1), MAX_CHAINS)
+        root = int(params["root"]) if params.get("root") else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="关键路径参数错误")
+    paths = cap.critical_paths()
+    if root is not None and not 0 <= root < len(paths.graph):
+        raise HTTPException(status_code=404, detail="未找到条目")
+    with stage("graph.chains"):
+        return paths.chains(top, root)
+
+
+@app.get("/api/analytics")
+def get_analytics(request: Request, cap: CaptureData = Depends(get_capture)):
+    """延迟与大小分布：分位数（DDSketch）与固定分桶直方图，按主机/资源类型/状态码类别分组，可跨多个抓包合并（支持筛选参数）。"""
+    params = request.query_params
+    try:
+        metrics = [m for m in params.get("metrics", ",".join(METRICS)).split(",") if m]
+        dims = [d for d in params.get("by", ",".join(DIMENSIONS)).split(",") if d]
+        qs = [float(q) for q in params.get("quantiles", "0.5,0.9,0.99").split(",") if q]
+        top = max(int(params.get("top", 50)), 0)
+        if not all(m in METRICS for m in metrics) or not all(d in DIMENSIONS for d in dims) or not all(0 <= q <= 1 for q in qs):
+            raise ValueError(params)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="分析参数错误")
+    if "captures" in params:
+        caps = [get_capture(c) for c in params["captures"].split(",") if c] or [cap]
+    else:
+        caps = [cap]
+    parts = [_aggregates(request, c) for c in caps]
+    with stage("analytics.merge"):
+        merged = merge_named([a.distributions_by_name(metrics, dims) for a in parts])
+    out: Dict[str, Any] = {}
+    for metric, by_dim in merged.items():
+        rendered: Dict[str, Any] = {"edges": list(METRICS[metric][1])}
+        for dim, groups in by_dim.items():
+            if dim == "all":
+                rendered[dim] = groups["all"].render(qs) if "all" in groups else Distribution(METRICS[metric][1]).render(qs)
+                continue
+            # Largest groups first
+            ranked = sorted(groups.items(), key=lambda kv: kv[1].sketch.count, reverse=True)[:top]
+            rendered[dim] = {name: dist.render(qs) for name, dist in ranked}
+        out[metric] = rendered
+    return {
+        "captures": [c.id for c in caps],
+        "count": sum(a.count for a in parts),
+        "quantiles": [quantile_label(q) for q in qs],
+        "relativeAccuracy": RELATIVE_ACCURACY,
+        "metrics": out,
+    }
 
 
 @app.get("/api/event-stats")
-async def get_event_stats():
-    """返回各阶段耗时的总计与按资源类型的分布统计。"""
-    return build_phase_stats(STATE["entries"])
\ No newline at end of file
+def get_event_stats(request: Request, cap: CaptureData = Depends(get_capture)):
+    """返回各阶段耗时的总计与按资源类型的分布统计（支持与列表相同的筛选参数）。"""
+    return _aggregates(request, cap).phase_stats()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond index lookups up to multi-minute ingestion.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+# Profile every request, not only those sending ``X-Profile: 1``.
+PROFILE_ALL = os.environ.get("HAR_PROFILE", "") in ("1", "true")
+PROFILE_HEADER = b"x-profile"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self, out: List[str]) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        self._samples(out)
+
+    def _samples(self, out: List[str]) -> None:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self, out: List[str]) -> None:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            out.append(f"{self.name}{_label_text(self.labels, labels)} {_num(v)}")
+
+
+class Gauge(_Metric):
+    """Last value set per label set; ``collect`` gauges are read at scrape time instead."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None,
+    ):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Labels, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def _samples(self, out: List[str]) -> None:
+        if self._collect is not None:
+            items = sorted(self._collect())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        for labels, v in items:
+            out.append(f"{self.name}{_label_text(self.labels, labels)} {_num(v)}")
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        k = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][k] += 1
+            series[1] += value
+
+    def _samples(self, out: List[str]) -> None:
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for le, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le_label = 'le="' + _num(le) + '"'
+                out.append(f"{self.name}_bucket{_label_text(self.labels, labels, le_label)} {cumulative}")
+            out.append(f"{self.name}_sum{_label_text(self.labels, labels)} {_num(total)}")
+            out.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+
+
+class Metrics:
+    """Metrics of this process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def add(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        out: List[str] = []
+        for m in self._metrics:
+            m.render(out)
+        return "\n".join(out) + "\n"
+
+
+SERVER_METRICS = Metrics()
+REQUEST_SECONDS = SERVER_METRICS.add(Histogram("har_http_request_duration_seconds", "Time to answer an HTTP request.", ("method", "route")))
+REQUESTS = SERVER_METRICS.add(Counter("har_http_requests_total", "HTTP requests answered.", ("method", "route", "status")))
+STAGE_SECONDS = SERVER_METRICS.add(Histogram("har_stage_duration_seconds", "Time spent in an instrumented stage.", ("stage",)))
+INGEST_ENTRIES = SERVER_METRICS.add(Counter("har_ingest_entries_total", "Entries loaded, by source (parse or sidecar).", ("source",)))
+INGEST_BYTES = SERVER_METRICS.add(Counter("har_ingest_bytes_total", "HAR bytes parsed."))
+INGEST_RATE = SERVER_METRICS.add(Gauge("har_ingest_entries_per_second", "Entries per second of the last load, by source.", ("source",)))
+CACHE_LOOKUPS = SERVER_METRICS.add(Counter("har_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result")))
+CACHE_EVICTIONS = SERVER_METRICS.add(Counter("har_cache_evictions_total", "Entries evicted from a cache.", ("cache",)))
+
+# Stages of the current request while it is profiled, else None.
+_PROFILE: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("har_profile", default=None)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(1, cache, "hit" if hit else "miss")
+
+
+class _Stage:
+    __slots__ = ("name", "seconds", "_t")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self._t = perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.seconds = perf_counter() - self._t
+        STAGE_SECONDS.observe(self.seconds, self.name)
+        spans = _PROFILE.get()
+        if spans is not None:
+            spans.append((self.name, self.seconds))
+
+
+def stage(name: str) -> _Stage:
+    """
+    Time a block as stage ``name``: observed in ``har_stage_duration_seconds``
+    and, when the current request is profiled, listed in its
+    ``Server-Timing`` header. The elapsed time is left in ``.seconds``.
+    """
+    return _Stage(name)
+
+
+def _server_timing(spans: List[Tuple[str, float]], total: float) -> bytes:
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in spans]
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route template.
+
+    A request sending ``X-Profile: 1`` (every request with ``HAR_PROFILE=1``)
+    collects the stages it runs through and gets them back in a
+    ``Server-Timing`` header, with the time until the response started as
+    ``total``. Stages running after that (a streamed body) are not listed.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        t = perf_counter()
+        spans: Optional[List[Tuple[str, float]]] = None
+        if PROFILE_ALL or (PROFILE_HEADER, b"1") in scope.get("headers", ()):
+            spans = []
+        token = _PROFILE.set(spans)
+        status = 500
+
+        async def send_timed(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if spans is not None:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"server-timing", _server_timing(spans, perf_counter() - t)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _PROFILE.reset(token)
+            # Route templates keep label values bounded; static files and 404s share one
+            route = getattr(scope.get("route"), "path", "other")
+            REQUEST_SECONDS.observe(perf_counter() - t, scope["method"], route)
+            REQUESTS.inc(1, scope["method"], route, str(status))
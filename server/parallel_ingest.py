@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.aggregates import Aggregates
+from server.entry_store import EntryStore
+from server.har_stream import check_har_tail, entries_array_start, find_entry_start, iter_entry_range
+from server.har_utils import EntryNormalizer
+from server.raw_entries import RawEntryReader
+
+# Files smaller than this are not worth the process start-up.
+PARALLEL_MIN_BYTES = int(os.environ.get("HAR_PARALLEL_MIN_MB", "64")) << 20
+MIN_RANGE_BYTES = 8 << 20
+RANGES_PER_WORKER = 4  # more ranges than workers, for load balancing
+
+
+def default_workers() -> int:
+    return int(os.environ.get("HAR_PARSE_PROCESSES", "0")) or os.cpu_count() or 1
+
+
+def split_ranges(lo: int, hi: int, workers: int) -> List[Tuple[int, int]]:
+    """Split the byte range ``[lo, hi)`` into roughly equal parts for ``workers`` processes."""
+    n = max(1, min(workers * RANGES_PER_WORKER, (hi - lo) // MIN_RANGE_BYTES))
+    bounds = [lo + (hi - lo) * k // n for k in range(n + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_range(path: str, lo: int, hi: int, exact: bool) -> Dict[str, Any]:
+    """
+    Normalize the entries starting in ``[lo, hi)`` into an ``EntryStore``.
+
+    With ``exact`` the first entry is known to start at ``lo``; otherwise it
+    is located with ``find_entry_start`` and the caller must verify that
+    ``first`` matches where the previous range stopped. ``started_ms`` is
+    left relative to the range; the parsed start times are returned so the
+    caller can rebase them against the whole capture.
+    """
+    first = lo if exact else find_entry_start(path, lo, hi)
+    result: Dict[str, Any] = {"first": first, "next": None, "closed": False, "store": None, "times": []}
+    if first is None:
+        return result
+    normalizer = EntryNormalizer(keep_times=True)
+    reader = RawEntryReader(path)
+    store = EntryStore(reader)
+    entries = iter_entry_range(path, first, hi)
+    try:
+        while True:
+            e, start, end = next(entries)
+            store.append(normalizer.add(e), (start, end))
+    except StopIteration as stop:
+        result["next"], result["closed"] = stop.value
+    except Exception:
+        if exact:
+            raise
+        # A wrong guess (e.g. a nested object); the caller re-parses this
+        # range from the right offset.
+        result["first"] = None
+        return result
+    finally:
+        reader.close()
+    # The reader (an mmap) stays in this process.
+    store.reader = None
+    result["store"] = store
+    result["times"] = normalizer.times
+    return result
+
+
+def _merge(store: EntryStore, normalizer: EntryNormalizer, part: Dict[str, Any]) -> None:
+    offset = len(store)
+    store.extend(part["store"])
+    times: List[Optional[datetime]] = part["times"]
+    durations = store.time
+    for k, t in enumerate(times):
+        store.started_ms[offset + k] = normalizer.start_offset(t, durations[offset + k])
+    normalizer.count += len(times)
+
+
+def load_entry_store_parallel(
+    path: str,
+    workers: int,
+    progress: Optional[Callable[[int, int], None]] = None,
+    aggregates: Optional[Aggregates] = None,
+) -> EntryStore:
+    """
+    Parallel counterpart of ``load_entry_store``.
+
+    The entries array is cut into byte ranges that worker processes parse
+    and normalize independently. Ranges are merged strictly in file order:
+    a range whose guessed first entry does not continue exactly where the
+    previous one stopped is re-parsed from the right offset, so the result
+    is identical to a sequential load.
+    """
+    store = EntryStore(RawEntryReader(path))
+    start = entries_array_start(path)
+    if start is None:
+        return store
+    ranges = split_ranges(start, os.path.getsize(path), workers)
+    normalizer = EntryNormalizer()
+    expected = start
+    closed = False
+    # Spawn: the server process has threads, which do not mix with fork.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=ctx) as pool:
+        futures = [pool.submit(parse_range, path, lo, hi, k == 0) for k, (lo, hi) in enumerate(ranges)]
+        try:
+            for (lo, hi), future in zip(ranges, futures):
+                if closed:
+                    future.cancel()
+                    continue
+                part = future.result()
+                if part["first"] != expected:
+                    part = parse_range(path, expected, hi, True)
+                _merge(store, normalizer, part)
+                expected, closed = part["next"], part["closed"]
+                if aggregates is not None:
+                    aggregates.update(store)
+                if progress is not None:
+                    progress(expected, len(store))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    # The last range ends at EOF, so it either closed the array or raised.
+    check_har_tail(path, expected)
+    return store
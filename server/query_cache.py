@@ -0,0 +1,100 @@
+import base64
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from server.entry_index import EntryFilter
+from server.metrics import CACHE_EVICTIONS, cache_lookup
+
+MAX_QUERIES = 256
+MAX_RANKS = 8_000_000  # total ranks held across all cached results (~32 MB)
+
+
+class QueryCache:
+    """
+    LRU cache of filtered rank lists.
+
+    Each loaded dataset has its own cache; keys combine the row counts a
+    result covers with the normalized filter, so a live capture that grew
+    misses instead of serving stale ranks. Eviction is by
+    entry count and by the total number of ranks stored.
+    """
+
+    def __init__(self, max_queries: int = MAX_QUERIES, max_ranks: int = MAX_RANKS):
+        self._items: "OrderedDict[Hashable, array]" = OrderedDict()
+        self._max_queries = max_queries
+        self._max_ranks = max_ranks
+        self._ranks = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[array]:
+        with self._lock:
+            ranks = self._items.get(key)
+            if ranks is None:
+                self.misses += 1
+                cache_lookup("query", False)
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        cache_lookup("query", True)
+        return ranks
+
+    def put(self, key: Hashable, ranks: array) -> None:
+        if len(ranks) > self._max_ranks:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._ranks -= len(old)
+            self._items[key] = ranks
+            self._ranks += len(ranks)
+            while len(self._items) > self._max_queries or self._ranks > self._max_ranks:
+                _, evicted = self._items.popitem(last=False)
+                self._ranks -= len(evicted)
+                self.evictions += 1
+                CACHE_EVICTIONS.inc(1, "query")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._ranks = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "queries": len(self._items),
+                "ranks": self._ranks,
+            }
+
+
+def normalize_filter(f: EntryFilter) -> EntryFilter:
+    """Canonical form used as cache key: empty strings unset, keyword lowercased."""
+    values = [v if v != "" else None for v in f]
+    nf = EntryFilter(*values)
+    return nf._replace(q=nf.q.lower() if nf.q else None, body=bool(nf.body and nf.q))
+
+
+def encode_cursor(version: int, rows: int, f: EntryFilter, offset: int) -> str:
+    """Token for the page at ``offset`` of the entries matching ``f`` among the first ``rows`` of dataset ``version``."""
+    raw = json.dumps([version, rows, list(f), offset], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Tuple[int, int, EntryFilter, int]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        version, rows, fields, offset = json.loads(raw)
+        return int(version), int(rows), EntryFilter(*fields), int(offset)
+    except Exception:
+        raise ValueError("invalid cursor") from None
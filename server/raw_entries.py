@@ -0,0 +1,156 @@
+import json
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_TEXT_KEY = re.compile(rb'"text"\s*:\s*"')
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+_ESCAPED = re.compile(rb"(?:[^\\]|\\u[0-9a-fA-F]{4}|\\[^u])*")
+
+CACHE_BYTES = 64 << 20  # budget for recently viewed, decoded entries (large bodies left out)
+CHUNK_BYTES = 256 << 10  # encoded bytes decoded per step by ``text_chunks``
+
+
+class RawEntryReader:
+    """
+    Read individual HAR entries back from the spooled file by byte offset.
+
+    The file is memory-mapped, so only the pages of entries that are
+    actually viewed are touched. Decoded entries are kept in a small LRU
+    bounded by their encoded size; a body with its own ``text_span`` is left
+    out of them and only decoded on request (``text``, ``text_chunks``).
+    """
+
+    def __init__(self, path: str, cache_bytes: int = CACHE_BYTES):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self._mm: Any = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Zero-length file cannot be mapped; nothing will ever be read from it.
+            self._mm = b""
+        self._cache: "OrderedDict[int, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._cache_bytes = cache_bytes
+        self._cached = 0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Map the file again after it grew (an append-only spool) or was cut
+        back after a failed append. Readers still holding the previous
+        mapping keep using it until they finish.
+        """
+        size = os.fstat(self._f.fileno()).st_size
+        if size < len(self._mm):
+            with self._lock:
+                for start in [s for s in self._cache if s >= size]:
+                    self._cached -= self._cache.pop(start)[1]
+        if size != len(self._mm):
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._f.close()
+
+    def read(self, start: int, end: int) -> bytes:
+        return self._mm[start:end]
+
+    def locate_text(self, start: int, end: int, text: str) -> Optional[Tuple[int, int]]:
+        """Find the byte span of the JSON string literal holding ``text`` inside an entry."""
+        pos = start
+        found = None
+        while True:
+            m = _TEXT_KEY.search(self._mm, pos, end)
+            if not m:
+                return found
+            s = _STRING.match(self._mm, m.end() - 1, end)
+            if not s:
+                return found
+            if json.loads(self._mm[s.start() : s.end()]) == text:
+                # response.content comes after request.postData, keep the last match
+                found = (s.start(), s.end())
+            pos = s.end()
+
+    def entry(self, start: int, end: int, text_span: Optional[Tuple[int, int]] = None, with_body: bool = True) -> Dict[str, Any]:
+        """
+        Decode the entry stored at ``[start, end)``.
+
+        With ``with_body=False`` and a known ``text_span`` the body literal is
+        skipped and ``response.content.text`` is left as ``None``. Returned
+        dicts may be shared with later calls and must not be modified.
+        """
+        e = self._cached_entry(start, end, text_span)
+        if with_body and text_span is not None:
+            # Filled into copies of the dicts on the way to it, never cached.
+            response = dict(e.get("response") or {})
+            response["content"] = {**(response.get("content") or {}), "text": self.text(text_span)}
+            e = {**e, "response": response}
+        return e
+
+    def _cached_entry(self, start: int, end: int, text_span: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+        # The entry without the body at ``text_span``, through the LRU.
+        with self._lock:
+            hit = self._cache.get(start)
+            if hit is not None:
+                self._cache.move_to_end(start)
+                return hit[0]
+        if text_span is None:
+            e = json.loads(self._mm[start:end])
+            weight = end - start
+        else:
+            ts, te = text_span
+            e = json.loads(self._mm[start:ts] + b"null" + self._mm[te:end])
+            weight = end - start - (te - ts)
+        with self._lock:
+            if weight <= self._cache_bytes:
+                self._cache[start] = (e, weight)
+                self._cached += weight
+                while self._cached > self._cache_bytes:
+                    _, (_, w) = self._cache.popitem(last=False)
+                    self._cached -= w
+        return e
+
+    def text(self, text_span: Tuple[int, int]) -> str:
+        ts, te = text_span
+        return json.loads(self._mm[ts:te])
+
+    def _cut(self, a: int, b: int) -> int:
+        # Move ``b`` back so that ``[a, b)`` ends on a UTF-8 character and
+        # escape sequence boundary.
+        mm = self._mm
+        while b > a and mm[b] & 0xC0 == 0x80:
+            b -= 1
+        q = mm.find(b"\\", max(a, b - 5), b)
+        if q < 0:
+            return b
+        # An escape can only end here if it started in the last five bytes;
+        # the start of that run of backslashes is never inside one.
+        while q > a and mm[q - 1] == 0x5C:
+            q -= 1
+        return q if q > a else _ESCAPED.match(mm, a, b).end()
+
+    def text_chunks(self, text_span: Tuple[int, int], pos: Optional[int] = None, chunk: int = CHUNK_BYTES) -> Iterator[Tuple[int, str]]:
+        """
+        Decode the string literal at ``text_span`` a chunk at a time, from
+        byte ``pos`` (a position yielded earlier; default: the start).
+
+        Yields ``(position after the chunk, decoded text)``; chunks never
+        split an escape sequence, a UTF-8 character or a surrogate pair.
+        """
+        ts, te = text_span
+        end = te - 1
+        a = ts + 1 if pos is None else pos
+        while a < end:
+            b = end if a + chunk >= end else self._cut(a, a + chunk)
+            text = json.loads(b'"' + self._mm[a:b] + b'"')
+            if b < end and text and "\ud800" <= text[-1] <= "\udbff":
+                # High surrogate escape: keep the pair together.
+                b -= 6
+                text = text[:-1]
+            yield b, text
+            a = b
@@ -0,0 +1,121 @@
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Lists at least this many times longer than the ids left are searched
+# instead of marked.
+INTERSECT_SEARCH_RATIO = 16
+
+
+def _search(ids: array, other: array) -> array:
+    # ``ids`` found in the much longer ``other``: each binary search starts
+    # where the previous one ended.
+    out = array("I")
+    n = len(other)
+    pos = 0
+    for i in ids:
+        pos = bisect_left(other, i, pos)
+        if pos == n:
+            break
+        if other[pos] == i:
+            out.append(i)
+    return out
+
+
+def _mark(ids: array, other: array) -> array:
+    # ``ids`` found in ``other`` of similar length, through a bitmap over ids.
+    top = other[-1]
+    marks = bytearray(top + 1)
+    for i in other:
+        marks[i] = 1
+    return array("I", [i for i in ids if i <= top and marks[i]])
+
+
+def intersect(lists: List[array]) -> array:
+    """
+    Intersect ascending id arrays, smallest first; the result stays ascending.
+    Lists much longer than what is left are binary searched for it, others
+    are walked once into a bitmap.
+    """
+    lists = sorted(lists, key=len)
+    result = lists[0]
+    for other in lists[1:]:
+        if not result:
+            break
+        if len(other) >= INTERSECT_SEARCH_RATIO * len(result):
+            result = _search(result, other)
+        else:
+            result = _mark(result, other)
+    return result
+
+
+def _trigrams(text: str) -> set:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _collect(docs: Iterable[Tuple[int, str]]) -> Tuple[List[int], Dict[str, List[int]]]:
+    # Document ids in order, and the documents containing each trigram.
+    postings: Dict[str, List[int]] = {}
+    ids: List[int] = []
+    for doc, text in docs:
+        ids.append(doc)
+        for g in _trigrams(text.lower()):
+            lst = postings.get(g)
+            if lst is None:
+                postings[g] = [doc]
+            else:
+                lst.append(doc)
+    return ids, postings
+
+
+class TrigramIndex:
+    """
+    Substring search over a set of documents via trigram posting lists.
+
+    A query of three or more characters is narrowed to documents that
+    contain every trigram of the query; candidates are then verified with a
+    plain substring test against ``get_text``. Shorter queries fall back to
+    scanning all documents.
+    """
+
+    def __init__(self, docs: Iterable[Tuple[int, str]], get_text: Callable[[int], str]):
+        self._get_text = get_text
+        ids, postings = _collect(docs)
+        self.doc_ids = array("I", ids)
+        self.postings: Dict[str, array] = {g: array("I", lst) for g, lst in postings.items()}
+
+    def extended(self, docs: Iterable[Tuple[int, str]]) -> "TrigramIndex":
+        """
+        A copy with ``docs`` added; their ids must be larger than any indexed
+        so far. Posting lists that gain nothing are shared with this index,
+        which is left unchanged.
+        """
+        ids, postings = _collect(docs)
+        index = TrigramIndex.__new__(TrigramIndex)
+        index._get_text = self._get_text
+        index.doc_ids = self.doc_ids + array("I", ids)
+        index.postings = dict(self.postings)
+        for g, lst in postings.items():
+            old = index.postings.get(g)
+            index.postings[g] = array("I", lst) if old is None else old + array("I", lst)
+        return index
+
+    def candidates(self, ql: str) -> Optional[array]:
+        """Documents that may contain ``ql`` (already lowercased); ``None`` if the query is too short to use the index."""
+        grams = _trigrams(ql)
+        if not grams:
+            return None
+        lists = []
+        for g in grams:
+            lst = self.postings.get(g)
+            if lst is None:
+                return array("I")
+            lists.append(lst)
+        return intersect(lists)
+
+    def search(self, ql: str) -> List[int]:
+        cands = self.candidates(ql)
+        if cands is None:
+            cands = self.doc_ids
+        get_text = self._get_text
+        return [d for d in cands if ql in get_text(d).lower()]
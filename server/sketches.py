@@ -0,0 +1,267 @@
+import math
+from bisect import bisect_right
+from collections import Counter
+from functools import partial
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from server.entry_store import EntryStore
+
+# Quantiles are within this relative error of the exact value.
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_INV_LOG_GAMMA = 1 / math.log(_GAMMA)
+# Values at or below this land in the zero bucket (zero, missing or negative timings).
+MIN_POSITIVE = 1e-9
+_ZERO_KEY = math.ceil(math.log(MIN_POSITIVE) * _INV_LOG_GAMMA)
+
+TIME_EDGES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)  # ms
+SIZE_EDGES = (256, 1 << 10, 4 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20)  # bytes
+
+# Metric name -> (column of the store, histogram edges).
+METRICS: Dict[str, Tuple[Callable[[EntryStore], Any], Sequence[float]]] = {
+    "wait": (lambda s: s.phases["wait"], TIME_EDGES),
+    "receive": (lambda s: s.phases["receive"], TIME_EDGES),
+    "time": (lambda s: s.time, TIME_EDGES),
+    "size": (lambda s: s.size, SIZE_EDGES),
+}
+DIMENSIONS = ("all", "host", "type", "statusClass")
+
+
+def finite_values(values: Sequence[float]) -> Sequence[float]:
+    """``values`` with NaN and infinities (which ``json`` accepts in a HAR) replaced by zero."""
+    if all(map(math.isfinite, values)):
+        return values
+    return [v if math.isfinite(v) else 0.0 for v in values]
+
+
+def sketch_keys(values: Sequence[float]) -> List[int]:
+    """
+    Logarithmic bucket of each value, computed with C-level ``map`` calls
+    only; keys at or below ``_ZERO_KEY`` stand for the zero bucket, which
+    also takes non-finite values.
+    """
+    clipped = map(max, finite_values(values), repeat(MIN_POSITIVE))
+    return list(map(math.ceil, map(_INV_LOG_GAMMA.__mul__, map(math.log, clipped))))
+
+
+def _bucket_value(k: int) -> float:
+    # Midpoint (in relative terms) of ``(gamma**(k-1), gamma**k]``.
+    return 2 * _GAMMA**k / (_GAMMA + 1)
+
+
+def quantile_label(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees (DDSketch).
+
+    Values are counted in logarithmic buckets ``(gamma**(k-1), gamma**k]``,
+    so any quantile is returned within ``RELATIVE_ACCURACY`` of the exact
+    one. Sketches merge by adding bucket counts, which makes the result
+    independent of how the values were split across sketches.
+    """
+
+    __slots__ = ("bins", "zeros", "count")
+
+    def __init__(self) -> None:
+        self.bins: Counter = Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, v: float) -> None:
+        self.add_counts([(sketch_keys([v])[0], 1)])
+
+    def add_counts(self, counts: Iterable[Tuple[int, int]]) -> None:
+        """Add ``(bucket key, count)`` pairs as produced by ``sketch_keys``."""
+        for k, n in counts:
+            if k <= _ZERO_KEY:
+                self.zeros += n
+            else:
+                self.bins[k] += n
+            self.count += n
+
+    def merge(self, other: "DDSketch") -> None:
+        self.bins.update(other.bins)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Values at quantiles ``qs`` (each in ``[0, 1]``), in one pass over the sorted buckets."""
+        if not self.count:
+            return [None] * len(qs)
+        order = sorted(range(len(qs)), key=qs.__getitem__)
+        out: List[Optional[float]] = [None] * len(qs)
+        keys = iter(sorted(self.bins))
+        seen = self.zeros
+        value = 0.0
+        for j in order:
+            rank = qs[j] * (self.count - 1)
+            while seen <= rank:
+                k = next(keys)
+                seen += self.bins[k]
+                value = _bucket_value(k)
+            out[j] = value
+        return out
+
+    def to_json(self) -> List[Any]:
+        return [self.zeros, list(self.bins.items())]
+
+    @classmethod
+    def from_json(cls, d: List[Any]) -> "DDSketch":
+        sketch = cls()
+        sketch.zeros = d[0]
+        sketch.bins = Counter(dict(d[1]))
+        sketch.count = sketch.zeros + sum(sketch.bins.values())
+        return sketch
+
+
+class Histogram:
+    """Counts per fixed bucket: ``counts[i]`` holds values in ``[edges[i-1], edges[i])``, open at both ends."""
+
+    __slots__ = ("edges", "counts")
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+
+    def add_counts(self, counts: Iterable[Tuple[int, int]]) -> None:
+        for b, n in counts:
+            self.counts[b] += n
+
+    def merge(self, other: "Histogram") -> None:
+        for b, n in enumerate(other.counts):
+            self.counts[b] += n
+
+
+class Distribution:
+    """Sketch and histogram of one metric over one group of entries."""
+
+    __slots__ = ("sketch", "histogram")
+
+    def __init__(self, edges: Sequence[float]):
+        self.sketch = DDSketch()
+        self.histogram = Histogram(edges)
+
+    def merge(self, other: "Distribution") -> None:
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+
+    def render(self, qs: Sequence[float]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"count": self.sketch.count}
+        out.update(zip(map(quantile_label, qs), self.sketch.quantiles(qs)))
+        out["histogram"] = self.histogram.counts
+        return out
+
+
+def _group_name(store: EntryStore, dim: str, g: int) -> str:
+    if dim == "host":
+        return store.hosts[g]
+    if dim == "type":
+        return store.resource_types[g] or "unknown"
+    if dim == "statusClass":
+        return f"{g}xx" if 1 <= g <= 5 else "other"
+    return "all"
+
+
+class Distributions:
+    """
+    Per-metric distributions grouped by dimension: overall, by host, by
+    resource type and by status class.
+
+    Groups are keyed by dictionary code (status class for ``statusClass``)
+    while rows are added; ``named`` turns them into name-keyed groups that
+    can be merged with those of other captures.
+    """
+
+    def __init__(self) -> None:
+        self.groups: Dict[str, Dict[str, Dict[int, Distribution]]] = {m: {d: {} for d in DIMENSIONS} for m in METRICS}
+
+    def add(self, store: EntryStore, pick: Callable[[Any], Sequence[Any]]) -> None:
+        """Add the rows selected by ``pick`` (column -> values of those rows)."""
+        dims = {
+            "all": None,
+            "host": pick(store.host_code),
+            "type": pick(store.type_code),
+            "statusClass": list(map((100).__rfloordiv__, pick(store.status))),
+        }
+        for metric, (column, edges) in METRICS.items():
+            values = finite_values(pick(column(store)))
+            keys = sketch_keys(values)
+            bins = list(map(partial(bisect_right, edges), values))
+            for dim, codes in dims.items():
+                table = self.groups[metric][dim]
+                # One counting pass per dimension: (group, sketch key, histogram bucket).
+                counts = Counter(zip(codes if codes is not None else repeat(0), keys, bins))
+                for g, (by_key, by_bin) in _split(counts).items():
+                    dist = table.get(g)
+                    if dist is None:
+                        dist = table[g] = Distribution(edges)
+                    dist.sketch.add_counts(by_key.items())
+                    dist.histogram.add_counts(by_bin.items())
+
+    def named(self, store: EntryStore, metrics: Sequence[str], dims: Sequence[str]) -> Dict[str, Dict[str, Dict[str, Distribution]]]:
+        """Fresh, name-keyed copies of the selected groups (codes sharing a name are merged)."""
+        out: Dict[str, Dict[str, Dict[str, Distribution]]] = {}
+        for metric in metrics:
+            edges = METRICS[metric][1]
+            out[metric] = {}
+            for dim in dims:
+                named: Dict[str, Distribution] = {}
+                for g, dist in self.groups[metric][dim].items():
+                    name = _group_name(store, dim, g)
+                    target = named.get(name)
+                    if target is None:
+                        target = named[name] = Distribution(edges)
+                    target.merge(dist)
+                out[metric][dim] = named
+        return out
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            m: {d: [[g, dist.sketch.to_json(), dist.histogram.counts] for g, dist in table.items()] for d, table in dims.items()}
+            for m, dims in self.groups.items()
+        }
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "Distributions":
+        out = cls()
+        for metric, dims in d.items():
+            edges = METRICS[metric][1]
+            for dim, groups in dims.items():
+                table = out.groups[metric][dim]
+                for g, sketch, counts in groups:
+                    dist = table[g] = Distribution(edges)
+                    dist.sketch = DDSketch.from_json(sketch)
+                    dist.histogram.counts = list(counts)
+        return out
+
+
+def _split(counts: Counter) -> Dict[int, Tuple[Counter, Counter]]:
+    # ``{(group, key, bucket): n}`` -> ``{group: ({key: n}, {bucket: n})}``
+    out: Dict[int, Tuple[Counter, Counter]] = {}
+    for (g, k, b), n in counts.items():
+        pair = out.get(g)
+        if pair is None:
+            pair = out[g] = (Counter(), Counter())
+        pair[0][k] += n
+        pair[1][b] += n
+    return out
+
+
+def merge_named(parts: Iterable[Dict[str, Dict[str, Dict[str, Distribution]]]]) -> Dict[str, Dict[str, Dict[str, Distribution]]]:
+    """Merge name-keyed groups (from ``Distributions.named``) of several captures into the first."""
+    it = iter(parts)
+    out = next(it)
+    for part in it:
+        for metric, dims in part.items():
+            for dim, named in dims.items():
+                target = out[metric][dim]
+                for name, dist in named.items():
+                    if name in target:
+                        target[name].merge(dist)
+                    else:
+                        target[name] = dist
+    return out
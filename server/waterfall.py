@@ -0,0 +1,160 @@
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence
+
+from server.entry_store import PHASES, EntryStore
+from server.intervals import Coverage, IntervalIndex
+
+MAX_WIDTH = 8192  # pixel buckets per response
+MAX_ROWS = 4096  # row buckets per response
+
+
+class WaterfallIndex:
+    """
+    Interval indexes behind the waterfall level-of-detail endpoint.
+
+    Built over one list of entry ids in start-time order (the rows of the
+    waterfall): request lifetimes ``[started_ms, started_ms + time]`` as an
+    ``IntervalIndex`` addressed by row, and one ``Coverage`` per timing phase
+    with the phases laid out back to back inside each lifetime, scaled to
+    its length the way the client draws them. Per-row prefix sums of phase
+    durations give the dominant phase of any row range in O(1).
+    """
+
+    def __init__(self, store: EntryStore, ids: Sequence[int]):
+        self.ids = array("I", ids)
+        started = store.started_ms
+        durations = store.time
+        starts = [started[i] for i in ids]
+        ends = [s + max(durations[i], 0.0) for s, i in zip(starts, ids)]
+        self.rows = IntervalIndex(starts, ends)
+
+        phase_cols = [store.phases[p] for p in PHASES]
+        phase_starts: List[List[float]] = [[] for _ in PHASES]
+        phase_ends: List[List[float]] = [[] for _ in PHASES]
+        per_row: List[array] = [array("d") for _ in PHASES]
+        for s, e, i in zip(starts, ends, ids):
+            segs = [col[i] for col in phase_cols]
+            total = sum(segs)
+            scale = (e - s) / total if total > 0 else 0.0
+            t = s
+            for k, seg in enumerate(segs):
+                length = seg * scale
+                per_row[k].append(length)
+                if length > 0:
+                    phase_starts[k].append(t)
+                    phase_ends[k].append(t + length)
+                    t += length
+        self.phases = [Coverage(phase_starts[k], phase_ends[k]) for k in range(len(PHASES))]
+        self._phase_sums = [array("d", accumulate(col, initial=0.0)) for col in per_row]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nbytes(self) -> int:
+        total = self.rows.nbytes() + self.ids.itemsize * len(self.ids)
+        total += sum(c.nbytes() for c in self.phases)
+        total += sum(8 * len(s) for s in self._phase_sums)
+        return total
+
+    def extent(self) -> float:
+        return self.rows.max_end(0, len(self.ids)) if len(self.ids) else 0.0
+
+    def _dominant_rows(self, lo: int, hi: int) -> Optional[str]:
+        best, best_time = None, 0.0
+        for name, sums in zip(PHASES, self._phase_sums):
+            t = sums[hi] - sums[lo]
+            if t > best_time:
+                best, best_time = name, t
+        return best
+
+    def _dominant_window(self, a: float, b: float) -> Optional[str]:
+        best, best_time = None, 0.0
+        for name, cov in zip(PHASES, self.phases):
+            t = cov.covered(a, b)
+            if t > best_time:
+                best, best_time = name, t
+        return best
+
+    def level_of_detail(self, store: EntryStore, t0: float, t1: float, width: int, row_start: int, row_end: int, row_buckets: int) -> Dict[str, Any]:
+        """
+        Aggregate rows ``[row_start, row_end)`` over the time window ``[t0, t1]``.
+
+        ``buckets`` has one slot per pixel column: how many requests are in
+        flight during it, the first and last row that is, and the phase
+        covering most time in it. ``rows`` groups consecutive rows into at
+        most ``row_buckets`` bars with their extent, count and dominant
+        phase; single-row groups also carry the entry id and its timings.
+        """
+        n = len(self.ids)
+        row_start = max(0, min(row_start, n))
+        row_end = max(row_start, min(row_end, n))
+        full = row_start == 0 and row_end == n
+        # Pixel aggregates over a row subset need indexes of that subset.
+        view = self if full else WaterfallIndex(store, self.ids[row_start:row_end])
+        offset = 0 if full else row_start
+        span = (t1 - t0) / width
+        count: List[int] = []
+        first_row: List[Optional[int]] = []
+        last_row: List[Optional[int]] = []
+        phase: List[Optional[str]] = []
+        for x in range(width):
+            a = t0 + x * span
+            b = a + span
+            c = view.rows.count(a, b)
+            count.append(c)
+            if c:
+                first_row.append(view.rows.first(a, b) + offset)
+                last_row.append(view.rows.last(a, b) + offset)
+                phase.append(view._dominant_window(a, b))
+            else:
+                first_row.append(None)
+                last_row.append(None)
+                phase.append(None)
+
+        rows = []
+        total_rows = row_end - row_start
+        groups = max(1, min(row_buckets, total_rows))
+        for g in range(groups if total_rows else 0):
+            lo = row_start + total_rows * g // groups
+            hi = row_start + total_rows * (g + 1) // groups
+            group: Dict[str, Any] = {
+                "row": lo,
+                "count": hi - lo,
+                "start": self.rows.start(lo),
+                "end": self.rows.max_end(lo, hi),
+                "phase": self._dominant_rows(lo, hi),
+            }
+            if hi - lo == 1:
+                i = self.ids[lo]
+                group["id"] = i
+                group["timingSegments"] = store.timing_segments(i)
+            rows.append(group)
+
+        return {
+            "t0": t0,
+            "t1": t1,
+            "width": width,
+            "bucketMs": span,
+            "rowStart": row_start,
+            "rowEnd": row_end,
+            "buckets": {"count": count, "firstRow": first_row, "lastRow": last_row, "phase": phase},
+            "rows": rows,
+        }
+
+
+def concurrency(cov: Coverage, t0: float, t1: float, width: int) -> Dict[str, Any]:
+    """
+    Requests in flight over ``[t0, t1]`` split into ``width`` buckets:
+    ``inFlight`` counts those overlapping each bucket, ``average`` is the
+    mean number in flight across it (covered time over bucket length).
+    """
+    span = (t1 - t0) / width
+    in_flight: List[int] = []
+    average: List[float] = []
+    for x in range(width):
+        a = t0 + x * span
+        b = a + span
+        in_flight.append(cov.count(a, b))
+        average.append(cov.covered(a, b) / span)
+    return {"t0": t0, "t1": t1, "width": width, "bucketMs": span, "inFlight": in_flight, "average": average}
@@ -5,6 +5,8 @@ const state = {
   total: 0,
   offset: 0,
   limit: 200,
+  nextCursor: null,
+  captureId: new URLSearchParams(location.search).get('capture'),
   filters: { q: '', domain: '', priority: '', method: '', type: '', statusMin: '', statusMax: '' },
   loading: false,
   sortKey: 'started_ms',
@@ -16,52 +18,98 @@ const state = {
   wfDragging: false,
   wfLastX: 0,
   wfSelRange: null,
+  wfSelTotal: null,
   selectedIds: [],
   wfRowH: 16,
   wfStartRow: 0,
+  wfLod: null,
+  wfLodKey: null,
   lastSelectedIndex: null,
 };
 
 function $(sel) { return document.querySelector(sel); }
 function $all(sel) { return Array.from(document.querySelectorAll(sel)); }
 
+// 所有 /api 请求都限定在当前抓包（capture）上
+function apiUrl(path, params = new URLSearchParams()) {
+  if (state.captureId) params.set('capture', state.captureId);
+  const qs = params.toString();
+  return qs ? `${path}?${qs}` : path;
+}
+
+function setCapture(id) {
+  state.captureId = id || null;
+  const url = new URL(location.href);
+  if (state.captureId) url.searchParams.set('capture', state.captureId);
+  else url.searchParams.delete('capture');
+  history.replaceState(null, '', url);
+  const link = document.querySelector('a[href^="/events"]');
+  if (link) link.href = state.captureId ? `/events?capture=${encodeURIComponent(state.captureId)}` : '/events';
+}
+
+function renderStats(s) {
+  const b = s.bodies;
+  const bodies = b && b.count ? ` | 响应体: ${b.count} 个，去重后 ${b.unique} 个（${formatBytes(b.uniqueBytes)} / ${formatBytes(b.bytes)}）` : '';
+  $('#stats').innerHTML = `<div>总请求: ${s.count} | 总大小: ${formatBytes(s.totalSize)} | 总耗时: ${Math.round(s.totalTime)}ms${bodies}</div>`;
+}
+
+// 统计随筛选条件变化，由服务端按索引求交集计算；翻页不会改变结果
 async function fetchStats() {
   try {
-    const r = await fetch('/api/stats');
-    const s = await r.json();
-    $('#stats').innerHTML = `<div>总请求: ${s.count} | 总大小: ${formatBytes(s.totalSize)} | 总耗时: ${Math.round(s.totalTime)}ms</div>`;
+    const r = await fetch(apiUrl('/api/stats', setFilterParams(new URLSearchParams())));
+    renderStats(await r.json());
     renderSelectionStats();
   } catch {}
 }
 
+function setFilterParams(params) {
+  const { q, domain, priority, method, type, statusMin, statusMax } = state.filters;
+  if (q) params.set('q', q);
+  if (domain) params.set('domain', domain);
+  if (priority) params.set('priority', priority);
+  if (method) params.set('method', method);
+  if (type) params.set('type', type);
+  if (statusMin) params.set('statusMin', statusMin);
+  if (statusMax) params.set('statusMax', statusMax);
+  return params;
+}
+
 async function loadEntries(reset = true) {
   if (state.loading) return;
   state.loading = true;
   if (reset) {
     state.offset = 0;
     state.entries = [];
+    state.nextCursor = null;
+    state.wfLod = null;
+    state.wfLodKey = null;
   }
   const params = new URLSearchParams();
-  params.set('offset', state.offset);
   params.set('limit', state.limit);
-  const { q, domain, priority, method, type, statusMin, statusMax } = state.filters;
-  if (q) params.set('q', q);
-  if (domain) params.set('domain', domain);
-  if (priority) params.set('priority', priority);
-  if (method) params.set('method', method);
-  if (type) params.set('type', type);
-  if (statusMin) params.set('statusMin', statusMin);
-  if (statusMax) params.set('statusMax', statusMax);
-  const res = await fetch(`/api/entries?${params.toString()}`);
-  const data = await res.json();
+  if (!reset && state.nextCursor) {
+    // 游标携带筛选条件与偏移，后续分页由服务端缓存直接切片
+    params.set('cursor', state.nextCursor);
+  } else {
+    params.set('offset', state.offset);
+    setFilterParams(params);
+  }
+  // 列表页默认走二进制列式传输（见 columns.js），省去逐行 JSON 解析
+  const res = await fetch(apiUrl(COLUMNS_SUPPORTED ? '/api/entries/columns' : '/api/entries', params));
+  if (res.status === 410) {
+    // 数据已重新加载，游标失效：从头查询
+    state.loading = false;
+    return loadEntries(true);
+  }
+  const data = COLUMNS_SUPPORTED ? decodeColumns(await res.arrayBuffer()) : await res.json();
   state.total = data.total || 0;
-  const page = data.entries || [];
+  state.nextCursor = data.nextCursor || null;
+  const page = (COLUMNS_SUPPORTED ? data.rows : data.entries) || [];
   state.entries = reset ? page : state.entries.concat(page);
   state.filtered = state.entries.slice();
   state.offset += page.length;
   renderList2();
   renderWaterfallCanvas();
-  fetchStats();
+  if (reset) fetchStats();
   state.loading = false;
 }
 
@@ -143,7 +191,7 @@ function renderList2() {
 
 async function selectEntry(id) {
   state.selectedId = id;
-  const res = await fetch(`/api/entries/${id}`);
+  const res = await fetch(apiUrl(`/api/entries/${id}`));
   const data = await res.json();
   renderTabs(data);
   // 同步列表与瀑布图高亮
@@ -272,6 +320,95 @@ function bindTabs() {
   });
 }
 
+// 轮询后台解析任务直至结束，期间显示进度；返回最终任务状态
+async function waitForJob(jobId) {
+  const label = $('#jobProgress');
+  const cancelBtn = $('#cancelJobBtn');
+  cancelBtn.style.display = '';
+  cancelBtn.onclick = () => fetch(`/api/jobs/${jobId}`, { method: 'DELETE' });
+  try {
+    while (true) {
+      const res = await fetch(`/api/jobs/${jobId}`);
+      const job = await res.json();
+      if (!res.ok) return { status: 'failed', error: job.detail };
+      if (job.status !== 'queued' && job.status !== 'running') return job;
+      const pct = (job.progress * 100).toFixed(0);
+      const eta = job.eta != null ? `，剩余约 ${Math.ceil(job.eta)} 秒` : '';
+      label.textContent = `解析中 ${pct}%（${formatBytes(job.bytesRead)} / ${formatBytes(job.totalBytes)}，${job.entries} 条${eta}）`;
+      if (job.stats) renderStats(job.stats); // 已解析部分的统计
+      await new Promise(r => setTimeout(r, 300));
+    }
+  } finally {
+    cancelBtn.style.display = 'none';
+    cancelBtn.onclick = null;
+    label.textContent = '';
+  }
+}
+
+// 实时抓包：通过 SSE 接收新条目数与统计变化，列表按节流间隔从服务端重新查询
+const LIVE_REFRESH_MS = 1000;
+let liveSource = null;
+let liveRefresh = null;
+
+function hasFilters() {
+  return Object.values(state.filters).some(Boolean);
+}
+
+function scheduleLiveRefresh() {
+  if (liveRefresh) return;
+  liveRefresh = setTimeout(() => {
+    liveRefresh = null;
+    if (state.loading) scheduleLiveRefresh();
+    else loadEntries(true);
+  }, LIVE_REFRESH_MS);
+}
+
+async function followLive() {
+  if (liveSource) {
+    liveSource.close();
+    liveSource = null;
+  }
+  let data;
+  try {
+    data = await (await fetch('/api/captures')).json();
+  } catch {
+    return;
+  }
+  const id = state.captureId || data.latest;
+  const cap = (data.captures || []).find(c => c.id === id);
+  if (!cap || !cap.live) return;
+  const label = $('#jobProgress');
+  const source = liveSource = new EventSource(`/api/live/${encodeURIComponent(id)}/events`);
+  let first = true;
+  source.addEventListener('entries', (ev) => {
+    const d = JSON.parse(ev.data);
+    label.textContent = `实时接收中：${d.count} 条`;
+    // 首个事件只是订阅时的现状，列表刚加载过
+    if (!first) scheduleLiveRefresh();
+    first = false;
+  });
+  source.addEventListener('stats', (ev) => {
+    // 事件中的统计针对整个抓包；有筛选时由列表刷新重新获取
+    if (!hasFilters()) renderStats(JSON.parse(ev.data));
+  });
+  source.addEventListener('closed', () => {
+    source.close();
+    if (liveSource === source) liveSource = null;
+    label.textContent = '';
+    scheduleLiveRefresh();
+  });
+}
+
+async function finishIngest(data, failMessage) {
+  const job = await waitForJob(data.jobId);
+  if (job.status === 'cancelled') return;
+  if (job.status !== 'done') return alert(job.error || failMessage);
+  setCapture(data.captureId);
+  state.offset = 0;
+  await loadEntries(true);
+  followLive();
+}
+
 function bindUpload() {
   $('#uploadForm').addEventListener('submit', async (e) => {
     e.preventDefault();
@@ -281,15 +418,15 @@ function bindUpload() {
     fd.append('file', file);
     const res = await fetch('/api/upload', { method: 'POST', body: fd });
     const data = await res.json();
-    // After upload, reload with pagination
-    state.offset = 0;
-    await loadEntries(true);
+    if (!res.ok) return alert(data.detail || '上传失败');
+    // After parsing, reload with pagination
+    await finishIngest(data, '上传失败');
   });
   $('#loadSampleBtn').addEventListener('click', async () => {
     const res = await fetch('/api/load-sample');
     const data = await res.json();
-    state.offset = 0;
-    await loadEntries(true);
+    if (!res.ok) return alert(data.detail || '加载示例失败');
+    await finishIngest(data, '加载示例失败');
   });
 }
 
@@ -354,10 +491,12 @@ function bindSearch() {
 }
 
 document.addEventListener('DOMContentLoaded', async () => {
+  setCapture(state.captureId);
   bindTabs();
   bindUpload();
   bindSearch();
   await loadEntries(true);
+  followLive();
   bindInfiniteScroll();
   bindKeyboard();
   renderWaterfallCanvas();
@@ -380,10 +519,10 @@ function bindInfiniteScroll() {
 }
 
 async function renderResponseBody(id) {
-  const r = await fetch(`/api/entries/${id}/body`);
+  const r = await fetch(apiUrl(`/api/entries/${id}/body`));
   const data = await r.json();
   const container = document.getElementById('resp-body');
-  const dl = `<a class="mono" href="/api/entries/${id}/download" target="_blank">下载响应体</a>`;
+  const dl = `<a class="mono" href="${apiUrl(`/api/entries/${id}/download`)}" target="_blank">下载响应体</a>`;
   if (data.dataUrl) {
     container.innerHTML = `${dl}<br/><img src="${data.dataUrl}" alt="image preview"/>` + (data.truncated ? '<div class="mono">[预览已截断]</div>' : '');
   } else if (data.previewText) {
@@ -445,6 +584,33 @@ function groupEntries(list) {
   return out;
 }
 
+// 尚未加载全部行时，瀑布图改用服务端按像素/行聚合的分级细节（LOD）数据
+function useWaterfallLod() {
+  return state.entries.length < state.total && state.sortKey === 'started_ms' && state.sortOrder === 'asc' && state.groupBy === 'none';
+}
+
+function waterfallExtent(list) {
+  if (useWaterfallLod()) return state.wfLod ? state.wfLod.tMax : 0;
+  return Math.max(...list.map(e => (e.started_ms + (e.time || 0))), 0);
+}
+
+let wfLodPending = null;
+async function fetchWaterfallLod(params) {
+  const key = params.toString();
+  if (key === state.wfLodKey || key === wfLodPending) return;
+  wfLodPending = key;
+  const res = await fetch(apiUrl('/api/waterfall', params));
+  if (key !== wfLodPending) return;
+  wfLodPending = null;
+  if (!res.ok) return;
+  const lod = await res.json();
+  if (state.wfMax <= 0) { state.wfMin = lod.t0; state.wfMax = lod.t1; }
+  state.wfLod = lod;
+  state.wfLodKey = key;
+  renderWaterfallCanvas();
+}
+const fetchWaterfallLodSoon = debounce(fetchWaterfallLod, 60);
+
 function renderWaterfallCanvas() {
   const canvas = document.getElementById('waterfallCanvas');
   const ruler = document.getElementById('waterfallRuler');
@@ -453,7 +619,8 @@ function renderWaterfallCanvas() {
   const width = canvas.clientWidth || canvas.parentElement.clientWidth;
   const pad = 8;
   const list = state.filtered.slice().sort(sortComparator());
-  const totalRows = list.length;
+  const lodMode = useWaterfallLod();
+  const totalRows = lodMode ? state.total : list.length;
   // 固定高度视口：按当前 CSS 高度作为可视窗口，仅绘制窗口内的行
   const viewH = canvas.clientHeight || 240;
   const minRowH = Math.max(4, Math.floor((viewH - pad * 2) / Math.max(1, totalRows)));
@@ -471,25 +638,34 @@ function renderWaterfallCanvas() {
   ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
   ctx.clearRect(0, 0, width, canvas.height / dpr);
 
-  const maxEnd = Math.max(...list.map(e => (e.started_ms + (e.time || 0))), 0);
-  if (state.wfMax <= 0) { state.wfMin = 0; state.wfMax = maxEnd || 1; }
+  const maxEnd = waterfallExtent(list);
+  if (lodMode) {
+    const params = setFilterParams(new URLSearchParams());
+    if (state.wfMax > 0) {
+      params.set('t0', state.wfMin);
+      params.set('t1', state.wfMax);
+    }
+    params.set('width', Math.max(1, Math.round(width)));
+    params.set('rowStart', startIndex);
+    params.set('rowEnd', startIndex + maxVisible);
+    params.set('rows', maxVisible);
+    if (params.toString() !== state.wfLodKey) fetchWaterfallLodSoon(params);
+  } else if (state.wfMax <= 0) { state.wfMin = 0; state.wfMax = maxEnd || 1; }
   const t2x = (t) => {
     const span = state.wfMax - state.wfMin || 1;
     return ((t - state.wfMin) / span) * width;
   };
+  const palette = { blocked: '#d1d5db', dns: '#f59e0b', connect: '#22c55e', ssl: '#7c3aed', send: '#3b82f6', wait: '#f97316', receive: '#10b981' };
   const wfRects = new Map();
-  list.slice(startIndex, startIndex + maxVisible).forEach((e, i) => {
-    const y = pad + i * rowH;
+  const drawRow = (id, y, startMs, time, segs) => {
     // background
     ctx.fillStyle = '#f3f4f6';
     ctx.fillRect(0, y, width, rowH - 2);
     // bar
-    const xStart = t2x(e.started_ms);
-    const xEnd = t2x(e.started_ms + (e.time || 0));
+    const xStart = t2x(startMs);
+    const xEnd = t2x(startMs + (time || 0));
     const wTotal = Math.max(0, xEnd - xStart);
-    const segs = e.timingSegments || {};
-    const total = Object.values(segs).reduce((a,b)=>a+(b||0),0) || (e.time || 0);
-    const palette = { blocked: '#d1d5db', dns: '#f59e0b', connect: '#22c55e', ssl: '#7c3aed', send: '#3b82f6', wait: '#f97316', receive: '#10b981' };
+    const total = Object.values(segs).reduce((a,b)=>a+(b||0),0) || (time || 0);
     let offset = 0;
     ['blocked','dns','connect','ssl','send','wait','receive'].forEach(k => {
       const segW = (total ? (segs[k] || 0) / total : 0) * wTotal;
@@ -497,11 +673,42 @@ function renderWaterfallCanvas() {
       ctx.fillRect(xStart + offset, y, segW, rowH - 2);
       offset += segW;
     });
-    wfRects.set(e.id, { x: xStart, y, w: wTotal, h: rowH - 2, segs, total });
-    if (e.id === state.selectedId || (state.selectedIds && state.selectedIds.includes(e.id))) {
+    wfRects.set(id, { x: xStart, y, w: wTotal, h: rowH - 2, segs, total });
+    if (id === state.selectedId || (state.selectedIds && state.selectedIds.includes(id))) {
       ctx.strokeStyle = '#2563eb'; ctx.lineWidth = 2; ctx.strokeRect(xStart, y, wTotal, rowH - 2);
     }
-  });
+  };
+  if (!lodMode) {
+    list.slice(startIndex, startIndex + maxVisible).forEach((e, i) => {
+      drawRow(e.id, pad + i * rowH, e.started_ms, e.time, e.timingSegments || {});
+    });
+  } else if (state.wfLod) {
+    const lod = state.wfLod;
+    const groupH = rowH * maxVisible / Math.max(1, lod.rows.length);
+    lod.rows.forEach((g) => {
+      if (g.row < startIndex || g.row >= startIndex + maxVisible) return;
+      if (g.id != null) {
+        drawRow(g.id, pad + (g.row - startIndex) * rowH, g.start, g.end - g.start, g.timingSegments || {});
+        return;
+      }
+      // 多行合并的聚合条：覆盖范围 + 主导阶段颜色
+      const y = pad + (g.row - startIndex) * rowH;
+      const xStart = t2x(g.start);
+      ctx.fillStyle = palette[g.phase] || '#9ca3af';
+      ctx.fillRect(xStart, y, Math.max(1, t2x(g.end) - xStart), Math.max(1, Math.min(groupH, rowH) - 2));
+    });
+    // 底部并发密度条：每个像素列内进行中的请求数
+    const counts = lod.buckets.count;
+    const peak = Math.max(1, ...counts);
+    const stripH = 14;
+    const colW = width / Math.max(1, counts.length);
+    ctx.fillStyle = 'rgba(37, 99, 235, 0.35)';
+    counts.forEach((c, x) => {
+      if (!c) return;
+      const h = Math.max(1, (c / peak) * stripH);
+      ctx.fillRect(x * colW, viewH - h, colW, h);
+    });
+  }
   state.wfRects = wfRects;
   // ruler（自适应刻度 + 可点击）
   ruler.innerHTML = '';
@@ -670,12 +877,12 @@ function bindKeyboard() {
       const center = state.wfMin + span / 2;
       const newSpan = Math.max(50, span * 0.9);
       state.wfMin = Math.max(0, center - newSpan / 2);
-      state.wfMax = Math.min(center + newSpan / 2, state.filtered.reduce((m,e)=>Math.max(m, e.started_ms + (e.time||0)), 0));
+      state.wfMax = Math.min(center + newSpan / 2, waterfallExtent(state.filtered));
       renderWaterfallCanvas();
     } else if (e.key === '-' || e.key === '_') {
       // 精确缩放 out
       const center = state.wfMin + span / 2;
-      const fullMax = state.filtered.reduce((m,e)=>Math.max(m, e.started_ms + (e.time||0)), 0);
+      const fullMax = waterfallExtent(state.filtered);
       const newSpan = Math.max(50, Math.min(span * 1.11, fullMax));
       state.wfMin = Math.max(0, center - newSpan / 2);
       state.wfMax = Math.min(center + newSpan / 2, fullMax);
@@ -692,7 +899,7 @@ function bindKeyboard() {
   const x2t = (x) => state.wfMin + ((x / width) * ((state.wfMax - state.wfMin) || 1));
   ruler.addEventListener('mousedown', (ev) => {
     if (!(ev.shiftKey || ev.altKey || ev.ctrlKey)) return; // 需要修饰键
-    selecting = true; startX = ev.offsetX; state.wfSelRange = null;
+    selecting = true; startX = ev.offsetX; state.wfSelRange = null; state.wfSelTotal = null;
   });
   ruler.addEventListener('mousemove', (ev) => {
     if (!selecting) return;
@@ -701,7 +908,10 @@ function bindKeyboard() {
     state.wfSelRange = { min: x2t(x1), max: x2t(x2) };
     renderWaterfallCanvas();
   });
-  const endSel = () => { selecting = false; };
+  const endSel = () => {
+    if (selecting && state.wfSelRange) fetchSelRangeTotal(state.wfSelRange);
+    selecting = false;
+  };
   ruler.addEventListener('mouseup', endSel);
   ruler.addEventListener('mouseleave', endSel);
 }
@@ -722,17 +932,27 @@ function formatBytes(n) {
   return i ? v.toFixed(1) + units[i] : v + units[i];
 }
 
+// 框选区间内进行中的请求总数（含未加载的分页），由服务端区间索引统计
+async function fetchSelRangeTotal(range) {
+  const params = setFilterParams(new URLSearchParams({ from: range.min, to: range.max, limit: 0 }));
+  const res = await fetch(apiUrl('/api/entries', params));
+  if (!res.ok || state.wfSelRange !== range) return;
+  state.wfSelTotal = (await res.json()).total;
+  renderSelectionStats();
+}
+
 function renderSelectionStats() {
   const el = document.getElementById('selStats'); if (!el) return;
   const ids = (state.selectedIds && state.selectedIds.length) ? state.selectedIds : (state.selectedId != null ? [state.selectedId] : []);
-  if (!ids.length) { el.textContent = '已选: 0'; return; }
+  const rangeText = (state.wfSelRange && state.wfSelTotal != null) ? ` | 区间内请求: ${state.wfSelTotal}` : '';
+  if (!ids.length) { el.textContent = '已选: 0' + rangeText; return; }
   const allMap = new Map(state.filtered.map(e => [e.id, e]));
   const selected = ids.map(id => allMap.get(id)).filter(Boolean);
   const count = selected.length;
   const totalSize = selected.reduce((a,e)=>a + (e.size || 0), 0);
   const totalTime = selected.reduce((a,e)=>a + (e.time || 0), 0);
   const avgTime = count ? (totalTime / count) : 0;
-  el.textContent = `已选: ${count} | 总大小: ${formatBytes(totalSize)} | 总耗时: ${Math.round(totalTime)}ms | 平均耗时: ${Math.round(avgTime)}ms`;
+  el.textContent = `已选: ${count} | 总大小: ${formatBytes(totalSize)} | 总耗时: ${Math.round(totalTime)}ms | 平均耗时: ${Math.round(avgTime)}ms${rangeText}`;
 }
 
 function debounce(fn, ms) {
@@ -753,7 +973,7 @@ function initWfControls() {
   if (hScroll) {
     hScroll.addEventListener('input', () => {
       const list = state.filtered.slice().sort(sortComparator());
-      const fullMax = Math.max(...list.map(e => (e.started_ms + (e.time || 0))), 0);
+      const fullMax = waterfallExtent(list);
       const span = (state.wfMax - state.wfMin) || Math.max(50, fullMax);
       const ratio = parseInt(hScroll.value || '0') / 100;
       const maxMin = Math.max(0, fullMax - span);
@@ -0,0 +1,70 @@
+// 二进制列式分页（/api/entries/columns）的解码。
+// 数值列直接包装为 TypedArray 视图，不逐行解析；字符串列按页内字典编码，取值时才解码并缓存。
+// 格式见 server/columnar.py：魔数 HCOL、版本、头长度（uint32 小端）、JSON 头、8 字节对齐的列块。
+
+const COLUMN_PHASES = ['blocked', 'dns', 'connect', 'ssl', 'send', 'wait', 'receive'];
+const COLUMN_TYPES = { float64: Float64Array, int32: Int32Array, uint32: Uint32Array };
+// TypedArray 使用本机字节序，而负载固定为小端
+const COLUMNS_SUPPORTED = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+const utf8 = new TextDecoder();
+
+class StringColumn {
+  constructor(buf, spec) {
+    this.codes = new Int32Array(buf, spec.codes.offset, spec.codes.length);
+    this.offsets = new Uint32Array(buf, spec.offsets.offset, spec.offsets.length);
+    this.bytes = new Uint8Array(buf, spec.bytes.offset, spec.bytes.length);
+    this.values = new Array(Math.max(spec.offsets.length - 1, 0));
+  }
+
+  get(k) {
+    const code = this.codes[k];
+    if (code < 0) return null;
+    let v = this.values[code];
+    if (v === undefined) {
+      v = this.values[code] = utf8.decode(this.bytes.subarray(this.offsets[code], this.offsets[code + 1]));
+    }
+    return v;
+  }
+}
+
+// 与 /api/entries 的条目摘要字段相同的只读行视图，字段按需从列中读取
+class ColumnRow {
+  constructor(cols, k) { this.cols = cols; this.k = k; }
+  get id() { return this.cols.id[this.k]; }
+  get url() { return this.cols.url.get(this.k); }
+  get host() { return this.cols.host.get(this.k); }
+  get path() { return this.cols.path.get(this.k); }
+  get method() { return this.cols.method.get(this.k); }
+  get status() { return this.cols.status[this.k]; }
+  get statusText() { return this.cols.statusText.get(this.k); }
+  get mimeType() { return this.cols.mimeType.get(this.k); }
+  get time() { return this.cols.time[this.k]; }
+  get size() { return this.cols.size[this.k]; }
+  get started_ms() { return this.cols.started_ms[this.k]; }
+  get timingSegments() {
+    if (!this._segs) {
+      const segs = {};
+      for (const p of COLUMN_PHASES) segs[p] = this.cols['phase.' + p][this.k];
+      this._segs = segs;
+    }
+    return this._segs;
+  }
+}
+
+// 返回 { total, nextCursor, count, columns, rows }；rows 为 ColumnRow 数组
+function decodeColumns(buf) {
+  const view = new DataView(buf);
+  const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+  if (magic !== 'HCOL' || view.getUint32(4, true) !== 1) throw new Error('unsupported columnar payload');
+  const headerLength = view.getUint32(8, true);
+  const header = JSON.parse(utf8.decode(new Uint8Array(buf, 16, headerLength)));
+  const columns = {};
+  for (const spec of header.columns) {
+    columns[spec.name] = spec.type === 'dict'
+      ? new StringColumn(buf, spec)
+      : new COLUMN_TYPES[spec.type](buf, spec.offset, spec.length);
+  }
+  const rows = new Array(header.count);
+  for (let k = 0; k < header.count; k++) rows[k] = new ColumnRow(columns, k);
+  return { ...header, columns, rows };
+}
@@ -1,5 +1,13 @@
 function $(sel) { return document.querySelector(sel); }
 
+// 当前抓包 id（来自主页链接的 ?capture=，或加载示例后返回的 captureId）
+let captureId = new URLSearchParams(location.search).get('capture');
+function apiUrl(path, params = new URLSearchParams()) {
+  if (captureId) params.set('capture', captureId);
+  const qs = params.toString();
+  return qs ? `${path}?${qs}` : path;
+}
+
 function setActiveTab(name) {
   document.querySelectorAll('.tab-content').forEach(el => el.style.display = 'none');
   document.querySelectorAll('.tab-btn').forEach(btn => btn.classList.remove('active'));
@@ -16,7 +24,20 @@ async function loadSample() {
     return;
   }
   const data = await r.json();
-  $('#evtSummary').textContent = `示例已加载，共 ${data.entries.length} 条目`;
+  $('#evtSummary').textContent = '示例解析中...';
+  // 解析在后台任务中进行，轮询至完成
+  let job;
+  while (true) {
+    job = await (await fetch(`/api/jobs/${data.jobId}`)).json();
+    if (job.status !== 'queued' && job.status !== 'running') break;
+    await new Promise(res => setTimeout(res, 300));
+  }
+  if (job.status !== 'done') {
+    alert(job.error || '加载示例失败');
+    return;
+  }
+  captureId = data.captureId;
+  $('#evtSummary').textContent = `示例已加载，共 ${job.result.count} 条目`;
 }
 
 // ===== 图形化关系图状态（D3力导向） =====
@@ -38,6 +59,8 @@ const GraphState = {
   // 群拖拽快照（记录开始拖拽时的多选初始位置）
   dragGroupSnapshot: null,
   dragNodeStartWorld: null,
+  // 图来自服务端时，类型/状态/子树/深度/折叠由服务端计算；导入的 JSON 在本地过滤
+  fromServer: false,
 };
 // 阶段统计缓存
 const PhaseCache = { last: null };
@@ -76,11 +99,22 @@ function initPositions(nodes) {
   GraphState.scale = 1.0; GraphState.tx = 0; GraphState.ty = 0;
 }
 
+// 节点显示名：折叠的同主机叶子簇显示主机与数量；服务端节点不带完整 URL
+function nodeLabel(n) {
+  if (n.cluster) return `${n.host || ''} ×${n.count}`;
+  return n.url || ((n.host || '') + (n.path || ''));
+}
+
 function applyFilter() {
+  if (GraphState.fromServer) return buildGraph();
+  filterLocal(false);
+}
+
+function filterLocal(serverFiltered) {
   const host = $('#filterHost').value.trim();
-  const type = $('#filterType').value;
-  const status = $('#filterStatus').value;
-  const rootId = $('#rootDocSelect').value ? Number($('#rootDocSelect').value) : null;
+  const type = serverFiltered ? '' : $('#filterType').value;
+  const status = serverFiltered ? '' : $('#filterStatus').value;
+  const rootId = !serverFiltered && $('#rootDocSelect').value ? Number($('#rootDocSelect').value) : null;
 
   let nodes = GraphState.nodes.slice();
   let edges = GraphState.edges.slice();
@@ -112,14 +146,30 @@ function applyFilter() {
   GraphState.fNodes = nodes;
   GraphState.fEdges = edges;
   buildAdj(edges);
-  initPositions(nodes);
-  startD3Sim();
+  // 服务端已给出布局坐标时直接固定节点，不再运行力导向
+  const placed = serverFiltered && nodes.length > 0 && nodes.every(n => typeof n.x === 'number' && typeof n.y === 'number');
+  if (placed) nodes.forEach(n => { n.fx = n.x; n.fy = n.y; });
+  else initPositions(nodes);
+  startD3Sim(placed);
   fitToView();
   renderGraphText();
 }
 
+// 服务端关系图参数：筛选、子树根、深度、同主机叶子折叠与节点上限
+function graphParams() {
+  const params = new URLSearchParams();
+  const type = $('#filterType').value; if (type) params.set('type', type);
+  const status = $('#filterStatus').value; if (status) params.set('status', status);
+  const root = $('#rootDocSelect').value; if (root) params.set('root', root);
+  const depth = $('#graphDepth').value; if (depth !== '') params.set('depth', depth);
+  if ($('#graphCollapse').checked) params.set('collapse', '1');
+  const limit = $('#graphLimit').value; if (limit) params.set('limit', limit);
+  if (!$('#graphLayout').checked) params.set('layout', '0');
+  return params;
+}
+
 async function buildGraph() {
-  const r = await fetch('/api/event-graph');
+  const r = await fetch(apiUrl('/api/event-graph', graphParams()));
   if (!r.ok) {
     $('#evtSummary').textContent = '生成失败：请先上传或加载示例';
     return;
@@ -127,26 +177,33 @@ async function buildGraph() {
   const data = await r.json();
   const nodes = data.nodes || []; const edges = data.edges || [];
   GraphState.nodes = nodes; GraphState.edges = edges;
-  // 填充 rootDocSelect 选项
+  GraphState.fromServer = true;
+  // 填充 rootDocSelect 选项（保留当前选择）
   const rootSel = $('#rootDocSelect');
+  const current = rootSel.value;
   rootSel.innerHTML = '<option value="">从 document 开始聚焦子树</option>';
-  for (const n of nodes) {
-    if ((n.type || '') === 'document') {
-      const opt = document.createElement('option');
-      opt.value = String(n.id);
-      opt.textContent = `[${n.id}] ${n.host || ''} ${n.path || ''}`;
-      rootSel.appendChild(opt);
-    }
+  for (const n of data.documents || []) {
+    const opt = document.createElement('option');
+    opt.value = String(n.id);
+    opt.textContent = `[${n.id}] ${n.host || ''} ${n.path || ''}`;
+    rootSel.appendChild(opt);
   }
-  $('#evtSummary').textContent = `节点 ${nodes.length}，关系 ${edges.length}`;
-  applyFilter();
+  rootSel.value = current;
+  const cut = data.truncated ? '（已截断，可用子树/深度/折叠缩小范围）' : '';
+  $('#evtSummary').textContent = `节点 ${nodes.length}/${data.totalNodes}，关系 ${edges.length}/${data.totalEdges}${cut}`;
+  filterLocal(true);
   bindCanvasInteractions();
 }
 
 // ===== D3 力导向仿真 =====
-function startD3Sim() {
+function startD3Sim(pinned = false) {
   if (GraphState.sim) GraphState.sim.stop();
   const nodes = GraphState.fNodes; const edges = GraphState.fEdges.map(e => ({...e}));
+  if (pinned) {
+    // 节点已固定在服务端布局上：不加任何力，仿真只负责把拖拽位置同步到节点并重绘
+    GraphState.sim = d3.forceSimulation(nodes).on('tick', () => { draw(); });
+    return;
+  }
   const link = d3.forceLink(edges).id(d => d.id).distance(GraphState.params.linkDistance).strength(0.7);
   // 按度调整斥力，孤立点弱斥力以避免散得太远
   const deg = new Map();
@@ -211,9 +268,10 @@ function draw() {
   }
 
   // 边
+  const byId = new Map(GraphState.fNodes.map(n => [n.id, n]));
   for (const e of GraphState.fEdges) {
-    const a = GraphState.fNodes.find(n=>n.id===e.source);
-    const b = GraphState.fNodes.find(n=>n.id===e.target);
+    const a = byId.get(e.source);
+    const b = byId.get(e.target);
     if (!a || !b) continue;
     if (only) {
       const key = `${e.source}->${e.target}|${e.reason||''}`;
@@ -227,7 +285,7 @@ function draw() {
   }
   // 节点
   for (const n of GraphState.fNodes) {
-    if (only && !changedNodeSet.has((n.url||'')+'|'+(n.type||'')+'|'+String(n.status||''))) continue;
+    if (only && !changedNodeSet.has(nodeLabel(n)+'|'+(n.type||'')+'|'+String(n.status||''))) continue;
     const r = 6; ctx.fillStyle = colorForType(n.type);
     ctx.beginPath(); ctx.arc((n.x||0), (n.y||0), r, 0, Math.PI*2); ctx.fill();
     const isSelected = (GraphState.selectedNode && GraphState.selectedNode.id===n.id);
@@ -239,7 +297,7 @@ function draw() {
       ctx.beginPath(); ctx.arc(n.x||0, n.y||0, r+2, 0, Math.PI*2); ctx.stroke();
     }
     if (GraphState.scale > 0.9) { ctx.fillStyle = '#333'; ctx.font = `${12}px sans-serif`; ctx.textAlign = 'left'; ctx.textBaseline = 'top';
-      const label = (n.host||'') + (n.path?(' '+n.path):''); ctx.fillText(label, (n.x||0) + r + 2, (n.y||0) + 2); }
+      const label = n.cluster ? nodeLabel(n) : (n.host||'') + (n.path?(' '+n.path):''); ctx.fillText(label, (n.x||0) + r + 2, (n.y||0) + 2); }
   }
   // 框选矩形（屏幕坐标）
   ctx.restore();
@@ -379,7 +437,7 @@ function bindCanvasInteractions() {
         tooltip.style.display = 'block';
         tooltip.style.left = `${ev.clientX + 12}px`;
         tooltip.style.top = `${ev.clientY + 12}px`;
-        tooltip.innerHTML = `[${node.id}] ${node.type || ''} ${node.status || ''}<br/>${node.method || ''} ${node.url || ''}`;
+        tooltip.innerHTML = `[${node.id}] ${node.type || ''} ${node.status || ''}<br/>${node.method || ''} ${nodeLabel(node)}`;
       } else {
         tooltip.style.display = 'none';
       }
@@ -456,6 +514,7 @@ async function importJson() {
     const nodes = Array.isArray(data.nodes) ? data.nodes : []; const edges = Array.isArray(data.edges) ? data.edges : [];
     GraphState.nodes = nodes.slice(); GraphState.edges = edges.slice();
     GraphState.fNodes = nodes.slice(); GraphState.fEdges = edges.slice();
+    GraphState.fromServer = false;
     buildAdj(edges);
     // 若 JSON 中带有 x/y，尊重其位置；否则初始化位置
     const hasPos = nodes.every(n => typeof n.x === 'number' && typeof n.y === 'number');
@@ -485,7 +544,7 @@ function snapshot(tag) {
 function compareSnapshots() {
   const A = GraphState.snapshots.A, B = GraphState.snapshots.B;
   if (!A || !B) { $('#compareOut').textContent = '请先保存快照A与快照B'; return; }
-  const keyNode = n => (n.url || '') + '|' + (n.type || '') + '|' + String(n.status || '');
+  const keyNode = n => nodeLabel(n) + '|' + (n.type || '') + '|' + String(n.status || '');
   const keyEdge = e => `${e.source}->${e.target}|${e.reason || ''}`;
   const setA_nodes = new Set(A.nodes.map(keyNode));
   const setB_nodes = new Set(B.nodes.map(keyNode));
@@ -545,7 +604,7 @@ function renderGraphText() {
 
 // ===== 阶段统计图表 =====
 async function loadPhaseStats() {
-  const r = await fetch('/api/event-stats');
+  const r = await fetch(apiUrl('/api/event-stats'));
   if (!r.ok) {
     $('#evtPhase').textContent = '获取失败：请先上传或加载示例';
     return;
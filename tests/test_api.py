@@ -0,0 +1,268 @@
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server.entry_store
+import server.fast_json
+import server.main
+from server.har_utils import build_entry_summary, normalize_har_file
+from server.main import app
+
+
+def _line(i, second=None):
+    entry = {
+        "startedDateTime": f"2025-01-01T00:00:{i if second is None else second:02d}.000Z",
+        "time": 100.0,
+        "request": {"method": "GET", "url": f"https://example.com/{i}"},
+        "response": {"status": 200, "statusText": "OK", "content": {"size": 6, "mimeType": "text/plain", "text": "abcdef"}},
+        "timings": {"wait": 90.0, "receive": 10.0},
+    }
+    return json.dumps(entry).encode("utf-8")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.main, "UPLOAD_DIR", str(tmp_path))
+    return TestClient(app)
+
+
+@pytest.fixture
+def capture(client):
+    capture_id = client.post("/api/live").json()["captureId"]
+    r = client.post(f"/api/live/{capture_id}/entries", content=b"\n".join(_line(i) for i in range(3)) + b"\n")
+    assert r.json()["accepted"] == 3
+    return capture_id
+
+
+@pytest.mark.parametrize("param", ["t0", "t1"])
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "x"])
+def test_waterfall_rejects_non_finite_bounds(client, capture, param, value):
+    r = client.get("/api/waterfall", params={"capture": capture, param: value})
+    assert r.status_code == 400
+
+
+def test_waterfall_bounds(client, capture):
+    r = client.get("/api/waterfall", params={"capture": capture, "t0": "0", "t1": "3000", "width": 10})
+    assert r.status_code == 200
+    assert r.json()["total"] == 3
+
+
+@pytest.mark.parametrize("header", ["bytes=abc-", "items=0-1", "bytes=1-2,4-5", "bytes=-", "bytes=3-1", "bytes=1--2", "bytes=+1-2"])
+def test_download_ignores_invalid_range(client, capture, header):
+    r = client.get("/api/entries/0/download", params={"capture": capture}, headers={"Range": header})
+    assert r.status_code == 200
+    assert r.content == b"abcdef"
+
+
+@pytest.mark.parametrize("header,expected", [("bytes=1-2", b"bc"), ("bytes=4-", b"ef"), ("bytes=-2", b"ef"), ("bytes=2-100", b"cdef")])
+def test_download_range(client, capture, header, expected):
+    r = client.get("/api/entries/0/download", params={"capture": capture}, headers={"Range": header})
+    assert r.status_code == 206
+    assert r.content == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=6-", "bytes=10-20", "bytes=-0"])
+def test_download_unsatisfiable_range(client, capture, header):
+    r = client.get("/api/entries/0/download", params={"capture": capture}, headers={"Range": header})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == "bytes */6"
+
+
+def test_entry_detail_does_not_inline_the_body(client, capture):
+    detail = client.get("/api/entries/1", params={"capture": capture}).json()
+    content = detail["response"]["content"]
+    assert "text" not in content
+    assert content["mimeType"] == "text/plain"
+    body = client.get("/api/entries/1/body", params={"capture": capture}).json()
+    assert content["digest"] == body["digest"] and body["previewText"] == "abcdef"
+    assert detail["summary"]["url"] == "https://example.com/1"
+
+
+def _ids(client, params):
+    r = client.get("/api/entries", params=params)
+    assert r.status_code == 200
+    data = r.json()
+    return [e["id"] for e in data["entries"]], data["total"], data["nextCursor"]
+
+
+@pytest.mark.parametrize("second", [30, 1])
+def test_cursor_survives_live_appends(client, capture, second):
+    ids, total, cursor = _ids(client, {"capture": capture, "limit": 2})
+    assert ids == [0, 1] and total == 3
+    # Later rows are appended; with ``second=1`` one lands between the first page's rows.
+    lines = [_line(i, second if i == 3 else 40 + i) for i in range(3, 6)]
+    assert client.post(f"/api/live/{capture}/entries", content=b"\n".join(lines) + b"\n").json()["accepted"] == 3
+    ids, total, cursor = _ids(client, {"capture": capture, "limit": 2, "cursor": cursor})
+    assert ids == [2] and total == 3 and cursor is None
+    ids, total, _ = _ids(client, {"capture": capture, "limit": 10})
+    assert total == 6 and sorted(ids) == list(range(6))
+    assert ids[:3] == ([0, 1, 2] if second == 30 else [0, 1, 3])
+
+
+def test_cursor_pages_match_offsets(client):
+    capture_id = client.post("/api/live").json()["captureId"]
+    lines = [_line(i, second=(7 * i) % 50) for i in range(40)]
+    client.post(f"/api/live/{capture_id}/entries", content=b"\n".join(lines) + b"\n")
+    params = {"capture": capture_id, "q": "example.com/1"}
+    expected, total, _ = _ids(client, {**params, "limit": 100})
+    assert total == len(expected) == 11
+    pages, total, cursor = _ids(client, {**params, "limit": 3})
+    while cursor is not None:
+        # The cursor carries the filter: a different ``q`` next to it is ignored.
+        ids, total, cursor = _ids(client, {"capture": capture_id, "q": "other", "limit": 3, "cursor": cursor})
+        assert total == 11
+        pages.extend(ids)
+    assert pages == expected
+    assert _ids(client, {**params, "limit": 4, "offset": 4})[0] == expected[4:8]
+
+
+def test_cursor_expires_with_a_reload(client, capture):
+    _, _, cursor = _ids(client, {"capture": capture, "limit": 1})
+    assert client.get("/api/entries", params={"capture": capture, "cursor": cursor}).status_code == 200
+    client.post(f"/api/live/{capture}/close")
+    server.main.REGISTRY.find(capture).unload()
+    r = client.get("/api/entries", params={"capture": capture, "cursor": cursor})
+    assert r.status_code == 410
+    assert _ids(client, {"capture": capture, "limit": 5})[0] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("cursor", ["x", "e30"])
+def test_malformed_cursor(client, capture, cursor):
+    assert client.get("/api/entries", params={"capture": capture, "cursor": cursor}).status_code == 400
+
+
+def test_finished_job_cannot_be_cancelled(client):
+    har = json.dumps({"log": {"version": "1.2", "entries": [json.loads(_line(i)) for i in range(3)]}})
+    job = client.post("/api/upload", files={"file": ("a.har", har.encode("utf-8"))}).json()["jobId"]
+    for _ in range(500):
+        info = client.get(f"/api/jobs/{job}").json()
+        if info["status"] == "done":
+            break
+        time.sleep(0.01)
+    assert info["result"]["count"] == 3
+    assert client.delete(f"/api/jobs/{job}").status_code == 409
+    assert client.delete("/api/jobs/missing").status_code == 404
+
+
+@pytest.mark.parametrize("params,status", [({"root": "3"}, 404), ({"root": "-1"}, 404), ({"top": "x"}, 400), ({"root": "2"}, 200)])
+def test_critical_path_parameters(client, capture, params, status):
+    r = client.get("/api/critical-path", params={"capture": capture, **params})
+    assert r.status_code == status
+
+
+def _reference_filter(entries, q=None, domain=None, status=None, mime=None, method=None, type=None, priority=None, statusMin=None, statusMax=None):
+    """The list filter as it was before the indexes (dict entries, one linear scan)."""
+
+    def match(e):
+        if q and not (q.lower() in e["url"].lower() or q.lower() in str(e["status"]) or q.lower() in (e["mimeType"] or "").lower()):
+            return False
+        if domain and urlparse(e["url"]).netloc != domain:
+            return False
+        if status and str(e["status"]) != status:
+            return False
+        if statusMin is not None and int(e["status"]) < int(statusMin):
+            return False
+        if statusMax is not None and int(e["status"]) > int(statusMax):
+            return False
+        if mime and (e["mimeType"] or "") != mime:
+            return False
+        if method and e["method"] != method:
+            return False
+        if type and e["resourceType"] != type:
+            return False
+        return not priority or str(e["priority"] or "") == priority
+
+    return sorted(filter(match, entries), key=lambda e: e["started_ms"])
+
+
+def _reference_stats(entries):
+    by_status, by_mime, by_domain, by_type = Counter(), Counter(), Counter(), Counter()
+    for e in entries:
+        by_status[str(e["status"])] += 1
+        by_mime[e["mimeType"] or "unknown"] += 1
+        host = urlparse(e["url"]).netloc
+        if host:
+            by_domain[host] += 1
+        by_type[e["resourceType"] or "unknown"] += 1
+    return {
+        "count": len(entries),
+        "totalSize": sum(int(e["size"] or 0) for e in entries),
+        "totalTime": sum(float(e["time"] or 0.0) for e in entries),
+        "byStatus": dict(by_status),
+        "byMimeType": dict(by_mime),
+        "byDomain": dict(by_domain),
+        "byResourceType": dict(by_type),
+    }
+
+
+def _random_entry(rng, i):
+    entry = {
+        "startedDateTime": f"2025-01-01T00:{rng.randrange(3):02d}:{rng.randrange(60):02d}.{rng.choice([0, 250]):03d}Z",
+        "time": rng.choice([0.0, 12.5, 80.0, 1500.25]),
+        "request": {"method": rng.choice(["GET", "POST", "OPTIONS"]), "url": f"https://{rng.choice(['h1.example', 'h2.example:8080', 'cdn.h1.example'])}/{rng.choice(['a', 'B', 'a/404'])}/{i}?q={rng.randrange(3)}"},
+        "response": {
+            "status": rng.choice([200, 204, 304, 404, 500, 0]),
+            "statusText": rng.choice(["OK", ""]),
+            "content": {"size": rng.choice([0, 10, 2048]), "mimeType": rng.choice(["text/html", "Text/HTML", "application/json", "image/png", ""])},
+        },
+        "timings": {"wait": rng.choice([1.0, 40.0]), "receive": rng.choice([0.5, -1])},
+    }
+    if rng.random() < 0.5:
+        entry["_resourceType"] = rng.choice(["script", "fetch", "document"])
+    if rng.random() < 0.5:
+        entry["_priority"] = rng.choice(["High", "Low"])
+    return entry
+
+
+_REFERENCE_FILTERS = [
+    {},
+    {"q": "h1"},
+    {"q": "404"},
+    {"q": "HTML"},
+    {"q": "/b/"},
+    {"domain": "h2.example:8080"},
+    {"domain": "h2.example"},
+    {"status": "304"},
+    {"statusMin": "300"},
+    {"statusMin": "200", "statusMax": "299"},
+    {"mime": "text/html"},
+    {"mime": ""},
+    {"method": "POST", "q": "cdn"},
+    {"type": "image"},
+    {"type": "script", "priority": "High"},
+    {"priority": "Low", "status": "200", "domain": "h1.example"},
+]
+
+
+@pytest.fixture(scope="module")
+def reference_capture(tmp_path_factory):
+    rng = random.Random(20)
+    path = tmp_path_factory.mktemp("reference") / "a.har"
+    path.write_text(json.dumps({"log": {"version": "1.2", "entries": [_random_entry(rng, i) for i in range(400)]}}))
+    return str(path), normalize_har_file(str(path))
+
+
+@pytest.mark.parametrize("params", _REFERENCE_FILTERS)
+@pytest.mark.parametrize("orjson", [True, False])
+def test_entries_and_stats_match_the_reference_filter(client, reference_capture, params, orjson, monkeypatch):
+    if not orjson:
+        monkeypatch.setattr(server.entry_store, "orjson", None)
+        monkeypatch.setattr(server.fast_json, "orjson", None)
+    path, entries = reference_capture
+    with open(path, "rb") as f:
+        job = client.post("/api/upload", files={"file": ("a.har", f.read())}).json()["jobId"]
+    for _ in range(500):
+        if client.get(f"/api/jobs/{job}").json()["status"] == "done":
+            break
+        time.sleep(0.01)
+    expected = _reference_filter(entries, **params)
+    r = client.get("/api/entries", params={**params, "limit": 1000})
+    assert r.json() == {"total": len(expected), "entries": [build_entry_summary(e) for e in expected], "nextCursor": None}
+    stats = client.get("/api/stats", params=params).json()
+    del stats["bodies"]
+    assert stats == _reference_stats(expected)
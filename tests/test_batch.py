@@ -0,0 +1,84 @@
+import csv
+import json
+
+import pytest
+
+from server.batch import main, pyarrow, summarize_file
+
+
+def _entry(i, host):
+    return {
+        "startedDateTime": f"2025-01-01T00:00:{i % 60:02d}.000Z",
+        "time": 5.0 + i * 3,
+        "request": {"method": "GET", "url": f"https://{host}/{i}"},
+        "response": {"status": 404 if i % 4 == 0 else 200, "content": {"size": 100 + i, "mimeType": "text/css" if i % 3 else "text/html", "text": f"body {i % 5}"}},
+        "timings": {"wait": 1.0 + i, "receive": 2.0},
+    }
+
+
+def _har(path, entries):
+    path.write_text(json.dumps({"log": {"version": "1.2", "entries": entries}}))
+    return entries
+
+
+@pytest.fixture
+def captures(tmp_path):
+    root = tmp_path / "captures"
+    (root / "nested").mkdir(parents=True)
+    files = {
+        root / "a.har": [_entry(i, "a.example") for i in range(30)],
+        root / "nested" / "b.har": [_entry(i, "b.example") for i in range(7)],
+        root / "c.har": [],
+    }
+    for path, entries in files.items():
+        _har(path, entries)
+    (root / "broken.har").write_text('{"log": {"entries": [{"request": ')
+    (root / "notes.txt").write_text("not a capture")
+    everything = _har(tmp_path / "all.har", [e for entries in files.values() for e in entries])
+    return root, files, summarize_file(str(tmp_path / "all.har"))[0], len(everything)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch(tmp_path, captures, workers, capsys):
+    root, files, combined, count = captures
+    out, summary, table = tmp_path / "out.jsonl", tmp_path / "summary.json", tmp_path / "files.csv"
+    assert main([str(root), "--out", str(out), "--summary", str(summary), "--table", str(table), "--workers", str(workers)]) == 1
+    assert "4 files (1 failed), 37 entries" in capsys.readouterr().err
+
+    records = {r["file"]: r for r in map(json.loads, out.read_text().splitlines())}
+    assert set(records) == {str(p) for p in files} | {str(root / "broken.har")}
+    assert records[str(root / "broken.har")]["error"].startswith("HarStreamError")
+    for path, entries in files.items():
+        record = records[str(path)]
+        assert record["entries"] == record["stats"]["count"] == len(entries)
+
+    totals = json.loads(summary.read_text())
+    assert (totals["files"], totals["failed"], totals["entries"]) == (4, 1, count)
+    stats, expected = totals["stats"], combined["stats"]
+    for key in ("count", "totalSize", "byStatus", "byMimeType", "byDomain", "byResourceType"):
+        assert stats[key] == expected[key], key
+    assert stats["totalTime"] == pytest.approx(expected["totalTime"])
+    # Bodies are deduplicated within each file only.
+    assert stats["bodies"]["count"] == expected["bodies"]["count"] and stats["bodies"]["unique"] == 10
+    # Merged sketches give the quantiles of all entries together.
+    assert totals["quantiles"] == combined["quantiles"]
+    assert totals["phases"]["total"] == pytest.approx(combined["phases"]["total"])
+
+    with open(table, newline="", encoding="utf-8") as f:
+        rows = {row["file"]: row for row in csv.DictReader(f)}
+    a = rows[str(root / "a.har")]
+    assert (a["entries"], a["status2xx"], a["status4xx"], a["error"]) == ("30", "22", "8", "")
+    assert rows[str(root / "broken.har")]["entries"] == ""
+
+
+def test_pattern_and_single_files(tmp_path, captures):
+    root = captures[0]
+    out = tmp_path / "out.jsonl"
+    assert main([str(root / "a.har"), str(root / "nested"), "--pattern", "b.*", "--out", str(out), "--workers", "1"]) == 0
+    assert [json.loads(line)["entries"] for line in out.read_text().splitlines()] == [30, 7]
+
+
+@pytest.mark.skipif(pyarrow is not None, reason="pyarrow is installed")
+def test_parquet_needs_pyarrow(tmp_path, captures):
+    with pytest.raises(SystemExit):
+        main([str(captures[0]), "--table", str(tmp_path / "files.parquet")])
@@ -0,0 +1,93 @@
+import base64
+
+import pytest
+
+import server.entry_store
+from server.bodies import Body
+from server.entry_store import EntryStore
+from server.har_utils import EntryNormalizer
+
+
+def _body(text, encoding="base64", mime="application/octet-stream"):
+    entry = {
+        "startedDateTime": "2025-01-01T00:00:00.000Z",
+        "time": 1.0,
+        "request": {"method": "GET", "url": "https://example.com/a"},
+        "response": {"status": 200, "content": {"size": 6, "mimeType": mime, "encoding": encoding, "text": text}},
+    }
+    store = EntryStore.from_entries([EntryNormalizer().add(entry)])
+    return Body(store, 0)
+
+
+def _check(text, expected, mime="application/octet-stream", encoding="base64"):
+    body = _body(text, encoding, mime)
+    index = body.index()
+    assert b"".join(body.stream()) == expected
+    assert index.length == len(expected)
+    points = range(0, len(expected) + 1, max(len(expected) // 20, 1))
+    for start in points:
+        for stop in points:
+            if start < stop:
+                assert b"".join(body.stream(start, stop, index)) == expected[start:stop]
+    return body
+
+
+@pytest.fixture(params=[server.entry_store.CHUNK_BYTES, 3])
+def chunk(request, monkeypatch):
+    # Small chunks put the padding and the leftovers on chunk boundaries.
+    monkeypatch.setattr(server.entry_store, "CHUNK_BYTES", request.param)
+
+
+def test_base64(chunk):
+    data = bytes(range(256)) * 3
+    _check(base64.b64encode(data).decode(), data)
+    _check(base64.b64encode(b"abcd").decode().rstrip("="), b"abcd")
+    _check("YWJj\nZGVm\n", b"abcdef")
+
+
+def test_padding_inside_base64(chunk):
+    body = _check("YWJj=ZGVm", b"abcdef", mime="text/plain")
+    assert body.preview()["previewText"] == "abcdef"
+
+
+def test_text_that_is_not_base64(chunk):
+    body = _check("not*base64!!", b"not*base64!!", mime="text/plain")
+    preview = body.preview()
+    assert preview["previewText"] == "not*base64!!" and preview["isBinary"]
+
+
+def test_plain_text(chunk):
+    body = _check("héllo", "héllo".encode("utf-8"), mime="text/plain", encoding=None)
+    assert body.preview()["previewText"] == "héllo"
+
+
+def _counting(body):
+    # Count the chunks of the body text that are read.
+    read = []
+    chunks = body.store.body_chunks
+
+    def body_chunks(i, pos=None):
+        for item in chunks(i, pos):
+            read.append(item)
+            yield item
+
+    body.store.body_chunks = body_chunks
+    return read
+
+
+def test_preview_reads_only_the_prefix(monkeypatch):
+    monkeypatch.setattr(server.entry_store, "CHUNK_BYTES", 1000)
+    data = b"x" * 300_000
+    for text in (base64.b64encode(data).decode(), base64.b64encode(data).decode() + "=ZGVm!"):
+        body = _body(text, mime="text/plain")
+        read = _counting(body)
+        preview = body.preview(limit=5000)
+        assert preview["previewText"] == "x" * 5000 and preview["truncated"] and not preview["isBinary"]
+        assert len(read) <= 8
+
+
+def test_preview_falls_back_when_the_prefix_fails(monkeypatch):
+    monkeypatch.setattr(server.entry_store, "CHUNK_BYTES", 4)
+    body = _body("YWJj=ZGVm" + "YWJj" * 10, mime="text/plain")
+    assert body.preview()["previewText"] == "abcdef" + "abc" * 10
+    assert b"".join(body.stream(index=body.index())) == b"abcdef" + b"abc" * 10
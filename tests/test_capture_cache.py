@@ -0,0 +1,83 @@
+import json
+import os
+import struct
+
+import pytest
+
+import server.capture_cache
+from server.aggregates import Aggregates
+from server.capture_cache import load_capture, read_manifest, save_capture
+from server.entry_index import EntryFilter, EntryIndex
+from server.har_utils import load_entry_store
+
+
+def _entry(i):
+    return {
+        "startedDateTime": f"2025-01-01T00:{i // 60:02d}:{i % 60:02d}.000Z",
+        "time": 10.0 + i,
+        "request": {"method": "POST" if i % 3 else "GET", "url": f"https://h{i % 4}.example/{i}"},
+        "response": {
+            "status": 404 if i % 5 == 0 else 200,
+            "content": {"size": 6, "mimeType": "text/css" if i % 2 else "text/html", "text": f"body {i}" if i % 4 else None},
+        },
+        "timings": {"wait": 5.0, "receive": 1.0 + i},
+        "_initiator": {"type": "parser", "url": f"https://h0.example/{i - 1}"} if i else {"type": "other"},
+    }
+
+
+_FILTERS = [EntryFilter(q="h1"), EntryFilter(status="404"), EntryFilter(mime="text/css", method="POST")]
+
+
+@pytest.fixture
+def sidecar(tmp_path):
+    har = tmp_path / "a.har"
+    har.write_text(json.dumps({"log": {"version": "1.2", "entries": [_entry(i) for i in range(90)]}}))
+    aggregates = Aggregates()
+    store = load_entry_store(str(har), aggregates=aggregates)
+    index = EntryIndex(store)
+    path = str(tmp_path / "a.harc")
+    save_capture(path, "cap", os.path.getsize(har), "a.har", store, index, aggregates)
+    return path, str(har), store, index, aggregates
+
+
+def test_round_trip(sidecar):
+    path, har, store, index, aggregates = sidecar
+    manifest, _ = read_manifest(path)
+    assert (manifest["id"], manifest["name"], manifest["count"]) == ("cap", "a.har", 90)
+    loaded, loaded_index, loaded_aggregates = load_capture(path, "cap", os.path.getsize(har), har)
+    assert len(loaded) == len(loaded_index) == 90
+    for i in range(90):
+        assert loaded.summary(i) == store.summary(i)
+        assert loaded.raw(i) == store.raw(i)
+        assert loaded.body_text(i) == store.body_text(i)
+        assert loaded.body_digest(i) == store.body_digest(i)
+    for f in _FILTERS:
+        assert list(loaded_index.filter(f)) == list(index.filter(f))
+    assert list(loaded_index.ordered_ids()) == list(index.ordered_ids())
+    assert loaded_aggregates.stats() == aggregates.stats()
+
+
+def test_mismatched_sidecar_is_ignored(sidecar):
+    path, har, *_ = sidecar
+    size = os.path.getsize(har)
+    assert load_capture(path, "other", size, har) is None
+    assert load_capture(path, "cap", size + 1, har) is None
+    assert load_capture(path + ".missing", "cap", size, har) is None
+
+
+@pytest.mark.parametrize("header", [struct.pack("<4sII", b"HARC", server.capture_cache.SCHEMA_VERSION - 1, 2), b"HARX", b""])
+def test_other_schema_is_rejected(sidecar, header):
+    path, har, *_ = sidecar
+    with open(path, "r+b") as f:
+        if header:
+            f.write(header)
+        else:
+            f.truncate(5)
+    assert read_manifest(path) is None
+    assert load_capture(path, "cap", os.path.getsize(har), har) is None
+
+
+def test_newer_schema_is_rejected(sidecar, monkeypatch):
+    path, har, *_ = sidecar
+    monkeypatch.setattr(server.capture_cache, "SCHEMA_VERSION", server.capture_cache.SCHEMA_VERSION + 1)
+    assert load_capture(path, "cap", os.path.getsize(har), har) is None
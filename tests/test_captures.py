@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from server.captures import Capture, CaptureRegistry, capture_id_for, file_digest
+
+
+def _entry(i):
+    return {
+        "startedDateTime": f"2025-01-01T00:00:{i:02d}.000Z",
+        "time": 10.0,
+        "request": {"method": "GET", "url": f"https://example.com/{i}"},
+        "response": {"status": 200, "content": {"size": 4, "mimeType": "text/plain", "text": "body"}},
+    }
+
+
+def _capture(directory, count, cache=True):
+    data = json.dumps({"log": {"version": "1.2", "entries": [_entry(i) for i in range(count)]}}).encode("utf-8")
+    path = directory / "upload.har"
+    path.write_bytes(data)
+    capture_id = capture_id_for(file_digest(str(path)))
+    final = directory / f"{capture_id}.har"
+    os.replace(path, final)
+    return Capture(capture_id, f"{count}.har", str(final), str(directory / f"{capture_id}.harc") if cache else None)
+
+
+def test_add_deduplicates(tmp_path):
+    registry = CaptureRegistry()
+    a = _capture(tmp_path, 3)
+    assert registry.add(a) is a
+    assert registry.add(Capture(a.id, "again.har", a.path)) is a
+    assert [c.name for c in registry.list()] == ["3.har"]
+    assert registry.get() is None  # nothing activated yet
+    data = registry.activate(a.id)
+    assert registry.latest == a.id and registry.get() is data and len(data.entries) == 3
+    registry.remove(a.id)
+    assert a.id not in registry and registry.latest is None and registry.get(a.id) is None
+
+
+def test_least_recently_used_captures_are_unloaded(tmp_path):
+    registry = CaptureRegistry()
+    a, b, c = (registry.add(_capture(tmp_path, n, cache=False)) for n in (3, 4, 5))
+    for capture in (a, b, c):
+        registry.get(capture.id)
+    assert a.loaded and b.loaded and c.loaded
+    registry.get(a.id)  # now b is the least recently used
+    registry.memory_budget = a.data.memory_bytes + c.data.memory_bytes
+    registry.get(c.id)
+    assert a.loaded and not b.loaded and c.loaded
+    # The most recently used capture stays loaded even over the budget.
+    registry.memory_budget = 0
+    data = registry.get(b.id)
+    assert b.loaded and not a.loaded and not c.loaded
+    assert len(data.entries) == 4 and a.info()["memoryBytes"] == 0
+
+
+def test_restore(tmp_path):
+    registry = CaptureRegistry()
+    captures = [registry.add(_capture(tmp_path, n)) for n in (3, 4)]
+    for capture in captures:
+        registry.activate(capture.id)
+    # The newer sidecar wins; a sidecar without its HAR file or for another id is skipped.
+    os.utime(captures[0].cache_path, (1, 1))
+    orphan = _capture(tmp_path, 6)
+    orphan.load()
+    os.remove(orphan.path)
+    shutil.copy(captures[1].cache_path, tmp_path / "other.harc")
+    (tmp_path / "other.har").write_bytes(b"{}")
+
+    restored = CaptureRegistry()
+    assert restored.restore(str(tmp_path)) == 2
+    assert restored.latest == captures[1].id
+    assert [c.name for c in restored.list()] == ["4.har", "3.har"]
+    assert not any(c.loaded for c in restored.list())
+    assert len(restored.get().entries) == 4
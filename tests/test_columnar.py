@@ -0,0 +1,94 @@
+import json
+import struct
+from array import array
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server.main
+from server.columnar import ALIGN, MAGIC, MEDIA_TYPE, VERSION, ColumnWriter, encode_summaries
+from server.entry_store import PHASES, EntryStore
+from server.har_utils import EntryNormalizer
+from server.main import app
+
+_TYPECODES = {"float64": "d", "int32": "i", "uint32": "I"}
+
+
+def _decode(payload):
+    """Columns of a ``ColumnWriter`` payload, read the way the page reads them (typed views at block offsets)."""
+    magic, version, header_len, _ = struct.unpack_from("<4sIII", payload)
+    assert (magic, version) == (MAGIC, VERSION)
+    header = json.loads(payload[16 : 16 + header_len])
+
+    def block(spec, typecode=None):
+        assert spec["offset"] % ALIGN == 0
+        if typecode is None:
+            return payload[spec["offset"] : spec["offset"] + spec["length"]]
+        values = array(typecode)
+        values.frombytes(payload[spec["offset"] : spec["offset"] + spec["length"] * values.itemsize])
+        return list(values)
+
+    columns = {}
+    for col in header.pop("columns"):
+        if col["type"] == "dict":
+            offsets, blob = block(col["offsets"], "I"), block(col["bytes"])
+            values = [blob[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+            columns[col["name"]] = [None if c == -1 else values[c] for c in block(col["codes"], "i")]
+        else:
+            columns[col["name"]] = block(col, _TYPECODES[col["type"]])
+    return header, columns
+
+
+def _summaries(columns):
+    rows = []
+    for k, i in enumerate(columns["id"]):
+        row = {name: values[k] for name, values in columns.items() if not name.startswith("phase.")}
+        row["timingSegments"] = {p: columns["phase." + p][k] for p in PHASES}
+        rows.append(row)
+    return rows
+
+
+def test_strings_use_a_page_dictionary():
+    w = ColumnWriter()
+    w.strings("s", ["a", None, "ü", 7], [2, 0, 2, 1, 3, 0])
+    w.numbers("n", "int32", [-1, 2])
+    payload = w.payload({"count": 6})
+    header, columns = _decode(payload)
+    assert header == {"count": 6}
+    assert columns == {"s": ["ü", "a", "ü", None, "7", "a"], "n": [-1, 2]}
+
+
+def test_summaries_round_trip():
+    normalizer, store = EntryNormalizer(), EntryStore()
+    for i in range(50):
+        store.append(
+            normalizer.add(
+                {
+                    "startedDateTime": f"2025-01-01T00:00:{i:02d}.125Z",
+                    "time": i * 1.5,
+                    "request": {"method": "GET" if i % 2 else "POST", "url": f"https://h{i % 3}.example/p/{i % 7}?é={i}"},
+                    "response": {"status": 200 + i % 3, "statusText": "", "content": {"size": 10 ** (i % 12), "mimeType": "text/html"}},
+                    "timings": {"wait": i / 3, "receive": -1},
+                }
+            )
+        )
+    ids = [7, 3, 49, 0, 3]
+    header, columns = _decode(encode_summaries(store, ids, {"total": 50, "nextCursor": None}))
+    assert header == {"count": 5, "total": 50, "nextCursor": None}
+    assert _summaries(columns) == [store.summary(i) for i in ids]
+    assert _decode(encode_summaries(store, [], {}))[1]["url"] == []
+
+
+@pytest.mark.parametrize("params", [{}, {"q": "example.com/1", "limit": 4}, {"status": "404"}])
+def test_columns_endpoint_matches_json(tmp_path, monkeypatch, params):
+    monkeypatch.setattr(server.main, "UPLOAD_DIR", str(tmp_path))
+    client = TestClient(app)
+    capture = client.post("/api/live").json()["captureId"]
+    lines = [json.dumps({"startedDateTime": f"2025-01-01T00:00:{(i * 7) % 60:02d}.000Z", "time": 10.0, "request": {"method": "GET", "url": f"https://example.com/{i}"}, "response": {"status": 200}}) for i in range(30)]
+    client.post(f"/api/live/{capture}/entries", content="\n".join(lines).encode("utf-8"))
+    expected = client.get("/api/entries", params={"capture": capture, **params}).json()
+    r = client.get("/api/entries/columns", params={"capture": capture, **params})
+    assert r.headers["content-type"] == MEDIA_TYPE
+    header, columns = _decode(r.content)
+    assert header == {"count": len(expected["entries"]), "total": expected["total"], "nextCursor": expected["nextCursor"]}
+    assert _summaries(columns) == expected["entries"]
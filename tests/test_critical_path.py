@@ -0,0 +1,109 @@
+import random
+
+from server.critical_path import CriticalPaths
+from server.entry_index import EntryIndex
+from server.entry_store import EntryStore
+from server.event_relations import NO_PARENT, EventGraph
+from server.har_utils import EntryNormalizer
+
+
+def _entry(second, url, time, initiator=None, rtype="script"):
+    entry = {
+        "startedDateTime": f"2025-01-01T00:00:{second:02d}.000Z",
+        "time": time,
+        "request": {"method": "GET", "url": url},
+        "response": {"status": 200, "content": {"size": 1, "mimeType": "text/html"}},
+        "_resourceType": rtype,
+    }
+    if initiator:
+        entry["_initiator"] = {"type": "parser", "url": initiator}
+    return entry
+
+
+def _store(entries, normalizer=None):
+    normalizer = normalizer or EntryNormalizer()
+    store = EntryStore()
+    for e in entries:
+        store.append(normalizer.add(e))
+    return store, normalizer
+
+
+def test_paths_cover_only_the_graph_rows():
+    store, normalizer = _store(
+        [
+            _entry(10, "https://a.example/", 500.0, rtype="document"),
+            _entry(11, "https://a.example/app.js", 1000.0, "https://a.example/"),
+            _entry(13, "https://a.example/data", 3000.0, "https://a.example/app.js"),
+        ]
+    )
+    graph = EventGraph(store, EntryIndex(store))
+    before = CriticalPaths(graph).chains()
+    # A live capture grows after the graph was built; a row starting earlier must not count.
+    store.append(normalizer.add(_entry(0, "https://b.example/", 60000.0, rtype="document")))
+    paths = CriticalPaths(graph)
+    assert len(paths.end) == len(paths.latest) == len(graph) == 3
+    result = paths.chains()
+    assert result == before
+    assert (result["start"], result["end"]) == (0.0, 6000.0)
+    assert [n["id"] for n in result["chains"][0]["nodes"]] == [0, 1, 2]
+
+
+def test_blocking_and_idle():
+    store, _ = _store(
+        [
+            _entry(0, "https://a.example/", 500.0, rtype="document"),
+            _entry(1, "https://a.example/app.js", 2000.0, "https://a.example/"),
+            _entry(4, "https://a.example/late", 100.0, "https://a.example/app.js"),
+            _entry(2, "https://a.example/quick", 100.0, "https://a.example/app.js"),
+            _entry(3, "https://b.example/", 100.0, rtype="document"),
+        ]
+    )
+    paths = CriticalPaths(EventGraph(store, EntryIndex(store)))
+    result = paths.chains()
+    assert (result["start"], result["end"], result["candidates"]) == (0.0, 4100.0, 3)
+    slowest = result["chains"][0]
+    assert (slowest["duration"], slowest["length"]) == (4100.0, 3)
+    nodes = slowest["nodes"]
+    assert [n["id"] for n in nodes] == [0, 1, 2]
+    assert [(n["blocking"], n["idle"]) for n in nodes] == [(500.0, 500.0), (2000.0, 1000.0), (100.0, 0.0)]
+    assert [c["duration"] for c in result["chains"]] == [4100.0, 2100.0, 100.0]
+    assert [c["duration"] for c in paths.chains(top=1)["chains"]] == [4100.0]
+    below = paths.chains(root=1)
+    assert (below["start"], below["end"], below["candidates"]) == (1000.0, 4100.0, 2)
+    assert [[n["id"] for n in c["nodes"]] for c in below["chains"]] == [[1, 2], [1, 3]]
+
+
+def test_slowest_chains_match_brute_force():
+    rng = random.Random(5)
+    urls = [f"https://h{k % 3}.example/{k}" for k in range(200)]
+    entries = [
+        _entry(k % 60, urls[k], rng.uniform(1, 5000), urls[rng.randrange(k)] if k and rng.random() < 0.85 else None)
+        for k in range(200)
+    ]
+    store, _ = _store(entries)
+    graph = EventGraph(store, EntryIndex(store))
+    paths = CriticalPaths(graph)
+    started, end = store.started_ms, paths.end
+
+    def ancestors(i):
+        while i != NO_PARENT:
+            yield i
+            i = graph.parent[i]
+
+    latest = list(end)
+    best = {}
+    for i in range(len(graph)):
+        chain = list(ancestors(i))
+        for a in chain[1:]:
+            latest[a] = max(latest[a], end[i])
+        best[chain[-1]] = max(best.get(chain[-1], 0.0), end[i] - started[chain[-1]])
+    # Chains end at requests nothing below them outlasts.
+    candidates = sorted((end[i] - started[list(ancestors(i))[-1]] for i in range(len(graph)) if latest[i] == end[i]), reverse=True)
+    result = paths.chains(top=5)
+    assert result["candidates"] == len(candidates)
+    assert [c["duration"] for c in result["chains"]] == candidates[:5]
+    for root, duration in best.items():
+        top = paths.chains(top=1, root=root)["chains"][0]
+        assert top["duration"] == duration and top["nodes"][0]["id"] == root
+        ids = [n["id"] for n in top["nodes"]]
+        assert all(graph.parent[b] == a for a, b in zip(ids, ids[1:]))
@@ -0,0 +1,81 @@
+import random
+from array import array
+
+import pytest
+
+from server.entry_index import UNION_MERGE_LISTS, EntryFilter, EntryIndex, _union
+from server.entry_store import EntryStore
+from server.har_utils import EntryNormalizer
+
+
+def _lists(rng, k, n, size):
+    return [array("I", sorted(rng.sample(range(n), size))) for _ in range(k)]
+
+
+@pytest.mark.parametrize("k,size", [(0, 0), (1, 5), (3, 40), (UNION_MERGE_LISTS + 1, 1), (UNION_MERGE_LISTS + 1, 30), (500, 2)])
+def test_union(k, size):
+    rng = random.Random(k * 1000 + size)
+    n = 1000
+    lists = _lists(rng, k, n, size) + [array("I")]
+    expected = sorted(set().union(*lists))
+    assert list(_union(lists, n)) == expected
+
+
+def test_union_of_disjoint_lists():
+    rng = random.Random(7)
+    n = 1000
+    codes = [rng.randrange(5) for _ in range(n)]
+    lists = [array("I", [r for r in range(n) if codes[r] == c]) for c in range(5)]
+    assert list(_union(lists[1:4], n, disjoint=True)) == [r for r in range(n) if 1 <= codes[r] <= 3]
+
+
+def _har_entry(rng, second):
+    host = f"h{rng.randrange(4)}.example"
+    return {
+        "startedDateTime": f"2025-01-01T00:{second // 60:02d}:{second % 60:02d}.000Z",
+        "time": 10.0,
+        "request": {"method": rng.choice(["GET", "POST"]), "url": f"https://{host}/{rng.randrange(30)}"},
+        "response": {"status": rng.choice([200, 304, 404]), "content": {"size": 1, "mimeType": rng.choice(["text/html", "text/css"])}},
+    }
+
+
+def _covered(index):
+    postings = {name: {c: list(index.posting(getattr(index, name), c)) for c in getattr(index, name)} for name in EntryIndex.POSTINGS}
+    urls = {c: [r for run in index.url_posting(c) for r in run] for c in range(index.url_count)}
+    return list(index.ordered_ids()), list(index.rank[: len(index)]), postings, {c: v for c, v in urls.items() if v}
+
+
+_FILTERS = [EntryFilter(q="h1"), EntryFilter(q="/2"), EntryFilter(status="304"), EntryFilter(mime="text/css", method="POST")]
+
+
+@pytest.mark.parametrize("late", [0, 5])
+def test_extend_growable(late):
+    rng = random.Random(late)
+    seconds = list(range(0, 2000, 5))
+    for k in rng.sample(range(100, len(seconds)), late):
+        seconds[k] -= 300  # a few rows start before ones already indexed
+    entries = [_har_entry(rng, s) for s in seconds]
+    normalizer, store = EntryNormalizer(), EntryStore()
+    index = EntryIndex(store, growable=True)
+    snapshots = []
+    pos = 0
+    while pos < len(entries):
+        for e in entries[pos : pos + rng.choice([1, 3, 40])]:
+            store.append(normalizer.add(e))
+        pos = len(store)
+        previous, index = index, index.extend()
+        if not late:
+            assert index.order is previous.order
+        snapshots.append((index, _covered(index), [list(index.filter(f)) for f in _FILTERS]))
+    with pytest.raises(ValueError):
+        previous.extend()
+    for index, covered, results in snapshots:
+        # Unchanged by the later batches, and the same as built from scratch.
+        assert _covered(index) == covered
+        assert [list(index.filter(f)) for f in _FILTERS] == results
+        prefix, fresh_normalizer = EntryStore(), EntryNormalizer()
+        for e in entries[: len(index)]:
+            prefix.append(fresh_normalizer.add(e))
+        fresh = EntryIndex(prefix)
+        assert _covered(fresh) == covered
+        assert [list(fresh.filter(f)) for f in _FILTERS] == results
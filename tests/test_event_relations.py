@@ -0,0 +1,132 @@
+import pytest
+
+from server.entry_index import EntryIndex
+from server.entry_store import EntryStore
+from server.event_relations import NO_PARENT, EventGraph, normalize_url
+from server.har_utils import EntryNormalizer
+
+
+def _entry(second, url, initiator=None, rtype="script"):
+    entry = {
+        "startedDateTime": f"2025-01-01T00:00:{second:02d}.000Z",
+        "time": 100.0,
+        "request": {"method": "GET", "url": url},
+        "response": {"status": 200, "content": {"size": 1, "mimeType": "text/html"}},
+        "_resourceType": rtype,
+    }
+    if isinstance(initiator, dict):
+        entry["_initiator"] = initiator
+    elif initiator:
+        entry["_initiator"] = {"type": "parser", "url": initiator}
+    return entry
+
+
+def _graph(entries):
+    normalizer, store = EntryNormalizer(), EntryStore()
+    for e in entries:
+        store.append(normalizer.add(e))
+    return EventGraph(store, EntryIndex(store))
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("HTTPS://A.Example:443/x?q=1#top", "https://a.example/x?q=1"),
+        ("http://a.example:80", "http://a.example/"),
+        ("http://a.example:8080/", "http://a.example:8080/"),
+        (" https://a.example/p ", "https://a.example/p"),
+        ("https://[::1", "https://[::1"),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_parents():
+    graph = _graph(
+        [
+            _entry(1, "https://a.example/", rtype="document"),  # 0
+            _entry(2, "https://a.example/app.js"),  # 1: no initiator, first document of the host
+            _entry(3, "https://a.example/app.js"),  # 2
+            _entry(4, "https://a.example/img.png", "HTTPS://a.example:443/app.js#x"),  # 3: latest earlier app.js
+            _entry(5, "https://b.example/font", {"type": "script", "stack": {"callFrames": [{"url": "https://a.example/app.js"}]}}),  # 4
+            _entry(6, "https://c.example/x", "https://c.example/"),  # 5: initiator not captured, no document yet
+            _entry(7, "https://c.example/", rtype="document"),  # 6
+            _entry(0, "https://a.example/early", "https://a.example/app.js"),  # 7: starts before every app.js
+        ]
+    )
+    assert list(graph.parent) == [NO_PARENT, 0, 0, 2, 2, NO_PARENT, NO_PARENT, NO_PARENT]
+    assert list(graph.reason) == [0, 2, 2, 1, 1, 0, 0, 0]
+    assert list(graph.documents) == [0, 6]
+    assert list(graph.children(0)) == [1, 2] and list(graph.children(2)) == [3, 4]
+    assert graph.edge_count() == 4
+
+
+def _tree():
+    # 0 -> 1 -> 2..5 (four leaves of one host) and 1 -> 6 -> 7
+    entries = [_entry(0, "https://a.example/", rtype="document"), _entry(1, "https://a.example/app.js", "https://a.example/")]
+    entries += [_entry(2 + k, f"https://cdn.example/{k}.png", "https://a.example/app.js") for k in range(4)]
+    entries += [_entry(6, "https://a.example/chunk.js", "https://a.example/app.js"), _entry(7, "https://a.example/api", "https://a.example/chunk.js")]
+    return _graph(entries)
+
+
+def test_subgraph():
+    graph = _tree()
+    full = graph.subgraph()
+    assert [(n["id"], n["depth"]) for n in full["nodes"]] == [(0, 0), (1, 1), (2, 2), (3, 2), (4, 2), (5, 2), (6, 2), (7, 3)]
+    assert full["roots"] == 1 and not full["truncated"] and len(full["edges"]) == 7
+    assert {e["reason"] for e in full["edges"]} == {"initiator"}
+
+    shallow = graph.subgraph(max_depth=1)
+    assert [n["id"] for n in shallow["nodes"]] == [0, 1] and shallow["truncated"]
+
+    limited = graph.subgraph(limit=3)
+    assert [n["id"] for n in limited["nodes"]] == [0, 1, 2] and limited["truncated"]
+    assert all(e["target"] in (1, 2) for e in limited["edges"])
+
+    below = graph.subgraph(root=6)
+    assert [(n["id"], n["depth"]) for n in below["nodes"]] == [(6, 0), (7, 1)]
+
+
+def test_subgraph_collapses_leaves():
+    collapsed = _tree().subgraph(collapse=True)
+    clusters = [n for n in collapsed["nodes"] if n.get("cluster")]
+    assert len(clusters) == collapsed["clusters"] == 1
+    assert clusters[0]["members"] == [2, 3, 4, 5] and clusters[0]["host"] == "cdn.example"
+    assert {"source": 1, "target": -1, "reason": "initiator"} in collapsed["edges"]
+    assert [n["id"] for n in collapsed["nodes"] if not n.get("cluster")] == [0, 1, 6, 7]
+
+
+def test_subgraph_keeps_a_mask():
+    graph = _tree()
+    keep = bytearray(len(graph))
+    for i in (0, 3, 6, 7):
+        keep[i] = 1
+    result = graph.subgraph(keep=keep)
+    # Entries whose parent is filtered out become roots.
+    assert result["roots"] == 3
+    assert [n["id"] for n in result["nodes"]] == [0, 3, 6, 7]
+    assert [(e["source"], e["target"]) for e in result["edges"]] == [(6, 7)]
+
+
+def test_growing_capture():
+    entries = [
+        _entry(0, "https://a.example/", rtype="document"),
+        _entry(1, "https://a.example/app.js", "https://a.example/"),
+        _entry(2, "https://a.example/app.js", "https://a.example/"),
+        _entry(3, "https://a.example/x", "https://a.example/app.js"),
+        _entry(4, "https://b.example/", rtype="document"),
+        _entry(5, "https://b.example/y", "https://a.example/x"),
+    ]
+    normalizer, store = EntryNormalizer(), EntryStore()
+    for e in entries[:3]:
+        store.append(normalizer.add(e))
+    index = EntryIndex(store, growable=True)
+    graph = EventGraph(store, index)
+    for e in entries[3:]:
+        store.append(normalizer.add(e))
+    grown = EventGraph(store, index.extend())
+    # The earlier graph only covers the rows of its index.
+    assert len(graph) == 3 and graph.subgraph()["documents"] == grown.subgraph()["documents"][:1]
+    assert list(graph.parent) == list(grown.parent[:3])
+    assert list(grown.parent) == list(_graph(entries).parent) == [NO_PARENT, 0, 0, 2, NO_PARENT, 3]
@@ -0,0 +1,86 @@
+import random
+
+from server.entry_index import EntryIndex
+from server.entry_store import EntryStore
+from server.event_relations import NO_PARENT, EventGraph
+from server.graph_layout import LAYER_HEIGHT, SLOT_WIDTH, TreeLayout
+from server.har_utils import EntryNormalizer
+
+
+def _forest(n, seed):
+    """``n`` requests; each one is started by an earlier one or is a root."""
+    rng = random.Random(seed)
+    urls = [f"https://h{k % 5}.example/{k}" for k in range(n)]
+    normalizer, store = EntryNormalizer(), EntryStore()
+    for k in range(n):
+        entry = {
+            "startedDateTime": f"2025-01-01T00:{k // 60:02d}:{k % 60:02d}.000Z",
+            "time": 10.0,
+            "request": {"method": "GET", "url": urls[k]},
+            "response": {"status": 200, "content": {"size": 1, "mimeType": "text/plain"}},
+        }
+        if k and rng.random() < 0.8:
+            entry["_initiator"] = {"type": "script", "url": urls[rng.randrange(max(0, k - 10), k)]}
+        store.append(normalizer.add(entry))
+    return EventGraph(store, EntryIndex(store))
+
+
+def _trees(graph):
+    tree = {}
+    for i in graph.index.ordered_ids():
+        p = graph.parent[i]
+        tree[i] = i if p == NO_PARENT else tree[p]
+    return tree
+
+
+def test_layout_is_layered_and_centred():
+    graph = _forest(300, 1)
+    layout = TreeLayout(graph)
+    assert len(layout) == len(graph) and layout.graph is graph
+    for i in range(len(graph)):
+        kids = graph.children(i)
+        if kids:
+            assert layout.x[i] == (layout.x[kids[0]] + layout.x[kids[-1]]) / 2
+            assert all(layout.y[c] == layout.y[i] + LAYER_HEIGHT for c in kids)
+            # Children left to right in start order.
+            assert [layout.x[c] for c in kids] == sorted(layout.x[c] for c in kids)
+
+
+def test_trees_do_not_overlap():
+    graph = _forest(300, 2)
+    layout = TreeLayout(graph)
+    boxes = {}
+    for i, t in _trees(graph).items():
+        x, y = layout.position(i)
+        lo_x, lo_y, hi_x, hi_y = boxes.get(t, (x, y, x, y))
+        boxes[t] = (min(lo_x, x), min(lo_y, y), max(hi_x, x), max(hi_y, y))
+    assert len(boxes) > 10
+    placed = list(boxes.values())
+    for k, a in enumerate(placed):
+        for b in placed[k + 1 :]:
+            assert a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1]
+    # Leaves take distinct slots; the packed forest is wider than tall, but not a single row.
+    positions = [layout.position(i) for i in range(len(graph))]
+    assert len(set(positions)) == len(positions)
+    width = max(x for x, _ in positions) + SLOT_WIDTH
+    height = max(y for _, y in positions) + LAYER_HEIGHT
+    assert 0.5 < width / height < 5
+
+
+def test_subgraph_positions():
+    graph = _forest(60, 3)
+    layout = TreeLayout(graph)
+    result = graph.subgraph(collapse=True, layout=layout)
+    for node in result["nodes"]:
+        if node.get("cluster"):
+            members = node["members"]
+            assert node["x"] == sum(layout.x[m] for m in members) / len(members)
+            assert node["y"] == layout.y[members[0]]
+        else:
+            assert (node["x"], node["y"]) == layout.position(node["id"])
+
+
+def test_empty_graph():
+    store = EntryStore()
+    graph = EventGraph(store, EntryIndex(store))
+    assert len(TreeLayout(graph)) == 0
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+import server.har_stream
+from server.har_stream import HarStreamError, check_har_tail, find_entry_start, iter_har_entries
+
+
+def _entry(i):
+    return {
+        "startedDateTime": f"2025-01-01T00:00:{i % 60:02d}.000Z",
+        "time": float(i),
+        "request": {"method": "GET", "url": f"https://example.com/{i}", "headers": [{"name": "x", "value": "{\"a\": 1}"}]},
+        "response": {"status": 200, "content": {"size": 3, "mimeType": "text/plain", "text": "," * (i % 7)}},
+    }
+
+
+@pytest.fixture
+def har(tmp_path):
+    path = tmp_path / "a.har"
+    path.write_text(json.dumps({"log": {"version": "1.2", "entries": [_entry(i) for i in range(60)]}}, indent=1))
+    return str(path)
+
+
+def test_find_entry_start_scans_in_windows(har, monkeypatch):
+    starts = [start for _, start, _ in iter_har_entries(har)]
+    size = len(open(har, "rb").read())
+    monkeypatch.setattr(server.har_stream, "CANDIDATE_OVERLAP", 16)
+    for lo in range(starts[1] - 40, size, 97):
+        # One window over the whole range
+        expected = find_entry_start(har, lo, size, 2 * size)
+        assert expected is None or expected in starts and expected >= lo
+        for chunk_size in (32, 100, 1000):
+            assert find_entry_start(har, lo, size, chunk_size) == expected
+
+
+def test_find_entry_start_reads_bounded_windows(har, monkeypatch):
+    reads = []
+    real_open = open
+
+    class Counting:
+        def __init__(self, f):
+            self._f = f
+
+        def read(self, n=-1):
+            reads.append(n)
+            return self._f.read(n)
+
+        def __getattr__(self, name):
+            return getattr(self._f, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._f.close()
+
+    size = len(real_open(har, "rb").read())
+    starts = [start for _, start, _ in iter_har_entries(har)]
+    monkeypatch.setattr(server.har_stream, "open", lambda *a: Counting(real_open(*a)), raising=False)
+    assert find_entry_start(har, starts[-1] - 10, size, chunk_size=512) == starts[-1]
+    assert max(reads) <= 512 * 4
+
+
+def _document(**log):
+    entries = [{"n": i, "text": "é\"\\u" * i, "nested": {"list": [i, "]", "}"]}} for i in range(4)]
+    return {"first": [1, 2], "log": {"version": "1.2", "entries": entries, **log}, "last": {"x": None}}
+
+
+@pytest.mark.parametrize("chunk_size", [3, 64, 1 << 20])
+@pytest.mark.parametrize("bom", [b"", b"\xef\xbb\xbf"])
+def test_entries_and_offsets(tmp_path, chunk_size, bom):
+    doc = _document(pages=[{"id": "p"}])
+    data = bom + json.dumps(doc, ensure_ascii=False, indent=2).encode("utf-8")
+    path = tmp_path / "a.har"
+    path.write_bytes(data)
+    parsed = list(iter_har_entries(str(path), chunk_size))
+    assert [e for e, _, _ in parsed] == doc["log"]["entries"]
+    for e, start, end in parsed:
+        assert json.loads(data[start:end]) == e
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    data = json.dumps(_document(), ensure_ascii=False).encode("utf-8")
+    path = tmp_path / "a.har"
+    for cut in range(len(data)):
+        path.write_bytes(data[:cut])
+        with pytest.raises(ValueError):
+            list(iter_har_entries(str(path), chunk_size=7))
+
+
+@pytest.mark.parametrize("tail,ok", [("", True), ("  \n", True), ("x", False), ("{}", False), (" ]", False)])
+def test_trailing_data(tmp_path, tail, ok):
+    path = tmp_path / "a.har"
+    path.write_text(json.dumps(_document()) + tail)
+    if ok:
+        assert len(list(iter_har_entries(str(path)))) == 4
+    else:
+        with pytest.raises(HarStreamError):
+            list(iter_har_entries(str(path)))
+
+
+@pytest.mark.parametrize(
+    "tail,ok",
+    [
+        ("}}", True),
+        (', "pages": [{"a": "}"}]}, "x": 1}\n', True),
+        ("}", False),
+        (', "pages": [}}', False),
+        (', 5: 1}}', False),
+        ("}} []", False),
+        ("}}}", False),
+    ],
+)
+def test_check_har_tail(tmp_path, tail, ok):
+    head = '{"log": {"entries": [{"a": 1}]'
+    path = tmp_path / "a.har"
+    path.write_text(head + tail)
+    if ok:
+        check_har_tail(str(path), len(head), chunk_size=4)
+    else:
+        with pytest.raises(HarStreamError):
+            check_har_tail(str(path), len(head), chunk_size=4)
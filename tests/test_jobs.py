@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+import server.jobs
+from server.jobs import CANCELLED, DONE, FAILED, Job, JobManager
+
+
+def _wait(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while not job.finished:
+        assert time.time() < deadline, job.status
+        time.sleep(0.005)
+    return job
+
+
+@pytest.fixture
+def jobs():
+    return JobManager(max_workers=1)
+
+
+def test_done(jobs):
+    cleaned = []
+
+    def work(job):
+        job.report(40, 2)
+        return {"count": 2}
+
+    job = _wait(jobs.submit(Job("ingest", 100, name="a.har"), work, lambda: cleaned.append(1)))
+    info = job.info()
+    assert (info["status"], info["result"], info["progress"], info["entries"], info["name"]) == (DONE, {"count": 2}, 1.0, 2, "a.har")
+    assert jobs.get(job.id) is job and not cleaned
+    assert not job.cancel()
+
+
+def test_failure_runs_cleanup(jobs):
+    cleaned = []
+
+    def work(job):
+        raise ValueError("bad HAR")
+
+    job = _wait(jobs.submit(Job("ingest", 100), work, lambda: cleaned.append(1)))
+    assert (job.status, job.error, cleaned) == (FAILED, "bad HAR", [1])
+
+
+def test_cancel_running_job(jobs):
+    started, cleaned = threading.Event(), []
+
+    def work(job):
+        started.set()
+        for i in range(1000):
+            job.report(i, i)
+            time.sleep(0.005)
+        return {}
+
+    job = jobs.submit(Job("ingest", 1000), work, lambda: cleaned.append(1))
+    assert started.wait(5)
+    assert job.cancel()
+    _wait(job)
+    assert job.status == CANCELLED and cleaned == [1]
+    assert job.bytes_read < 1000 and job.info()["eta"] is None
+
+
+def test_cancel_queued_job(jobs):
+    release, ran, cleaned = threading.Event(), [], []
+    first = jobs.submit(Job("ingest", 1), lambda job: release.wait(5) and {})
+    queued = jobs.submit(Job("ingest", 1), lambda job: ran.append(1), lambda: cleaned.append(1))
+    assert queued.cancel()
+    release.set()
+    _wait(first)
+    _wait(queued)
+    assert queued.status == CANCELLED and not ran and cleaned == [1]
+
+
+def test_finished_jobs_are_pruned(jobs, monkeypatch):
+    monkeypatch.setattr(server.jobs, "MAX_FINISHED", 2)
+    done = [_wait(jobs.submit(Job("ingest", 1), lambda job: {})) for _ in range(4)]
+    last = _wait(jobs.submit(Job("ingest", 1), lambda job: {}))
+    assert [jobs.get(j.id) for j in done] == [None, None, done[2], done[3]]
+    assert jobs.get(last.id) is last
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from server.aggregates import Aggregates
+from server.captures import Capture, CaptureRegistry
+from server.live import LiveCapture
+
+
+def _line(i, **extra):
+    entry = {
+        "startedDateTime": f"2025-01-01T00:00:{i:02d}.000Z",
+        "time": 10.0 + i,
+        "request": {"method": "GET", "url": f"https://example.com/{i}"},
+        "response": {"status": 200, "statusText": "OK", "content": {"size": 100, "mimeType": "text/html", "text": f"body {i}"}},
+        "timings": {"wait": 5.0, "receive": 1.0},
+    }
+    entry.update(extra)
+    return json.dumps(entry).encode("utf-8")
+
+
+@pytest.fixture
+def live(tmp_path):
+    path = tmp_path / "live.ndjson"
+    path.write_bytes(b"")
+    return LiveCapture("live", "live", str(path))
+
+
+def _check(live, count):
+    data = live.data
+    assert len(data.entries) == len(data.index) == data.aggregates.count == count
+    assert data.entries.summary(count - 1)["id"] == count - 1
+
+
+def test_bad_lines_are_rejected_alone(live):
+    lines = [_line(0), _line(1, request=5), _line(2, time=float("nan")), b"{", _line(3, response={"statusText": {}}), _line(4)]
+    added, errors = live.append(lines)
+    assert added == 3
+    assert [e["line"] for e in errors] == [2, 4, 5]
+    _check(live, 3)
+    added, errors = live.append([_line(5)])
+    assert (added, errors) == (1, [])
+    _check(live, 4)
+    with open(live.path, "rb") as f:
+        assert len(f.read().splitlines()) == 4
+
+
+def test_failed_batch_is_rolled_back(live, monkeypatch):
+    live.append([_line(0), _line(1)])
+    size = os.path.getsize(live.path)
+
+    update = Aggregates.update
+    calls = []
+
+    def fail(self, store):
+        # Fails once, half way through the batch; recounting still works.
+        calls.append(len(store))
+        if len(calls) == 1:
+            update(self, store)
+            raise RuntimeError("boom")
+        update(self, store)
+
+    monkeypatch.setattr(Aggregates, "update", fail)
+    added, errors = live.append([_line(2), _line(3)], first_line=3)
+    assert added == 0
+    assert [e["line"] for e in errors] == [3, 4]
+    assert os.path.getsize(live.path) == size
+    _check(live, 2)
+
+    monkeypatch.undo()
+    added, errors = live.append([_line(2), _line(3)], first_line=3)
+    assert (added, errors) == (2, [])
+    _check(live, 4)
+    data = live.data
+    assert data.entries.body_text(3) == "body 3"
+    assert data.entries.raw(2)["request"]["url"] == "https://example.com/2"
+    assert data.entries.started_ms[2] == 2000.0
+    live.close()
+    live.unload()
+    assert len(live.load().entries) == 4
+
+
+def test_open_capture_is_not_evicted(live, tmp_path):
+    live.append([_line(0), _line(1)])
+    registry = CaptureRegistry()
+    registry.add(live)
+    assert registry.get("live") is live.data
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.har"
+        path.write_text(json.dumps({"log": {"entries": [json.loads(_line(i)) for i in range(5)]}}))
+        registry.add(Capture(name, name, str(path)))
+    a, b = registry.get("a"), registry.get("b")
+    # Over budget: only evicting ``a`` brings it back under, ``live`` stays.
+    registry.memory_budget = a.memory_bytes + b.memory_bytes
+    registry.get("b")
+    assert [c.id for c in registry.list() if c.loaded] == ["b", "live"]
+    live.close()
+    registry.memory_budget = b.memory_bytes
+    registry.get("b")
+    assert [c.id for c in registry.list() if c.loaded] == ["b"]
@@ -0,0 +1,95 @@
+import re
+
+from fastapi.testclient import TestClient
+
+import server.main
+from server.main import app
+from server.metrics import STAGE_SECONDS, Counter, Gauge, Histogram, Metrics, stage
+
+
+def test_exposition_format():
+    metrics = Metrics()
+    hits = metrics.add(Counter("t_hits_total", "Hits.", ("path",)))
+    size = metrics.add(Gauge("t_size_bytes", "Size."))
+    live = metrics.add(Gauge("t_live", "Live.", ("id",), collect=lambda: [(("b",), 2), (("a",), 1.5)]))
+    seconds = metrics.add(Histogram("t_seconds", "Time.", ("op",), buckets=(0.1, 1.0)))
+    hits.inc(1, 'a"\\\n')
+    hits.inc(2, 'a"\\\n')
+    size.set(10)
+    for v in (0.05, 0.1, 0.5, 7.0):
+        seconds.observe(v, "get")
+    assert live.labels == ("id",)
+    assert metrics.render().splitlines() == [
+        "# HELP t_hits_total Hits.",
+        "# TYPE t_hits_total counter",
+        't_hits_total{path="a\\"\\\\\\n"} 3',
+        "# HELP t_size_bytes Size.",
+        "# TYPE t_size_bytes gauge",
+        "t_size_bytes 10",
+        "# HELP t_live Live.",
+        "# TYPE t_live gauge",
+        't_live{id="a"} 1.5',
+        't_live{id="b"} 2',
+        "# HELP t_seconds Time.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{op="get",le="0.1"} 2',
+        't_seconds_bucket{op="get",le="1.0"} 3',
+        't_seconds_bucket{op="get",le="+Inf"} 4',
+        't_seconds_sum{op="get"} 7.65',
+        't_seconds_count{op="get"} 4',
+    ]
+
+
+def _sample(text, name, **labels):
+    pattern = re.escape(name) + r"\{([^}]*)\} (\S+)$"
+    for line in text.splitlines():
+        m = re.match(pattern, line)
+        if m and all(f'{k}="{v}"' in m.group(1).split(",") for k, v in labels.items()):
+            return float(m.group(2))
+    return None
+
+
+def test_metrics_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.main, "UPLOAD_DIR", str(tmp_path))
+    client = TestClient(app)
+    capture = client.post("/api/live").json()["captureId"]
+    client.get("/api/entries", params={"capture": capture})
+    before = _sample(client.get("/metrics").text, "har_http_requests_total", method="GET", route="/api/entries", status="200")
+    client.get("/api/entries", params={"capture": capture})
+    r = client.get("/metrics")
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    # Every line is a comment or a sample, and each family is announced once.
+    for line in text.splitlines():
+        assert re.match(r"# (HELP|TYPE) \w+ .+$|\w+(\{.*\})? (-?[0-9.e+-]+|\+Inf|NaN)$", line), line
+    types = re.findall(r"# TYPE (\w+) ", text)
+    assert len(types) == len(set(types))
+    assert _sample(text, "har_http_requests_total", method="GET", route="/api/entries", status="200") == before + 1
+    assert _sample(text, "har_http_request_duration_seconds_count", method="GET", route="/api/entries") >= 2
+    assert _sample(text, "har_capture_memory_bytes", capture=capture) > 0
+    assert f"har_memory_budget_bytes {server.main.REGISTRY.memory_budget}" in text.splitlines()
+
+
+def test_server_timing_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.main, "UPLOAD_DIR", str(tmp_path))
+    client = TestClient(app)
+    capture = client.post("/api/live").json()["captureId"]
+    plain = client.get("/api/entries", params={"capture": capture})
+    assert "server-timing" not in plain.headers
+    timed = client.get("/api/entries", params={"capture": capture}, headers={"X-Profile": "1"})
+    parts = timed.headers["server-timing"].split(", ")
+    assert parts[-1].startswith("total;dur=")
+    assert all(re.match(r"[\w.]+;dur=\d+\.\d{3}$", p) for p in parts)
+
+
+def test_stage():
+    with stage("test.stage") as timed:
+        pass
+    assert timed.seconds >= 0
+    assert 'stage="test.stage"' in "\n".join(_render(STAGE_SECONDS))
+
+
+def _render(metric):
+    out = []
+    metric.render(out)
+    return out
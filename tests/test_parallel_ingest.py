@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import server.parallel_ingest
+from server.aggregates import Aggregates
+from server.har_stream import HarStreamError
+from server.har_utils import load_entry_store
+from server.parallel_ingest import load_entry_store_parallel, split_ranges
+
+
+def _entry(i):
+    entry = {
+        "startedDateTime": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000:03d}Z",
+        "time": 3.0 + i % 7,
+        "request": {"method": "GET", "url": f"https://h{i % 3}.example/{i}"},
+        # Bodies that look like entries, to mislead the guessed range starts.
+        "response": {"status": 200, "content": {"size": 9, "mimeType": "application/json", "text": json.dumps([{"request": {}}, "{"] * (i % 4))}},
+    }
+    if i < 3 or i % 17 == 0:
+        del entry["startedDateTime"]  # placed after the previous entries (``rolling_ms``)
+    elif i % 23 == 0:
+        entry["startedDateTime"] = "not a date"
+    return entry
+
+
+@pytest.fixture
+def har(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.parallel_ingest, "MIN_RANGE_BYTES", 1500)
+    path = tmp_path / "a.har"
+    path.write_text(json.dumps({"log": {"version": "1.2", "entries": [_entry(i) for i in range(300)], "pages": [{"id": "]"}]}}, indent=1))
+    return str(path)
+
+
+def _rows(store):
+    return [(store.summary(i), store.started_ms[i], store.raw(i)) for i in range(len(store))]
+
+
+def test_split_ranges(monkeypatch):
+    monkeypatch.setattr(server.parallel_ingest, "MIN_RANGE_BYTES", 10)
+    assert split_ranges(5, 12, 4) == [(5, 12)]
+    ranges = split_ranges(7, 1007, 3)
+    assert len(ranges) == 3 * server.parallel_ingest.RANGES_PER_WORKER
+    assert ranges[0][0] == 7 and ranges[-1][1] == 1007
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_matches_sequential_load(har):
+    sequential_aggregates, parallel_aggregates = Aggregates(), Aggregates()
+    sequential = load_entry_store(har, aggregates=sequential_aggregates)
+    progress = []
+    parallel = load_entry_store_parallel(har, 3, lambda *p: progress.append(p), parallel_aggregates)
+    assert len(parallel) == len(sequential) == 300
+    assert _rows(parallel) == _rows(sequential)
+    assert parallel_aggregates.stats() == sequential_aggregates.stats()
+    assert len(progress) > 2 and progress[-1][1] == 300
+    assert [p[1] for p in progress] == sorted(p[1] for p in progress)
+
+
+def test_truncated_file_is_rejected(har):
+    with open(har, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 40)
+    with pytest.raises(HarStreamError):
+        load_entry_store_parallel(har, 2)
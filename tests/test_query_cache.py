@@ -0,0 +1,38 @@
+from array import array
+
+import pytest
+
+from server.entry_index import EntryFilter
+from server.query_cache import QueryCache, decode_cursor, encode_cursor, normalize_filter
+
+
+def test_cursor_round_trip():
+    f = normalize_filter(EntryFilter(q="JS", domain="", status_min=200, body=True, time_from=1.5))
+    assert f == EntryFilter(q="js", status_min=200, body=True, time_from=1.5)
+    assert decode_cursor(encode_cursor(7, 120, f, 200)) == (7, 120, f, 200)
+
+
+@pytest.mark.parametrize("token", ["", "!!", "bnVsbA", encode_cursor(1, 2, EntryFilter(), 3)[:-4]])
+def test_malformed_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_body_search_needs_a_keyword():
+    assert normalize_filter(EntryFilter(body=True)).body is False
+
+
+def test_eviction_by_count_and_ranks():
+    cache = QueryCache(max_queries=2, max_ranks=10)
+    cache.put("a", array("I", range(4)))
+    cache.put("b", array("I", range(4)))
+    assert cache.get("a") is not None  # ``b`` is now the least recently used
+    cache.put("c", array("I", range(1)))
+    assert cache.get("b") is None
+    cache.put("d", array("I", range(8)))  # over the rank budget: drops ``a``
+    assert cache.get("a") is None and cache.get("c") is not None
+    cache.put("e", array("I", range(11)))  # larger than the whole budget: not kept
+    assert cache.get("e") is None
+    stats = cache.stats()
+    assert (stats["queries"], stats["ranks"], stats["evictions"]) == (2, 9, 2)
+    assert (stats["hits"], stats["misses"]) == (2, 3)
@@ -0,0 +1,29 @@
+import json
+
+from server.entry_store import TEXT_SPAN_MIN
+from server.har_utils import load_entry_store
+
+
+def _entry(i, text):
+    return {
+        "startedDateTime": f"2025-01-01T00:00:0{i}.000Z",
+        "time": 1.0,
+        "request": {"method": "GET", "url": f"https://example.com/{i}"},
+        "response": {"status": 200, "content": {"size": len(text), "mimeType": "text/plain", "text": text}},
+    }
+
+
+def test_cache_leaves_large_bodies_out(tmp_path):
+    big = "é\\\"" * TEXT_SPAN_MIN
+    path = tmp_path / "a.har"
+    path.write_text(json.dumps({"log": {"entries": [_entry(0, big), _entry(1, "small")]}}))
+    store = load_entry_store(str(path))
+    reader = store.reader
+    for _ in range(2):
+        assert store.raw(0)["response"]["content"]["text"] == big
+        assert store.raw(0, with_body=False)["response"]["content"]["text"] is None
+        assert store.raw(1)["response"]["content"]["text"] == "small"
+    assert "".join(text for _, text in store.body_chunks(0)) == big
+    # Both entries are cached, the large body is not.
+    assert len(reader._cache) == 2
+    assert reader._cached < 2048
@@ -0,0 +1,26 @@
+import random
+from array import array
+
+import pytest
+
+from server.search_index import INTERSECT_SEARCH_RATIO, TrigramIndex, intersect
+
+
+@pytest.mark.parametrize("sizes", [(5,), (0, 50), (50, 60, 70), (10, 10 * INTERSECT_SEARCH_RATIO, 900), (3, 400, 5), (200, 200)])
+def test_intersect(sizes):
+    rng = random.Random(sum(sizes))
+    lists = [array("I", sorted(rng.sample(range(1000), n))) for n in sizes]
+    expected = sorted(set(lists[0]).intersection(*lists[1:]))
+    assert list(intersect(lists)) == expected
+
+
+def test_intersect_past_the_end():
+    assert list(intersect([array("I", [1, 5, 900, 950]), array("I", range(600))])) == [1, 5]
+    assert list(intersect([array("I", [1, 5, 900]), array("I", [1, 2, 3, 5, 6, 7])])) == [1, 5]
+
+
+def test_trigram_search():
+    urls = ["https://a.example/app.js", "https://b.example/app.css", "https://a.example/img.png"]
+    index = TrigramIndex(enumerate(urls), urls.__getitem__)
+    assert sorted(index.search("a.example")) == [0, 2]
+    assert sorted(index.search("app.")) == [0, 1]
@@ -0,0 +1,39 @@
+import json
+import math
+
+from server.aggregates import Aggregates
+from server.har_utils import build_stats, load_entry_store
+from server.sketches import DDSketch, sketch_keys
+
+
+def _entry(time, wait=1.0, size=100):
+    return {
+        "startedDateTime": "2025-01-01T00:00:00.000Z",
+        "time": time,
+        "request": {"method": "GET", "url": "https://example.com/a"},
+        "response": {"status": 200, "statusText": "OK", "content": {"size": size, "mimeType": "text/html"}},
+        "timings": {"wait": wait, "receive": 1.0},
+    }
+
+
+def test_non_finite_values_go_to_the_zero_bucket():
+    keys = sketch_keys([float("nan"), float("inf"), float("-inf"), 0.0])
+    assert len(set(keys)) == 1
+    sketch = DDSketch()
+    sketch.add(float("nan"))
+    assert sketch.zeros == 1 and sketch.count == 1
+
+
+def test_load_har_with_nan_time(tmp_path):
+    path = tmp_path / "nan.har"
+    entries = [_entry(float("nan")), _entry(float("inf"), wait=float("-inf")), _entry(12.5)]
+    # json.dumps writes NaN/Infinity literals, as some HAR exporters do
+    path.write_text(json.dumps({"log": {"entries": entries}}))
+    aggregates = Aggregates()
+    store = load_entry_store(str(path), aggregates=aggregates)
+    assert len(store) == 3
+    assert aggregates.stats()["count"] == 3
+    assert build_stats(store)["count"] == 3
+    time = aggregates.distributions_by_name(["time"], ["all"])["time"]["all"]["all"]
+    assert time.sketch.count == 3 and time.sketch.zeros == 2
+    assert math.isclose(time.sketch.quantiles([1.0])[0], 12.5, rel_tol=0.02)